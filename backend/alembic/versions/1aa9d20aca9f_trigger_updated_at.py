@@ -0,0 +1,44 @@
+"""trigger de updated_at
+
+Revision ID: 1aa9d20aca9f
+Revises: e5e38cdee3ad
+Create Date: 2026-10-17 10:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1aa9d20aca9f'
+down_revision = 'e5e38cdee3ad'
+branch_labels = None
+depends_on = None
+
+# O onupdate=func.now() dos models só vale para escritas via SQLAlchemy; as rotas
+# gravam pelo PostgREST, então o banco precisa atualizar updated_at sozinho
+# (a sincronização incremental da base de conhecimento filtra por ele)
+TABLES = ['users', 'players', 'cards', 'builds', 'gameplay_tips', 'user_stats']
+
+
+def upgrade():
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_set_updated_at
+            BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at()
+        """)
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_set_updated_at ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS set_updated_at()")
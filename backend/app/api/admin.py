@@ -7,6 +7,7 @@ from typing import List, Dict
 from app.core.deps import get_current_admin, require_roles
 from app.core.security import get_current_user
 from app.services.supabase_service import supabase_service
+from app.services.admin_stats import admin_stats
 from app.models import UserRole
 from app.schemas import MessageResponse
 
@@ -29,20 +30,13 @@ async def admin_dashboard(
     - Total de builds
     """
     try:
-        # Buscar estatísticas
-        users_count = len(supabase_service.client.table("users").select("id").execute().data)
-        cards_count = len(supabase_service.client.table("cards").select("id").execute().data)
-        players_count = len(supabase_service.client.table("players").select("id").execute().data)
-        builds_count = len(supabase_service.client.table("builds").select("id").execute().data)
+        # Snapshot com TTL curto (contagens sem baixar as tabelas)
+        statistics = await admin_stats.get()
         
         return {
             "admin_email": current_admin.get("email"),
-            "statistics": {
-                "total_users": users_count,
-                "total_cards": cards_count,
-                "total_players": players_count,
-                "total_builds": builds_count
-            },
+            "statistics": statistics,
+            "statistics_updated_at": admin_stats.updated_at,
             "message": "Dashboard carregado com sucesso"
         }
     except Exception as e:
@@ -68,7 +62,7 @@ async def list_all_users(
         offset: Paginação (padrão: 0)
     """
     try:
-        response = supabase_service.client.table("users")\
+        response = await supabase_service.table("users")\
             .select("id, email, name, role, created_at")\
             .order("created_at", desc=True)\
             .range(offset, offset + limit - 1)\
@@ -97,7 +91,7 @@ async def promote_user_to_admin(
     """
     try:
         # Verificar se usuário existe
-        user = supabase_service.client.table("users")\
+        user = await supabase_service.table("users")\
             .select("id, email, role")\
             .eq("id", user_id)\
             .execute()
@@ -109,7 +103,7 @@ async def promote_user_to_admin(
             )
         
         # Promover para admin
-        supabase_service.client.table("users")\
+        await supabase_service.table("users")\
             .update({"role": UserRole.admin.value})\
             .eq("id", user_id)\
             .execute()
@@ -149,7 +143,7 @@ async def demote_user(
             )
         
         # Verificar se usuário existe
-        user = supabase_service.client.table("users")\
+        user = await supabase_service.table("users")\
             .select("id, email, role")\
             .eq("id", user_id)\
             .execute()
@@ -161,7 +155,7 @@ async def demote_user(
             )
         
         # Rebaixar para free
-        supabase_service.client.table("users")\
+        await supabase_service.table("users")\
             .update({"role": UserRole.free.value})\
             .eq("id", user_id)\
             .execute()
@@ -201,7 +195,7 @@ async def delete_user(
             )
         
         # Verificar se usuário existe
-        user = supabase_service.client.table("users")\
+        user = await supabase_service.table("users")\
             .select("id, email")\
             .eq("id", user_id)\
             .execute()
@@ -213,7 +207,7 @@ async def delete_user(
             )
         
         # Deletar usuário
-        supabase_service.client.table("users")\
+        await supabase_service.table("users")\
             .delete()\
             .eq("id", user_id)\
             .execute()
@@ -1,5 +1,7 @@
+from functools import partial
 from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
 from app.schemas import (
     BuildQuery, BuildResponse, MessageResponse,
     BuildCreate, BuildUpdate, BuildResponseDB
@@ -8,11 +10,62 @@ from app.services.gemini_service import gemini_service
 from app.services.rag_service import rag_service
 from app.services.cache_service import cache_service
 from app.services.supabase_service import supabase_service
+from app.services.quota_service import quota_service
+from app.services.activity_service import activity_service, ACTIVITY_BUILD_QUERY
+from app.services.popular_builds import popular_builds
+from app.services.catalog_repository import catalog_repository
+from app.services.singleflight import single_flight
+from app.services.streaming import SSE_HEADERS, replay_response, stream_response
+from app.core.config import settings
 from app.core.security import get_current_user
 from app.models import UserRole
 
 router = APIRouter(prefix="/builds", tags=["Builds"])
 
+BUILD_CACHE_TTL = settings.BUILD_CACHE_TTL  # 1 semana
+BUILD_CACHE_SOFT_TTL = settings.BUILD_CACHE_SOFT_TTL  # depois disso, regenera em background
+
+
+def _build_response_data(query: BuildQuery, ai_response: str) -> dict:
+    """Monta a resposta de build a partir do texto gerado pela IA"""
+    # Parse da resposta (simplificado - melhorar depois)
+    return {
+        "player_name": query.player_name,
+        "position": query.position,
+        "priority_points": [
+            {"skill": "Offensive Awareness", "points": 10},
+            {"skill": "Finishing", "points": 10},
+            {"skill": "Speed", "points": 8}
+        ],
+        "playstyle": "Goal Poacher",
+        "tips": ai_response,
+        "from_cache": False
+    }
+
+
+def _resolve_query(query: BuildQuery) -> Tuple[BuildQuery, str, str]:
+    """
+    Resolve jogador e posição para a forma canônica (apelidos, erros de digitação)
+    
+    Retorna a consulta normalizada, o ID canônico do jogador e a chave de
+    cache correspondente.
+    """
+    player_id, player_name, position = rag_service.resolve_build_query(query.player_name, query.position)
+    canonical = BuildQuery(player_name=player_name, position=position)
+    return canonical, player_id, cache_service.generate_build_key(player_id, position)
+
+
+async def _generate_build(query: BuildQuery) -> dict:
+    """Busca contexto no RAG e gera a build com a IA"""
+    context = rag_service.find_build_context(query.player_name, query.position)
+    
+    ai_response = await gemini_service.generate_build_response(
+        player_name=query.player_name,
+        position=query.position,
+        context=context
+    )
+    return _build_response_data(query, ai_response)
+
 
 @router.post("/", response_model=BuildResponse)
 async def get_build_recommendation(
@@ -27,71 +80,166 @@ async def get_build_recommendation(
     """
     user_id = current_user["user_id"]
     
-    # 1. Verificar quota
-    has_quota = await supabase_service.check_and_increment_quota(user_id)
-    if not has_quota:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Limite diário de perguntas atingido. Faça upgrade para Premium!"
-        )
-    
-    # 2. Verificar cache
-    cache_key = cache_service.generate_build_key(query.player_name, query.position)
-    cached_response = cache_service.get(cache_key)
+    # 1. Verificar cache primeiro (valor stale é servido na hora e regenerado em background)
+    query, player_id, cache_key = _resolve_query(query)
+    activity_service.record(user_id, ACTIVITY_BUILD_QUERY, {
+        "player_id": player_id,
+        "player_name": query.player_name,
+        "position": query.position
+    })
+    cached_response, is_stale = await cache_service.get_swr(cache_key)
+    generate = partial(_generate_build, query)
     
     if cached_response:
+        if is_stale:
+            single_flight.refresh(
+                cache_key, generate,
+                expire=BUILD_CACHE_TTL, soft_ttl=BUILD_CACHE_SOFT_TTL
+            )
         cached_response["from_cache"] = True
         return BuildResponse(**cached_response)
     
-    # 3. Buscar contexto no RAG (base de conhecimento)
-    context = rag_service.find_build_context(query.player_name, query.position)
+    # 2. Verificar quota (só consome quando a IA precisa ser chamada)
+    has_quota = await quota_service.check_and_increment(user_id, current_user.get("role"))
+    if not has_quota:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Limite diário de perguntas atingido. Faça upgrade para Premium!"
+        )
     
-    # 4. Gerar resposta com Gemini
     try:
-        ai_response = await gemini_service.generate_build_response(
-            player_name=query.player_name,
-            position=query.position,
-            context=context
+        # 3. Gerar resposta (requisições idênticas simultâneas compartilham a mesma geração)
+        response_data, generated = await single_flight.do(
+            cache_key, generate, expire=BUILD_CACHE_TTL, soft_ttl=BUILD_CACHE_SOFT_TTL
         )
-        
-        # Parse da resposta (simplificado - melhorar depois)
-        response_data = {
-            "player_name": query.player_name,
-            "position": query.position,
-            "priority_points": [
-                {"skill": "Offensive Awareness", "points": 10},
-                {"skill": "Finishing", "points": 10},
-                {"skill": "Speed", "points": 8}
-            ],
-            "playstyle": "Goal Poacher",
-            "tips": ai_response,
-            "from_cache": False
-        }
-        
-        # 5. Salvar no cache (1 semana)
-        cache_service.set(cache_key, response_data, expire=604800)
+        response_data["from_cache"] = not generated
+        if not generated:
+            # Resposta de uma geração simultânea idêntica: não conta na quota
+            await quota_service.refund(user_id)
         
         return BuildResponse(**response_data)
     
     except Exception as e:
+        # Falha na geração não conta na quota
+        await quota_service.refund(user_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao gerar build: {str(e)}"
         )
 
 
+@router.post("/stream")
+async def stream_build_recommendation(
+    query: BuildQuery,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Versão em streaming (Server-Sent Events) da recomendação de build
+    
+    Eventos enviados:
+    - **token**: pedaço do texto (`{"content": "..."}`)
+    - **done**: resposta completa, no mesmo formato de `POST /builds/`
+    - **error**: falha durante a geração
+    """
+    user_id = current_user["user_id"]
+    
+    # 1. Cache hit é reenviado pela mesma interface de streaming
+    query, player_id, cache_key = _resolve_query(query)
+    activity_service.record(user_id, ACTIVITY_BUILD_QUERY, {
+        "player_id": player_id,
+        "player_name": query.player_name,
+        "position": query.position
+    })
+    cached_response, is_stale = await cache_service.get_swr(cache_key)
+    
+    if cached_response:
+        if is_stale:
+            single_flight.refresh(
+                cache_key, partial(_generate_build, query),
+                expire=BUILD_CACHE_TTL, soft_ttl=BUILD_CACHE_SOFT_TTL
+            )
+        cached_response["from_cache"] = True
+        return StreamingResponse(
+            replay_response(cached_response, "tips"),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
+    # 2. Verificar quota (só consome quando a IA precisa ser chamada)
+    has_quota = await quota_service.check_and_increment(user_id, current_user.get("role"))
+    if not has_quota:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Limite diário de perguntas atingido. Faça upgrade para Premium!"
+        )
+    
+    # 3. Se a mesma build já está sendo gerada, aguarda e reenvia o resultado
+    shared_response = await single_flight.join(cache_key)
+    if shared_response:
+        # Quem gerou já pagou a pergunta
+        await quota_service.refund(user_id)
+        shared_response["from_cache"] = True
+        return StreamingResponse(
+            replay_response(shared_response, "tips"),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
+    # 4. Buscar contexto no RAG
+    context = rag_service.find_build_context(query.player_name, query.position)
+    
+    tokens = gemini_service.stream_build_response(
+        player_name=query.player_name,
+        position=query.position,
+        context=context
+    )
+    
+    # 5. Registra o stream como geração em andamento e salva no cache ao final
+    async def events():
+        async with single_flight.lead(cache_key) as flight:
+            async def on_complete(ai_response: str) -> dict:
+                response_data = _build_response_data(query, ai_response)
+                await cache_service.set(
+                    cache_key, response_data, expire=BUILD_CACHE_TTL, soft_ttl=BUILD_CACHE_SOFT_TTL
+                )
+                flight.value = response_data
+                return response_data
+            
+            async def on_error():
+                # Falha na geração não conta na quota
+                await quota_service.refund(user_id)
+            
+            async for event in stream_response(tokens, on_complete, on_error):
+                yield event
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @router.get("/popular")
-async def get_popular_builds():
+async def get_popular_builds(window: Optional[str] = None, limit: int = 10):
     """
-    Retorna lista de builds populares (top 10 jogadores)
+    Retorna as builds mais consultadas (jogador + posição)
+    
+    - **window**: Janela de tempo (padrão: 24h; ver POPULAR_BUILDS_WINDOWS)
+    - **limit**: Quantidade de resultados (padrão: 10)
+    
+    `queries` é a contagem com decaimento exponencial na janela (consultas
+    recentes pesam mais).
     """
-    # TODO: Implementar sistema de tracking de builds mais consultadas
+    window = window or popular_builds.default_window
+    if window not in popular_builds.windows:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Janela inválida. Use uma de: {', '.join(popular_builds.windows)}"
+        )
+    
     return {
-        "popular_builds": [
-            {"player": "Messi", "position": "RWF", "queries": 1523},
-            {"player": "Ronaldo", "position": "CF", "queries": 1445},
-            {"player": "Neymar", "position": "LWF", "queries": 1289},
-        ]
+        "window": window,
+        "popular_builds": await popular_builds.top(window, max(1, min(limit, 100)))
     }
 
 
@@ -114,12 +262,9 @@ async def create_build(
     
     try:
         # Verificar se a carta existe
-        card_response = supabase_service.client.table("cards")\
-            .select("id, name")\
-            .eq("id", build_data.card_id)\
-            .execute()
+        card = await catalog_repository.get_card(build_data.card_id)
         
-        if not card_response.data:
+        if not card:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Carta com ID {build_data.card_id} não encontrada"
@@ -143,7 +288,7 @@ async def create_build(
         build_dict = build_data.dict()
         build_dict["user_id"] = user_id
         
-        response = supabase_service.client.table("builds")\
+        response = await supabase_service.table("builds")\
             .insert(build_dict)\
             .execute()
         
@@ -174,13 +319,9 @@ async def get_my_builds(
     user_id = current_user["user_id"]
     
     try:
-        response = supabase_service.client.table("builds")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .order("created_at", desc=True)\
-            .execute()
+        builds = await catalog_repository.get_user_builds(user_id)
         
-        return [BuildResponseDB(**build) for build in response.data]
+        return [BuildResponseDB(**build) for build in builds]
     
     except Exception as e:
         raise HTTPException(
@@ -198,14 +339,9 @@ async def get_builds_by_card(
     Retorna todas as builds para uma carta específica
     """
     try:
-        response = supabase_service.client.table("builds")\
-            .select("*")\
-            .eq("card_id", card_id)\
-            .order("is_official_meta", desc=True)\
-            .order("created_at", desc=True)\
-            .execute()
+        builds = await catalog_repository.get_builds_by_card(card_id)
         
-        return [BuildResponseDB(**build) for build in response.data]
+        return [BuildResponseDB(**build) for build in builds]
     
     except Exception as e:
         raise HTTPException(
@@ -223,18 +359,15 @@ async def get_build_by_id(
     Retorna uma build específica por ID
     """
     try:
-        response = supabase_service.client.table("builds")\
-            .select("*")\
-            .eq("id", build_id)\
-            .execute()
+        build = await catalog_repository.get_build(build_id)
         
-        if not response.data:
+        if not build:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Build com ID {build_id} não encontrada"
             )
         
-        return BuildResponseDB(**response.data[0])
+        return BuildResponseDB(**build)
     
     except HTTPException:
         raise
@@ -258,7 +391,7 @@ async def update_build(
     
     try:
         # Verificar se a build existe e pertence ao usuário
-        existing = supabase_service.client.table("builds")\
+        existing = await supabase_service.table("builds")\
             .select("*")\
             .eq("id", build_id)\
             .execute()
@@ -308,7 +441,7 @@ async def update_build(
                     detail=f"Total de pontos ({total_points}) excede o limite de 100"
                 )
         
-        response = supabase_service.client.table("builds")\
+        response = await supabase_service.table("builds")\
             .update(update_dict)\
             .eq("id", build_id)\
             .execute()
@@ -337,7 +470,7 @@ async def delete_build(
     
     try:
         # Verificar se a build existe
-        existing = supabase_service.client.table("builds")\
+        existing = await supabase_service.table("builds")\
             .select("*")\
             .eq("id", build_id)\
             .execute()
@@ -355,7 +488,7 @@ async def delete_build(
                 detail="Você não tem permissão para deletar esta build"
             )
         
-        supabase_service.client.table("builds")\
+        await supabase_service.table("builds")\
             .delete()\
             .eq("id", build_id)\
             .execute()
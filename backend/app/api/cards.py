@@ -2,9 +2,30 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Optional
 from app.schemas import CardCreate, CardResponse, CardUpdate, MessageResponse
 from app.services.supabase_service import supabase_service
+from app.services.cache_service import cache_service
+from app.services.name_resolver import OFFICIAL_POSITIONS
+from app.services.rag_service import rag_service
+from app.services.catalog_repository import catalog_repository
+from app.services.activity_service import activity_service, ACTIVITY_CARD_SEARCH, ACTIVITY_CARD_VIEW
 from app.core.security import get_current_user
 from app.core.deps import get_current_admin
 
+
+async def _invalidate_player_builds(*card_names: str):
+    """
+    Remove do cache as builds geradas para os jogadores das cartas
+
+    Só as chaves desses jogadores (em todas as posições) são apagadas; o
+    resto do cache de builds continua valendo.
+    """
+    player_ids = {rag_service.resolve_build_query(name, "CF")[0] for name in card_names if name}
+    await cache_service.delete_many([
+        cache_service.generate_build_key(player_id, position)
+        for player_id in sorted(player_ids)
+        for position in OFFICIAL_POSITIONS
+    ])
+
+
 router = APIRouter(prefix="/cards", tags=["Cards"])
 
 @router.post("/", response_model=CardResponse, status_code=status.HTTP_201_CREATED)
@@ -28,7 +49,7 @@ async def create_card(
     
     try:
         # Verificar se o jogador existe
-        player = supabase_service.client.table("players")\
+        player = await supabase_service.table("players")\
             .select("id, name")\
             .eq("id", card_data.player_id)\
             .execute()
@@ -40,7 +61,7 @@ async def create_card(
             )
         
         # Inserir carta
-        response = supabase_service.client.table("cards")\
+        response = await supabase_service.table("cards")\
             .insert(card_data.dict())\
             .execute()
         
@@ -50,6 +71,8 @@ async def create_card(
                 detail="Erro ao criar carta no banco de dados"
             )
         
+        await _invalidate_player_builds(card_data.name)
+        
         return CardResponse(**response.data[0])
     
     except HTTPException:
@@ -84,25 +107,23 @@ async def list_cards(
     - **offset**: Paginação (padrão: 0)
     """
     try:
-        query = supabase_service.client.table("cards").select("*")
-        
-        if player_id:
-            query = query.eq("player_id", player_id)
-        
-        if position:
-            query = query.eq("position", position)
+        activity_service.record(current_user["user_id"], ACTIVITY_CARD_SEARCH, {
+            "player_id": player_id,
+            "position": position,
+            "card_type": card_type,
+            "search": search
+        })
         
-        if card_type:
-            query = query.eq("card_type", card_type)
-        
-        if search:
-            query = query.ilike("name", f"%{search}%")
-        
-        response = query.order("overall_rating", desc=True)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+        cards = await catalog_repository.list_cards(
+            player_id=player_id,
+            position=position,
+            card_type=card_type,
+            search=search,
+            limit=limit,
+            offset=offset
+        )
         
-        return [CardResponse(**card) for card in response.data]
+        return [CardResponse(**card) for card in cards]
     
     except Exception as e:
         raise HTTPException(
@@ -122,18 +143,21 @@ async def get_card(
     **Acessível para todos os usuários autenticados**
     """
     try:
-        response = supabase_service.client.table("cards")\
-            .select("*")\
-            .eq("id", card_id)\
-            .execute()
+        card = await catalog_repository.get_card(card_id)
         
-        if not response.data:
+        if not card:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Carta com ID {card_id} não encontrada"
             )
         
-        return CardResponse(**response.data[0])
+        activity_service.record(current_user["user_id"], ACTIVITY_CARD_VIEW, {
+            "card_id": card_id,
+            "name": card.get("name"),
+            "position": card.get("position")
+        })
+        
+        return CardResponse(**card)
     
     except HTTPException:
         raise
@@ -158,8 +182,8 @@ async def update_card(
     
     try:
         # Verificar se carta existe
-        existing = supabase_service.client.table("cards")\
-            .select("id")\
+        existing = await supabase_service.table("cards")\
+            .select("id, name")\
             .eq("id", card_id)\
             .execute()
         
@@ -178,11 +202,13 @@ async def update_card(
                 detail="Nenhum campo para atualizar"
             )
         
-        response = supabase_service.client.table("cards")\
+        response = await supabase_service.table("cards")\
             .update(update_dict)\
             .eq("id", card_id)\
             .execute()
         
+        await _invalidate_player_builds(existing.data[0]["name"], update_dict.get("name"))
+        
         return CardResponse(**response.data[0])
     
     except HTTPException:
@@ -207,8 +233,8 @@ async def delete_card(
     
     try:
         # Verificar se carta existe
-        existing = supabase_service.client.table("cards")\
-            .select("id")\
+        existing = await supabase_service.table("cards")\
+            .select("id, name")\
             .eq("id", card_id)\
             .execute()
         
@@ -219,7 +245,7 @@ async def delete_card(
             )
         
         # Verificar se há builds associadas
-        builds = supabase_service.client.table("builds")\
+        builds = await supabase_service.table("builds")\
             .select("id")\
             .eq("card_id", card_id)\
             .execute()
@@ -230,11 +256,13 @@ async def delete_card(
                 detail=f"Não é possível deletar carta com {len(builds.data)} build(s) associada(s)"
             )
         
-        supabase_service.client.table("cards")\
+        await supabase_service.table("cards")\
             .delete()\
             .eq("id", card_id)\
             .execute()
         
+        await _invalidate_player_builds(existing.data[0]["name"])
+        
         return MessageResponse(
             message="Carta deletada com sucesso",
             detail=f"Carta ID {card_id} foi removida"
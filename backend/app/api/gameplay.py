@@ -1,14 +1,57 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from app.schemas import GameplayQuery, GameplayResponse, MessageResponse
 from app.services.gemini_service import gemini_service
 from app.services.rag_service import rag_service
 from app.services.cache_service import cache_service
-from app.services.supabase_service import supabase_service
+from app.services.activity_service import activity_service, ACTIVITY_GAMEPLAY_QUESTION
+from app.services.quota_service import quota_service
+from app.services.semantic_cache import semantic_cache
+from app.services.singleflight import single_flight
+from app.services.streaming import SSE_HEADERS, replay_response, stream_response
 from app.core.security import get_current_user_optional
 
 router = APIRouter(prefix="/gameplay", tags=["Gameplay"])
 
+GAMEPLAY_CACHE_TTL = 86400  # 24 horas
+
+
+def _anonymous_response_data(question: str) -> dict:
+    """Resposta para usuário não logado: apenas FAQ/base de conhecimento local"""
+    # Só uma correspondência forte da base local (o contexto híbrido é para a IA)
+    context = rag_service.find_faq_answer(question)
+    
+    if context:
+        # context é uma string formatada com a resposta
+        return {
+            "question": question,
+            "answer": context,
+            "category": "FAQ",
+            "video_url": None,
+            "from_cache": True
+        }
+    
+    # Se não tem no FAQ, informa que precisa login
+    return {
+        "question": question,
+        "answer": "🔒 Pergunta não encontrada no FAQ gratuito.\n\nFaça login para acessar a IA completa e fazer qualquer pergunta sobre eFootball!",
+        "category": "Sistema",
+        "video_url": None,
+        "from_cache": False
+    }
+
+
+def _ai_response_data(question: str, ai_response: str) -> dict:
+    """Monta a resposta de gameplay a partir do texto gerado pela IA"""
+    return {
+        "question": question,
+        "answer": ai_response,
+        "category": "Coach IA",
+        "video_url": None,
+        "from_cache": False
+    }
+
 
 @router.post("/ask", response_model=GameplayResponse)
 async def ask_gameplay_question(
@@ -25,9 +68,16 @@ async def ask_gameplay_question(
     **Modo logado:** Usa IA + cache + quota de perguntas diárias
     """
     
-    # 1. Verificar cache primeiro (para todos)
+    if current_user:
+        activity_service.record(current_user["user_id"], ACTIVITY_GAMEPLAY_QUESTION, {"question": query.question})
+    
+    # 1. Verificar cache primeiro (para todos): chave exata e depois perguntas parecidas
     cache_key = cache_service.generate_gameplay_key(query.question)
-    cached_response = cache_service.get(cache_key)
+    cached_response = await cache_service.get(cache_key)
+    
+    if not cached_response:
+        # Pergunta parecida já respondida (cache semântico)
+        cached_response = await semantic_cache.lookup(query.question)
     
     if cached_response:
         cached_response["from_cache"] = True
@@ -35,69 +85,143 @@ async def ask_gameplay_question(
     
     # 2. Se não logado, apenas retorna resposta genérica do cache/FAQ
     if not current_user:
-        # Busca contexto no RAG (base de conhecimento local)
-        context = rag_service.find_gameplay_context(query.question)
-        
-        if context:
-            # context é uma string formatada com a resposta
-            response_data = {
-                "question": query.question,
-                "answer": context,
-                "category": "FAQ",
-                "video_url": None,
-                "from_cache": True
-            }
-            return GameplayResponse(**response_data)
-        
-        # Se não tem no FAQ, informa que precisa login
-        response_data = {
-            "question": query.question,
-            "answer": "🔒 Pergunta não encontrada no FAQ gratuito.\n\nFaça login para acessar a IA completa e fazer qualquer pergunta sobre eFootball!",
-            "category": "Sistema",
-            "video_url": None,
-            "from_cache": False
-        }
-        return GameplayResponse(**response_data)
+        return GameplayResponse(**_anonymous_response_data(query.question))
     
     # 3. Usuário logado - verificar quota
     user_id = current_user["user_id"]
-    has_quota = await supabase_service.check_and_increment_quota(user_id)
+    has_quota = await quota_service.check_and_increment(user_id, current_user.get("role"))
     if not has_quota:
         raise HTTPException(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail="Limite diário de perguntas atingido. Faça upgrade para Premium!"
         )
     
-    # 4. Buscar contexto no RAG (FAQs do Pro Player)
-    context = rag_service.find_gameplay_context(query.question)
-    
-    # 5. Gerar resposta com IA
-    try:
+    # 4. Gerar resposta com IA (perguntas idênticas simultâneas compartilham a mesma geração)
+    async def generate() -> dict:
+        # Buscar contexto no RAG (FAQs do Pro Player)
+        context = rag_service.find_gameplay_context(query.question)
+        
         ai_response = await gemini_service.generate_gameplay_response(
             question=query.question,
             context=context
         )
-        
-        response_data = {
-            "question": query.question,
-            "answer": ai_response,
-            "category": "Coach IA",
-            "video_url": None,
-            "from_cache": False
-        }
-        
-        # 6. Salvar no cache (24 horas)
-        cache_service.set(cache_key, response_data, expire=86400)
+        return _ai_response_data(query.question, ai_response)
+    
+    try:
+        # 5. Salva no cache (24 horas) ao terminar a geração
+        response_data, generated = await single_flight.do(
+            cache_key, generate, expire=GAMEPLAY_CACHE_TTL
+        )
+        response_data["from_cache"] = not generated
+        if generated:
+            await semantic_cache.add(query.question, cache_key)
+        else:
+            # Resposta de uma geração simultânea idêntica: não conta na quota
+            await quota_service.refund(user_id)
         
         return GameplayResponse(**response_data)
     
     except Exception as e:
+        # Falha na geração não conta na quota
+        await quota_service.refund(user_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao processar pergunta: {str(e)}"
         )
 
 
+@router.post("/ask/stream")
+async def ask_gameplay_question_stream(
+    query: GameplayQuery,
+    current_user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """
+    Versão em streaming (Server-Sent Events) de `POST /gameplay/ask`
+    
+    Eventos enviados:
+    - **token**: pedaço do texto (`{"content": "..."}`)
+    - **done**: resposta completa, no mesmo formato de `POST /gameplay/ask`
+    - **error**: falha durante a geração
+    """
+    
+    if current_user:
+        activity_service.record(current_user["user_id"], ACTIVITY_GAMEPLAY_QUESTION, {"question": query.question})
+    
+    # 1. Cache hit (exato ou semântico) é reenviado pela mesma interface de streaming
+    cache_key = cache_service.generate_gameplay_key(query.question)
+    cached_response = await cache_service.get(cache_key)
+    if not cached_response:
+        cached_response = await semantic_cache.lookup(query.question)
+    
+    if cached_response:
+        cached_response["from_cache"] = True
+        return StreamingResponse(
+            replay_response(cached_response, "answer"),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
+    # 2. Se não logado, reenvia a resposta do FAQ
+    if not current_user:
+        return StreamingResponse(
+            replay_response(_anonymous_response_data(query.question), "answer"),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
+    # 3. Usuário logado - verificar quota
+    user_id = current_user["user_id"]
+    has_quota = await quota_service.check_and_increment(user_id, current_user.get("role"))
+    if not has_quota:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Limite diário de perguntas atingido. Faça upgrade para Premium!"
+        )
+    
+    # 4. Se a mesma pergunta já está sendo respondida, aguarda e reenvia o resultado
+    shared_response = await single_flight.join(cache_key)
+    if shared_response:
+        # Quem gerou já pagou a pergunta
+        await quota_service.refund(user_id)
+        shared_response["from_cache"] = True
+        return StreamingResponse(
+            replay_response(shared_response, "answer"),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
+        )
+    
+    # 5. Buscar contexto no RAG
+    context = rag_service.find_gameplay_context(query.question)
+    
+    tokens = gemini_service.stream_gameplay_response(
+        question=query.question,
+        context=context
+    )
+    
+    # 6. Registra o stream como geração em andamento e salva no cache ao final
+    async def events():
+        async with single_flight.lead(cache_key) as flight:
+            async def on_complete(ai_response: str) -> dict:
+                response_data = _ai_response_data(query.question, ai_response)
+                await cache_service.set(cache_key, response_data, expire=GAMEPLAY_CACHE_TTL)
+                await semantic_cache.add(query.question, cache_key)
+                flight.value = response_data
+                return response_data
+            
+            async def on_error():
+                # Falha na geração não conta na quota
+                await quota_service.refund(user_id)
+            
+            async for event in stream_response(tokens, on_complete, on_error):
+                yield event
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @router.get("/categories")
 async def get_categories():
     """
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Optional
 from app.schemas import PlayerCreate, PlayerResponse, PlayerUpdate, MessageResponse
 from app.services.supabase_service import supabase_service
+from app.services.catalog_repository import catalog_repository
 from app.core.security import get_current_user
 from app.models import UserRole
 
@@ -31,7 +32,7 @@ async def create_player(
     
     try:
         # Verificar se jogador já existe
-        existing = supabase_service.client.table("players")\
+        existing = await supabase_service.table("players")\
             .select("id, name")\
             .ilike("name", player_data.name)\
             .execute()
@@ -43,7 +44,7 @@ async def create_player(
             )
         
         # Inserir jogador
-        response = supabase_service.client.table("players")\
+        response = await supabase_service.table("players")\
             .insert(player_data.dict())\
             .execute()
         
@@ -83,19 +84,14 @@ async def list_players(
     - **offset**: Paginação (padrão: 0)
     """
     try:
-        query = supabase_service.client.table("players").select("*")
-        
-        if search:
-            query = query.ilike("name", f"%{search}%")
-        
-        if nationality:
-            query = query.eq("nationality", nationality)
-        
-        response = query.order("name", desc=False)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+        players = await catalog_repository.list_players(
+            search=search,
+            nationality=nationality,
+            limit=limit,
+            offset=offset
+        )
         
-        return [PlayerResponse(**player) for player in response.data]
+        return [PlayerResponse(**player) for player in players]
     
     except Exception as e:
         raise HTTPException(
@@ -115,18 +111,15 @@ async def get_player(
     **Acessível para todos os usuários autenticados**
     """
     try:
-        response = supabase_service.client.table("players")\
-            .select("*")\
-            .eq("id", player_id)\
-            .execute()
+        player = await catalog_repository.get_player(player_id)
         
-        if not response.data:
+        if not player:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Jogador com ID {player_id} não encontrado"
             )
         
-        return PlayerResponse(**response.data[0])
+        return PlayerResponse(**player)
     
     except HTTPException:
         raise
@@ -158,7 +151,7 @@ async def update_player(
     
     try:
         # Verificar se jogador existe
-        existing = supabase_service.client.table("players")\
+        existing = await supabase_service.table("players")\
             .select("id")\
             .eq("id", player_id)\
             .execute()
@@ -178,7 +171,7 @@ async def update_player(
                 detail="Nenhum campo para atualizar"
             )
         
-        response = supabase_service.client.table("players")\
+        response = await supabase_service.table("players")\
             .update(update_dict)\
             .eq("id", player_id)\
             .execute()
@@ -214,7 +207,7 @@ async def delete_player(
     
     try:
         # Verificar se jogador existe
-        existing = supabase_service.client.table("players")\
+        existing = await supabase_service.table("players")\
             .select("id")\
             .eq("id", player_id)\
             .execute()
@@ -226,7 +219,7 @@ async def delete_player(
             )
         
         # Verificar se há cartas associadas
-        cards = supabase_service.client.table("cards")\
+        cards = await supabase_service.table("cards")\
             .select("id")\
             .eq("player_id", player_id)\
             .execute()
@@ -237,7 +230,7 @@ async def delete_player(
                 detail=f"Não é possível deletar jogador com {len(cards.data)} carta(s) associada(s)"
             )
         
-        supabase_service.client.table("players")\
+        await supabase_service.table("players")\
             .delete()\
             .eq("id", player_id)\
             .execute()
@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from sqlalchemy.orm import Session
 from app.schemas import QuotaResponse, UserResponse, MessageResponse, UserUpdate, UserStatsResponse, UserRegister
 from app.services.supabase_service import supabase_service
+from app.services.quota_service import quota_service
+from app.services.user_stats_service import user_stats_service
 from app.core.security import get_current_user
 from app.database import get_db
 from app.models import User, UserStats
@@ -43,7 +45,7 @@ async def get_user_quota(current_user: dict = Depends(get_current_user)):
     (quantas perguntas restam hoje)
     """
     try:
-        quota_info = await supabase_service.get_quota_info(current_user["user_id"])
+        quota_info = await quota_service.get_quota_info(current_user["user_id"], current_user.get("role"))
         return QuotaResponse(**quota_info)
     except Exception as e:
         raise HTTPException(
@@ -100,7 +102,7 @@ async def update_user_profile(
     """
     try:
         # Buscar usuário no Supabase
-        response = supabase_service.client.table("users").select("*").eq("id", current_user["user_id"]).execute()
+        response = await supabase_service.table("users").select("*").eq("id", current_user["user_id"]).execute()
         
         if not response.data or len(response.data) == 0:
             raise HTTPException(
@@ -116,7 +118,7 @@ async def update_user_profile(
         
         if user_update.nickname is not None:
             # Verificar se nickname já existe
-            existing = supabase_service.client.table("users").select("id").eq("nickname", user_update.nickname).neq("id", current_user["user_id"]).execute()
+            existing = await supabase_service.table("users").select("id").eq("nickname", user_update.nickname).neq("id", current_user["user_id"]).execute()
             if existing.data and len(existing.data) > 0:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -129,7 +131,7 @@ async def update_user_profile(
         
         # Atualizar no Supabase
         if update_data:
-            updated = supabase_service.client.table("users").update(update_data).eq("id", current_user["user_id"]).execute()
+            updated = await supabase_service.table("users").update(update_data).eq("id", current_user["user_id"]).execute()
             if updated.data and len(updated.data) > 0:
                 user = updated.data[0]
         
@@ -157,42 +159,24 @@ async def update_user_profile(
 async def get_user_stats(current_user: dict = Depends(get_current_user)):
     """
     Retorna estatísticas de uso do usuário
+    (agregadas em background a partir das atividades; servidas de um cache curto)
     """
     from datetime import datetime
     
     try:
-        # Buscar stats do Supabase
-        response = supabase_service.client.table("user_stats").select("*").eq("user_id", current_user["user_id"]).execute()
-        
-        if response.data and len(response.data) > 0:
-            stats = response.data[0]
-            return UserStatsResponse(
-                total_questions=stats.get("total_questions", 0),
-                builds_consulted=stats.get("builds_consulted", 0),
-                gameplay_questions=stats.get("gameplay_questions", 0),
-                favorite_position=stats.get("favorite_position"),
-                most_searched_player=stats.get("most_searched_player"),
-                last_active=stats.get("last_active", stats.get("created_at"))
-            )
-        else:
-            # Retornar stats vazias se não existir (não tentar criar)
-            return UserStatsResponse(
-                total_questions=0,
-                builds_consulted=0,
-                gameplay_questions=0,
-                favorite_position=None,
-                most_searched_player=None,
-                last_active=datetime.utcnow().isoformat()
-            )
+        stats = await user_stats_service.get_stats(current_user["user_id"])
+        if stats:
+            return UserStatsResponse(**stats)
     except Exception as e:
         # Log do erro e retorna stats vazias
         print(f"Erro ao buscar estatísticas: {str(e)}")
-        from datetime import datetime
-        return UserStatsResponse(
-            total_questions=0,
-            builds_consulted=0,
-            gameplay_questions=0,
-            favorite_position=None,
-            most_searched_player=None,
-            last_active=datetime.utcnow().isoformat()
-        )
\ No newline at end of file
+    
+    # Retornar stats vazias se não existir (não tentar criar)
+    return UserStatsResponse(
+        total_questions=0,
+        builds_consulted=0,
+        gameplay_questions=0,
+        favorite_position=None,
+        most_searched_player=None,
+        last_active=datetime.utcnow().isoformat()
+    )
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 from pathlib import Path
 
@@ -18,18 +18,115 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_SERVICE_KEY: str
+    SUPABASE_TIMEOUT_SECONDS: float = 10.0  # timeout das consultas PostgREST
+    
+    # Postgres direto (leituras de cartas, jogadores e builds)
+    DATABASE_URL: Optional[str] = None  # sem URL, as leituras usam o Supabase REST
+    POSTGRES_ENABLED: bool = True
+    POSTGRES_POOL_MIN_SIZE: int = 2  # conexões mantidas abertas por worker
+    POSTGRES_POOL_MAX_SIZE: int = 10
+    POSTGRES_POOL_MAX_IDLE_SECONDS: float = 300.0  # fecha conexões ociosas acima do mínimo
+    POSTGRES_COMMAND_TIMEOUT: float = 5.0  # segundos por consulta
+    POSTGRES_STATEMENT_CACHE_SIZE: int = 100  # 0 com pgbouncer em modo transação
     
     # Groq AI
     GROQ_API_KEY: str
+    GROQ_MODEL: str = "llama-3.3-70b-versatile"
+    GROQ_TIMEOUT_SECONDS: float = 30.0  # timeout por chamada
+    GROQ_MAX_RETRIES: int = 2
+    GROQ_MAX_CONCURRENCY: int = 64  # chamadas simultâneas por worker
+    GROQ_MAX_CONNECTIONS: int = 100  # pool HTTP compartilhado
+    GROQ_MAX_KEEPALIVE_CONNECTIONS: int = 20
     
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    REDIS_MAX_CONNECTIONS: int = 50  # pool por worker
+    REDIS_CONNECT_TIMEOUT: float = 2.0
+    REDIS_SOCKET_TIMEOUT: float = 1.0
+    
+    # Cache em memória (fallback quando o Redis está indisponível)
+    MEMORY_CACHE_MAX_ENTRIES: int = 1000
+    MEMORY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # 64 MB
+    
+    # Cache L1 por processo (na frente do Redis)
+    CACHE_L1_ENABLED: bool = True
+    CACHE_L1_MAX_ENTRIES: int = 500
+    CACHE_L1_MAX_BYTES: int = 16 * 1024 * 1024  # 16 MB
+    CACHE_L1_TTL: int = 30  # segundos; limita a defasagem se uma invalidação se perder
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    
+    # Cache L3 durável (tabela ai_cache)
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_PREFIXES: str = "build:,gameplay:"  # apenas respostas da IA
+    AI_CACHE_RESTORE_TTL: int = 86400  # TTL máximo ao repopular o Redis a partir do ai_cache
+    AI_CACHE_FLUSH_INTERVAL: float = 5.0  # segundos entre gravações em lote
+    AI_CACHE_BATCH_SIZE: int = 100
+    AI_CACHE_MAX_PENDING: int = 5000
+    
+    # Base de conhecimento (hot reload)
+    KNOWLEDGE_BASE_WATCH_INTERVAL: float = 5.0  # segundos entre verificações de mtime; 0 desativa
+    KNOWLEDGE_BASE_USE_ARTIFACT: bool = True  # usa knowledge_base/compiled/ se estiver atualizado
+    
+    # Base de conhecimento do banco (gameplay_tips e builds meta)
+    KB_DB_SYNC_ENABLED: bool = True
+    KB_DB_SYNC_INTERVAL: float = 30.0  # segundos entre sincronizações incrementais (updated_at)
+    KB_DB_SYNC_PAGE_SIZE: int = 500
+    KB_DB_RECONCILE_EVERY: int = 20  # a cada N sincronizações, remove linhas apagadas no banco
+    
+    # Busca vetorial de gameplay (problemas, FAQs e gameplay_tips)
+    RAG_DENSE_ENABLED: bool = True
+    RAG_DENSE_DIM: int = 4096  # buckets do hashing; igual ao --dense-dim do artefato
+    RAG_DENSE_MIN_SCORE: float = 0.15  # similaridade de cosseno mínima (ver benchmarks.gameplay_retrieval)
+    RAG_CONTEXT_TOP_K: int = 3  # trechos no contexto do prompt
+    RAG_CONTEXT_MAX_CHARS: int = 4000  # limite do contexto combinado
+    
+    # Cache semântico de gameplay (perguntas parecidas reaproveitam a resposta)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.8  # cosseno mínimo (calibrado em benchmarks/semantic_cache_threshold.py)
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 2000
+    SEMANTIC_CACHE_DIM: int = 2048  # buckets do hashing de n-gramas
+    SEMANTIC_CACHE_INDEX_KEY: str = "semantic:gameplay"
+    SEMANTIC_CACHE_SYNC_INTERVAL: float = 30.0  # segundos entre sincronizações do índice
+    
+    # TTL das respostas de build (stale-while-revalidate)
+    BUILD_CACHE_TTL: int = 604800  # hard TTL: 1 semana
+    BUILD_CACHE_SOFT_TTL: int = 86400  # após 1 dia, serve o valor e regenera em background
+    
+    # Single-flight (coalescência de gerações idênticas em andamento)
+    SINGLE_FLIGHT_LEASE_TTL: int = 60  # segundos; deve cobrir uma geração completa
+    SINGLE_FLIGHT_WAIT_TIMEOUT: float = 45.0
+    SINGLE_FLIGHT_POLL_INTERVAL: float = 0.1
     
     # Rate Limiting
     FREE_TIER_DAILY_LIMIT: int = 5
     PREMIUM_TIER_DAILY_LIMIT: int = 100
+    QUOTA_FLUSH_INTERVAL: float = 10.0  # segundos entre gravações do uso em users
+    QUOTA_BATCH_SIZE: int = 500  # ids por UPDATE
+    
+    # Registro de atividades (user_activities, gravação em lote)
+    ACTIVITY_LOG_ENABLED: bool = True
+    ACTIVITY_FLUSH_INTERVAL: float = 5.0  # segundos entre gravações
+    ACTIVITY_BATCH_SIZE: int = 500  # eventos por INSERT; atingir o limite antecipa a gravação
+    ACTIVITY_MAX_PENDING: int = 20000  # acima disso, descarta os eventos mais antigos
+    
+    # Estatísticas de uso (user_stats, agregadas a partir das atividades)
+    USER_STATS_FLUSH_INTERVAL: float = 30.0  # segundos entre gravações em lote
+    USER_STATS_BATCH_SIZE: int = 500  # usuários por upsert
+    USER_STATS_CACHE_TTL: int = 60  # cache de GET /users/stats
+    USER_STATS_REDIS_TTL: int = 2592000  # 30 dias sem atividade: recarrega os totais do banco
+    
+    # Builds populares (sorted sets com decaimento exponencial por janela)
+    POPULAR_BUILDS_WINDOWS: str = "1h,24h,7d"  # sufixos m/h/d
+    POPULAR_BUILDS_DEFAULT_WINDOW: str = "24h"
+    POPULAR_BUILDS_MAX_TRACKED: int = 1000  # combinações jogador+posição mantidas por janela
+    POPULAR_BUILDS_FLUSH_INTERVAL: float = 2.0  # segundos entre gravações no Redis
+    
+    # Dashboard administrativo (snapshot das contagens)
+    ADMIN_STATS_TTL: float = 300.0  # idade máxima do snapshot; depois disso recalcula no próximo acesso
+    ADMIN_STATS_REFRESH_INTERVAL: float = 0.0  # atualização em background (segundos); 0 desativa
+    ADMIN_STATS_COUNT_MODE: str = "exact"  # "planned"/"estimated" para tabelas muito grandes
     
     # JWT
     SECRET_KEY: str
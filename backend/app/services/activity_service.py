@@ -0,0 +1,110 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, List, Optional
+from app.core.config import settings
+from app.services.supabase_service import supabase_service
+
+# Tipos de atividade gravados em user_activities.activity_type
+ACTIVITY_BUILD_QUERY = "build_query"
+ACTIVITY_GAMEPLAY_QUESTION = "gameplay_question"
+ACTIVITY_CARD_SEARCH = "card_search"
+ACTIVITY_CARD_VIEW = "card_view"
+
+
+class ActivityService:
+    """
+    Registro de atividades dos usuários (tabela `user_activities`)
+
+    `record()` só adiciona o evento a um buffer em memória; uma tarefa em
+    background grava em lote (um INSERT por lote) quando o buffer atinge
+    ACTIVITY_BATCH_SIZE ou a cada ACTIVITY_FLUSH_INTERVAL segundos. O buffer é
+    limitado: se o banco ficar fora por muito tempo, os eventos mais antigos
+    são descartados. No shutdown, o que restar é gravado.
+
+    Agregadores (ex: user_stats_service) recebem cada evento via `subscribe()`,
+    mesmo com a gravação em user_activities desativada.
+    """
+
+    def __init__(self):
+        self.enabled = settings.ACTIVITY_LOG_ENABLED
+        self.flush_interval = settings.ACTIVITY_FLUSH_INTERVAL
+        self.batch_size = settings.ACTIVITY_BATCH_SIZE
+        self._pending: Deque[Dict] = deque(maxlen=settings.ACTIVITY_MAX_PENDING)
+        self._dropped = 0
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._flush_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, listener: Callable[[Dict], None]):
+        """Registra uma função chamada (de forma síncrona) a cada evento"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def record(self, user_id: str, activity_type: str, data: Optional[Dict] = None):
+        """Agenda o registro de uma atividade (não bloqueia a requisição)"""
+        event = {
+            "user_id": user_id,
+            "activity_type": activity_type,
+            "activity_data": data,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"⚠️  Erro ao processar atividade: {e}")
+
+        if not self.enabled:
+            return
+        if len(self._pending) == self._pending.maxlen:
+            self._dropped += 1
+        self._pending.append(event)
+        if self._flush_event and len(self._pending) >= self.batch_size:
+            self._flush_event.set()
+
+    async def flush(self):
+        """Grava as atividades pendentes em lotes"""
+        if self._dropped:
+            print(f"⚠️  {self._dropped} atividades descartadas (buffer cheio)")
+            self._dropped = 0
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            try:
+                await supabase_service.table("user_activities").insert(batch).execute()
+            except Exception as e:
+                print(f"⚠️  Erro ao gravar user_activities ({len(batch)} eventos): {e}")
+                # Devolve o lote para o início da fila (o limite do buffer continua valendo)
+                overflow = max(len(batch) - (self._pending.maxlen - len(self._pending)), 0)
+                self._dropped += overflow
+                self._pending.extendleft(reversed(batch[overflow:]))
+                return
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self._flush_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Para a tarefa de escrita e grava o que ainda está no buffer"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+
+activity_service = ActivityService()
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from app.core.config import settings
+from app.services.supabase_service import supabase_service
+
+# Tabela -> campo em "statistics" do dashboard
+COUNTED_TABLES = {
+    "users": "total_users",
+    "cards": "total_cards",
+    "players": "total_players",
+    "builds": "total_builds",
+}
+
+
+class AdminStats:
+    """
+    Snapshot das contagens do dashboard administrativo
+
+    Cada contagem pede `count` ao PostgREST (o total vem no header
+    Content-Range) trazendo no máximo uma linha; as quatro rodam em paralelo.
+    O snapshot é calculado sob demanda e reaproveitado por ADMIN_STATS_TTL
+    segundos (um único recálculo mesmo com vários acessos simultâneos).
+    Opcionalmente, é atualizado em background a cada
+    ADMIN_STATS_REFRESH_INTERVAL segundos.
+
+    ADMIN_STATS_COUNT_MODE: "exact" (COUNT(*)), "planned" (estimativa do
+    planner, O(1)) ou "estimated" (exato até o limite de linhas do PostgREST,
+    estimativa acima disso).
+    """
+
+    def __init__(self):
+        self.ttl = settings.ADMIN_STATS_TTL
+        self.refresh_interval = settings.ADMIN_STATS_REFRESH_INTERVAL
+        self.count_mode = settings.ADMIN_STATS_COUNT_MODE
+        self.snapshot: Optional[Dict] = None
+        self.updated_at: Optional[str] = None
+        self._refreshed_at = 0.0  # time.monotonic() do último cálculo
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _count(self, table: str) -> int:
+        # head=True não serve: o postgrest-py 0.18 descarta o count quando o corpo vem vazio
+        response = await supabase_service.table(table).select("id", count=self.count_mode).limit(1).execute()
+        return response.count or 0
+
+    def _is_fresh(self) -> bool:
+        return self.snapshot is not None and time.monotonic() - self._refreshed_at < self.ttl
+
+    async def refresh(self, only_if_stale: bool = False) -> Dict:
+        """Recalcula as contagens (mantém o valor anterior de tabelas que falharem)"""
+        async with self._lock:
+            # Quem esperou o lock reaproveita o cálculo feito por outra requisição
+            if only_if_stale and self._is_fresh():
+                return self.snapshot
+            results = await asyncio.gather(
+                *(self._count(table) for table in COUNTED_TABLES),
+                return_exceptions=True
+            )
+            snapshot = dict(self.snapshot or {})
+            for (table, field), result in zip(COUNTED_TABLES.items(), results):
+                if isinstance(result, Exception):
+                    print(f"⚠️  Erro ao contar {table}: {result}")
+                    if field not in snapshot:
+                        raise result
+                    continue
+                snapshot[field] = result
+            self.snapshot = snapshot
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+            self._refreshed_at = time.monotonic()
+            return snapshot
+
+    async def get(self) -> Dict:
+        """Snapshot atual (recalcula se não existir ou tiver mais de ADMIN_STATS_TTL segundos)"""
+        if self._is_fresh():
+            return self.snapshot
+        return await self.refresh(only_if_stale=True)
+
+    async def start(self):
+        if self.refresh_interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"⚠️  Erro ao atualizar estatísticas do admin: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+
+admin_stats = AdminStats()
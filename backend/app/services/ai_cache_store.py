@@ -0,0 +1,170 @@
+import asyncio
+import json
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.supabase_service import supabase_service
+from app.services.text_normalizer import stable_hash
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class AICacheStore:
+    """
+    Camada L3 durável para respostas da IA (tabela `ai_cache`)
+
+    - Leitura: busca pelo índice único `prompt_hash` (SHA-256 da chave de cache),
+      ignorando registros expirados
+    - Escrita: write-behind; as respostas entram numa fila em memória e são
+      gravadas em lote (upsert) por uma tarefa em background
+
+    Assim o Redis pode ser limpo ou redimensionado sem pagar o Groq de novo
+    pelas respostas já geradas.
+    """
+
+    def __init__(self):
+        self.prefixes = tuple(p.strip() for p in settings.AI_CACHE_PREFIXES.split(",") if p.strip())
+        self.flush_interval = settings.AI_CACHE_FLUSH_INTERVAL
+        self.batch_size = settings.AI_CACHE_BATCH_SIZE
+        self.max_pending = settings.AI_CACHE_MAX_PENDING
+        self._pending: Dict[str, dict] = {}  # prompt_hash -> registro (última versão vence)
+        self._flush_event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def handles(self, key: str) -> bool:
+        """Apenas respostas geradas pela IA são persistidas"""
+        return key.startswith(self.prefixes)
+
+    def prompt_hash(self, key: str) -> str:
+        return stable_hash(key)
+
+    async def get(self, key: str) -> Optional[Tuple[dict, Optional[int]]]:
+        """Retorna (valor, segundos até expirar) ou None"""
+        found = await self.get_many([key])
+        return found.get(key)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Tuple[dict, Optional[int]]]:
+        """Busca várias chaves em uma única consulta (IN no índice único)"""
+        hashes = {self.prompt_hash(key): key for key in keys}
+
+        # Respostas ainda na fila de escrita
+        found = {}
+        for prompt_hash, key in list(hashes.items()):
+            record = self._pending.get(prompt_hash)
+            if record:
+                found[key] = (json.loads(record["response_text"]), self._remaining(record["expires_at"]))
+                del hashes[prompt_hash]
+        if not hashes:
+            return found
+
+        now = _utc_now().strftime("%Y-%m-%dT%H:%M:%SZ")
+        try:
+            response = await (
+                supabase_service.table("ai_cache")
+                .select("prompt_hash, response_text, expires_at")
+                .in_("prompt_hash", list(hashes))
+                .or_(f"expires_at.is.null,expires_at.gt.{now}")
+                .execute()
+            )
+        except Exception as e:
+            print(f"⚠️  Erro ao ler ai_cache: {e}")
+            return found
+
+        for row in response.data or []:
+            try:
+                value = json.loads(row["response_text"])
+            except (TypeError, ValueError):
+                continue
+            found[hashes[row["prompt_hash"]]] = (value, self._remaining(row.get("expires_at")))
+        return found
+
+    def enqueue(self, key: str, value: dict, expire: int):
+        """Agenda a gravação da resposta (não bloqueia a requisição)"""
+        if len(self._pending) >= self.max_pending:
+            # Fila cheia: descarta (o valor continua no Redis)
+            return
+        prompt_hash = self.prompt_hash(key)
+        self._pending[prompt_hash] = {
+            "prompt_hash": prompt_hash,
+            "response_text": json.dumps(value, ensure_ascii=False),
+            "expires_at": (_utc_now() + timedelta(seconds=expire)).isoformat(),
+        }
+        if self._flush_event and len(self._pending) >= self.batch_size:
+            self._flush_event.set()
+
+    async def delete(self, key: str):
+        await self.delete_many([key])
+
+    async def delete_many(self, keys: List[str]):
+        """Remove as respostas das chaves (um DELETE ... IN no índice único)"""
+        hashes = [self.prompt_hash(key) for key in keys]
+        for prompt_hash in hashes:
+            self._pending.pop(prompt_hash, None)
+        try:
+            await (
+                supabase_service.table("ai_cache")
+                .delete()
+                .in_("prompt_hash", hashes)
+                .execute()
+            )
+        except Exception as e:
+            print(f"⚠️  Erro ao remover do ai_cache: {e}")
+
+    async def flush(self):
+        """Grava as respostas pendentes em lotes (upsert por prompt_hash)"""
+        while self._pending:
+            batch_hashes = list(self._pending)[:self.batch_size]
+            batch = [self._pending.pop(h) for h in batch_hashes]
+            try:
+                await (
+                    supabase_service.table("ai_cache")
+                    .upsert(batch, on_conflict="prompt_hash")
+                    .execute()
+                )
+            except Exception as e:
+                print(f"⚠️  Erro ao gravar ai_cache ({len(batch)} respostas): {e}")
+                # Devolve o lote para a fila (versões mais novas têm prioridade)
+                for record in batch:
+                    self._pending.setdefault(record["prompt_hash"], record)
+                return
+
+    async def start(self):
+        self._flush_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Para a tarefa de escrita e grava o que ainda está na fila"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+    def _remaining(self, expires_at: Optional[str]) -> Optional[int]:
+        expires = _parse_timestamp(expires_at)
+        if expires is None:
+            return None
+        return max(int((expires - _utc_now()).total_seconds()), 0)
+
+
+ai_cache_store = AICacheStore()
@@ -1,100 +1,444 @@
+import asyncio
 import json
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
 from app.core.config import settings
+from app.services.memory_cache import LRUCache
+from app.services.text_normalizer import canonicalize_question, stable_hash
 
 try:
-    import redis
+    import redis.asyncio as aioredis
     REDIS_AVAILABLE = True
 except ImportError:
     REDIS_AVAILABLE = False
 
+# Remove o lease somente se o token ainda for o do dono (evita liberar lease de outro worker)
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Marcador de "valor fresco" para stale-while-revalidate (expira no soft TTL)
+FRESH_MARKER = {"fresh": True}
+
+# Chaves por iteração do SCAN e por UNLINK em invalidate_prefix
+SCAN_BATCH_SIZE = 500
+
 
 class CacheService:
     def __init__(self):
-        self.memory_cache: Dict[str, tuple] = {}  # (value, expire_time)
+        # Fallback em memória limitado (LRU + TTL) para quando o Redis está fora
+        self.memory_cache = LRUCache(
+            max_entries=settings.MEMORY_CACHE_MAX_ENTRIES,
+            max_bytes=settings.MEMORY_CACHE_MAX_BYTES
+        )
+        # L1: cache pequeno por processo, consultado antes do Redis (L2)
+        self.l1: Optional[LRUCache] = None
+        if settings.CACHE_L1_ENABLED:
+            self.l1 = LRUCache(
+                max_entries=settings.CACHE_L1_MAX_ENTRIES,
+                max_bytes=settings.CACHE_L1_MAX_BYTES
+            )
+        self.l1_ttl = settings.CACHE_L1_TTL
+        self.invalidation_channel = settings.CACHE_INVALIDATION_CHANNEL
+        self.instance_id = uuid.uuid4().hex  # ignora as próprias mensagens de invalidação
+        self._listener_task: Optional[asyncio.Task] = None
+        self._release_lease = None
         self.redis_client = None
-        
+        # L3 durável opcional (ver attach_persistent_store)
+        self.persistent_store = None
+        self.persistent_restore_ttl = settings.AI_CACHE_RESTORE_TTL
+        # Prefixo -> (hard TTL, soft TTL) das chaves gravadas com stale-while-revalidate,
+        # usado para recriar o marcador "fresh:" ao restaurar do L3
+        self.soft_ttls: Dict[str, Tuple[int, int]] = {
+            "build:": (settings.BUILD_CACHE_TTL, settings.BUILD_CACHE_SOFT_TTL),
+        }
+        # Tipo de resposta ("build"/"gameplay") -> versão de cada fonte de contexto
+        self._key_sources: Dict[str, Dict[str, str]] = {}
+        self._key_versions: Dict[str, str] = {}
+
         if REDIS_AVAILABLE:
+            # Pool de conexões assíncrono; nenhuma conexão é aberta até connect()
+            self._pool = aioredis.ConnectionPool(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                decode_responses=True,
+                max_connections=settings.REDIS_MAX_CONNECTIONS,
+                socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+            )
+
+    async def connect(self):
+        """Conecta ao Redis (chamado no startup da aplicação)"""
+        if not REDIS_AVAILABLE or self.redis_client:
+            return
+        client = aioredis.Redis(connection_pool=self._pool)
+        try:
+            await client.ping()
+            self.redis_client = client
+            self._release_lease = client.register_script(RELEASE_LEASE_SCRIPT)
+            print("✅ Redis conectado")
+        except Exception as e:
+            print(f"⚠️  Redis não disponível, usando cache em memória: {e}")
+            return
+
+        if self.l1 is not None:
+            self._listener_task = asyncio.create_task(self._listen_invalidations())
+
+    def attach_persistent_store(self, store):
+        """
+        Liga uma camada L3 durável (ex: ai_cache_store) atrás do Redis
+
+        O store precisa implementar handles(key), get_many(keys), enqueue(key, value, expire)
+        e delete_many(keys).
+        """
+        self.persistent_store = store
+
+    async def close(self):
+        """Encerra o listener de invalidação e o pool de conexões"""
+        if self._listener_task:
+            self._listener_task.cancel()
             try:
-                self.redis_client = redis.Redis(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                    db=settings.REDIS_DB,
-                    decode_responses=True,
-                    socket_connect_timeout=2
-                )
-                self.redis_client.ping()
-                print("✅ Redis conectado")
-            except Exception as e:
-                print(f"⚠️  Redis não disponível, usando cache em memória: {e}")
-                self.redis_client = None
-    
-    def get(self, key: str) -> Optional[dict]:
-        """Busca valor no cache (Redis ou memória)"""
-        # Tentar Redis primeiro
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
         if self.redis_client:
+            await self.redis_client.close()
+            await self._pool.disconnect()
+            self.redis_client = None
+
+    async def _listen_invalidations(self):
+        """Escuta invalidações publicadas por outros workers e limpa o L1 local"""
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
             try:
-                data = self.redis_client.get(key)
-                return json.loads(data) if data else None
+                await pubsub.subscribe(self.invalidation_channel)
+                async for message in pubsub.listen():
+                    self._handle_invalidation(message)
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                # Conexão caiu: o L1 segue expirando por TTL até reconectar
+                print(f"⚠️  Listener de invalidação desconectado, tentando novamente: {e}")
+                await pubsub.close()
+                await asyncio.sleep(5)
+
+    def _handle_invalidation(self, message: dict):
+        try:
+            payload = json.loads(message["data"])
+        except (TypeError, ValueError, KeyError):
+            return
+        if payload.get("sender") == self.instance_id:
+            return
+        self._drop_l1(keys=payload.get("keys", []), prefix=payload.get("prefix"))
+
+    def _drop_l1(self, keys: Iterable[str] = (), prefix: Optional[str] = None):
+        if self.l1 is None:
+            return
+        for key in keys:
+            self.l1.delete(key)
+        if prefix:
+            self.l1.delete_prefix(prefix)
+
+    async def _publish_invalidation(self, keys: Iterable[str] = (), prefix: Optional[str] = None):
+        if not self.redis_client or self.l1 is None:
+            return
+        try:
+            await self.redis_client.publish(self.invalidation_channel, json.dumps({
+                "sender": self.instance_id,
+                "keys": list(keys),
+                "prefix": prefix
+            }))
+        except Exception:
+            pass
+
+    async def get(self, key: str, read_through: bool = True) -> Optional[dict]:
+        """Busca valor no cache (L1 do processo, Redis ou memória, e por fim ai_cache)"""
+        found = await self.get_many([key], read_through=read_through)
+        return found.get(key)
+
+    async def get_many(self, keys: List[str], read_through: bool = True) -> Dict[str, dict]:
+        """
+        Busca várias chaves de uma vez (MGET em uma única ida ao Redis)
+
+        Com `read_through=False` o ai_cache não é consultado (ex: polling de
+        quem aguarda outro worker gerar o valor).
+        """
+        found: Dict[str, dict] = {}
+        missing = []
+
+        # L1 local primeiro
+        for key in keys:
+            value = self.l1.get(key) if (self.l1 is not None and self.redis_client) else None
+            if value is not None:
+                found[key] = dict(value)
+            else:
+                missing.append(key)
+
+        # Tentar Redis (L2), populando o L1 na leitura
+        redis_ok = False
+        if missing and self.redis_client:
+            try:
+                still_missing = []
+                for key, data in zip(missing, await self.redis_client.mget(missing)):
+                    if data:
+                        value = json.loads(data)
+                        if self.l1 is not None:
+                            self.l1.set(key, value, ttl=self.l1_ttl)
+                        found[key] = dict(value)
+                    else:
+                        still_missing.append(key)
+                missing = still_missing
+                redis_ok = True
             except Exception:
                 pass
-        
+
         # Fallback para memória
-        if key in self.memory_cache:
-            value, expire_time = self.memory_cache[key]
-            if datetime.now() < expire_time:
-                return value
-            else:
-                del self.memory_cache[key]
-        
-        return None
-    
-    def set(self, key: str, value: dict, expire: int = 3600) -> bool:
-        """Salva valor no cache (Redis ou memória)"""
-        # Tentar Redis primeiro
+        if not redis_ok:
+            still_missing = []
+            for key in missing:
+                value = self.memory_cache.get(key)
+                if value is not None:
+                    found[key] = dict(value)
+                else:
+                    still_missing.append(key)
+            missing = still_missing
+
+        # L3 durável (ai_cache): repopula o Redis com o que encontrar
+        if missing and read_through and self.persistent_store is not None:
+            found.update(await self._read_through(missing))
+
+        return found
+
+    async def _read_through(self, keys: List[str]) -> Dict[str, dict]:
+        handled = [key for key in keys if self.persistent_store.handles(key)]
+        if not handled:
+            return {}
+
+        restored = {}
+        for key, (value, remaining) in (await self.persistent_store.get_many(handled)).items():
+            ttl = min(remaining, self.persistent_restore_ttl) if remaining is not None else self.persistent_restore_ttl
+            if ttl <= 0:
+                continue
+            restored[key] = (value, ttl)
+            fresh_ttl = self._remaining_soft_ttl(key, remaining)
+            if fresh_ttl > 0:
+                restored[self._fresh_key(key)] = (FRESH_MARKER, min(fresh_ttl, ttl))
+        if restored:
+            await self._write(restored)
+        return {key: dict(value) for key, (value, _) in restored.items()}
+
+    def _remaining_soft_ttl(self, key: str, remaining: Optional[int]) -> int:
+        """
+        Quanto resta do soft TTL de um valor restaurado do L3
+
+        O ai_cache guarda só `expires_at`: a idade do valor é o hard TTL menos
+        o tempo restante, e ele continua fresco por soft TTL menos a idade.
+        """
+        if remaining is None:
+            return 0
+        for prefix, (expire, soft_ttl) in self.soft_ttls.items():
+            if key.startswith(prefix):
+                return soft_ttl - (expire - remaining)
+        return 0
+
+    async def _write(self, items: Dict[str, Tuple[dict, int]]):
+        """Grava (valor, ttl) no Redis com um pipeline, ou na memória se o Redis estiver fora"""
         if self.redis_client:
             try:
-                self.redis_client.setex(key, expire, json.dumps(value))
-                return True
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for key, (value, ttl) in items.items():
+                        pipe.setex(key, ttl, json.dumps(value))
+                    await pipe.execute()
+                if self.l1 is not None:
+                    for key, (value, ttl) in items.items():
+                        self.l1.set(key, value, ttl=min(ttl, self.l1_ttl))
+                return
             except Exception:
                 pass
-        
+
         # Fallback para memória
-        expire_time = datetime.now() + timedelta(seconds=expire)
-        self.memory_cache[key] = (value, expire_time)
-        
-        # Limpar cache antigo (máximo 1000 itens)
-        if len(self.memory_cache) > 1000:
-            now = datetime.now()
-            self.memory_cache = {
-                k: v for k, v in self.memory_cache.items()
-                if v[1] > now
-            }
-        
+        for key, (value, ttl) in items.items():
+            self.memory_cache.set(key, value, ttl=ttl)
+
+    async def set(
+        self,
+        key: str,
+        value: dict,
+        expire: int = 3600,
+        soft_ttl: Optional[int] = None
+    ) -> bool:
+        """
+        Salva valor no cache (Redis ou memória)
+
+        Com `soft_ttl`, o valor é considerado fresco por `soft_ttl` segundos e
+        continua sendo servido (stale) até `expire` — ver `get_swr`.
+        Respostas da IA também são gravadas (write-behind) no ai_cache.
+        """
+        items = {key: (value, expire)}
+        if soft_ttl:
+            items[self._fresh_key(key)] = (FRESH_MARKER, min(soft_ttl, expire))
+
+        await self._write(items)
+        await self._publish_invalidation(keys=items.keys())
+
+        if self.persistent_store is not None and self.persistent_store.handles(key):
+            self.persistent_store.enqueue(key, value, expire)
+        return True
+
+    async def set_many(self, items: Dict[str, dict], expire: int = 3600) -> bool:
+        """Salva várias chaves com um pipeline (uma ida ao Redis)"""
+        await self._write({key: (value, expire) for key, value in items.items()})
+        await self._publish_invalidation(keys=items.keys())
         return True
-    
-    def delete(self, key: str) -> bool:
+
+    async def get_swr(self, key: str) -> Tuple[Optional[dict], bool]:
+        """
+        Busca valor salvo com `soft_ttl` (stale-while-revalidate)
+
+        Retorna (valor, stale): `stale` é True quando o soft TTL já passou e o
+        valor deve ser regenerado em background.
+        """
+        fresh_key = self._fresh_key(key)
+        found = await self.get_many([key, fresh_key])
+        value = found.get(key)
+        return value, value is not None and fresh_key not in found
+
+    async def is_fresh(self, key: str) -> bool:
+        """Verifica se o valor ainda está dentro do soft TTL"""
+        return await self.get(self._fresh_key(key)) is not None
+
+    def _fresh_key(self, key: str) -> str:
+        return f"fresh:{key}"
+
+    async def delete(self, key: str) -> bool:
         """Remove valor do cache"""
+        return await self.delete_many([key])
+
+    async def delete_many(self, keys: List[str]) -> bool:
+        """Remove várias chaves (e seus marcadores "fresh:") de todas as camadas, inclusive do ai_cache"""
+        if not keys:
+            return True
+        all_keys = [k for key in keys for k in (key, self._fresh_key(key))]
         if self.redis_client:
             try:
-                self.redis_client.delete(key)
+                await self.redis_client.delete(*all_keys)
             except Exception:
                 pass
-        
-        if key in self.memory_cache:
-            del self.memory_cache[key]
-        
+
+        for key in all_keys:
+            self.memory_cache.delete(key)
+        self._drop_l1(keys=all_keys)
+        await self._publish_invalidation(keys=all_keys)
+
+        if self.persistent_store is not None:
+            persisted = [key for key in keys if self.persistent_store.handles(key)]
+            if persisted:
+                await self.persistent_store.delete_many(persisted)
+
         return True
-    
-    def generate_build_key(self, player_name: str, position: str) -> str:
-        """Gera chave de cache para build"""
-        return f"build:{player_name.lower().strip()}:{position.upper()}"
-    
+
+    async def invalidate_prefix(self, prefix: str):
+        """
+        Remove as chaves com o prefixo do L1 de todos os workers, do Redis
+        (SCAN + UNLINK, incluindo os marcadores "fresh:") e da memória
+
+        O ai_cache não é tocado (lá as chaves são só hashes): para respostas
+        que ele guarda, prefira apagar chaves específicas (`delete_many`) ou
+        mudar a chave (ex: incluir a versão da base).
+        """
+        if self.redis_client:
+            try:
+                for pattern in (f"{prefix}*", f"{self._fresh_key(prefix)}*"):
+                    batch = []
+                    async for key in self.redis_client.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+                        batch.append(key)
+                        if len(batch) >= SCAN_BATCH_SIZE:
+                            await self.redis_client.unlink(*batch)
+                            batch = []
+                    if batch:
+                        await self.redis_client.unlink(*batch)
+            except Exception as e:
+                print(f"⚠️  Erro ao invalidar {prefix}* no Redis: {e}")
+
+        self.memory_cache.delete_prefix(prefix)
+        self.memory_cache.delete_prefix(self._fresh_key(prefix))
+        self._drop_l1(prefix=prefix)
+        self._drop_l1(prefix=self._fresh_key(prefix))
+        await self._publish_invalidation(prefix=prefix)
+        await self._publish_invalidation(prefix=self._fresh_key(prefix))
+
+    async def acquire_lease(self, key: str, token: str, ttl: int) -> bool:
+        """
+        Tenta adquirir o lease de geração de uma chave (SET NX com expiração)
+        Sem Redis, a coordenação é apenas local e o lease é sempre concedido
+        """
+        if self.redis_client:
+            try:
+                return bool(await self.redis_client.set(f"lease:{key}", token, nx=True, ex=ttl))
+            except Exception:
+                pass
+        return True
+
+    async def release_lease(self, key: str, token: str) -> bool:
+        """Libera o lease apenas se ainda pertencer a quem o adquiriu"""
+        if self.redis_client:
+            try:
+                return bool(await self._release_lease(keys=[f"lease:{key}"], args=[token]))
+            except Exception:
+                pass
+        return True
+
+    async def has_lease(self, key: str) -> bool:
+        """Verifica se algum worker está gerando o valor desta chave"""
+        if self.redis_client:
+            try:
+                return bool(await self.redis_client.exists(f"lease:{key}"))
+            except Exception:
+                pass
+        return False
+
+    def set_key_version(self, kind: str, source: str, version: str):
+        """
+        Registra a versão de uma fonte de contexto das respostas de `kind` ("build"/"gameplay")
+
+        A versão combinada das fontes entra na chave: quando a base muda, as
+        respostas antigas deixam de ser encontradas e expiram sozinhas em todas
+        as camadas, sem varrer o Redis nem o ai_cache.
+        """
+        sources = self._key_sources.setdefault(kind, {})
+        sources[source] = version
+        combined = "|".join(f"{name}={sources[name]}" for name in sorted(sources))
+        self._key_versions[kind] = stable_hash(combined)[:12]
+
+    def _key_version(self, kind: str) -> str:
+        return self._key_versions.get(kind, "0")
+
+    def generate_build_key(self, player_id: str, position: str) -> str:
+        """
+        Gera chave de cache para build
+
+        Recebe o ID canônico do jogador e a posição oficial (ver
+        rag_service.resolve_build_query), para que "Neymar", "neymar jr." e
+        "Neymar Jr" caiam na mesma chave. Inclui a versão da base (ver
+        set_key_version).
+        """
+        return f"build:{self._key_version('build')}:{player_id.lower().strip()}:{position.upper()}"
+
     def generate_gameplay_key(self, question: str) -> str:
-        """Gera chave de cache para gameplay (primeiros 100 chars)"""
-        clean_question = question.lower().strip()[:100]
-        return f"gameplay:{hash(clean_question)}"
+        """
+        Gera chave de cache para gameplay
+
+        Usa a forma canônica da pergunta (sem acento, pontuação, stopwords, com
+        stemming) e SHA-256, então a chave é a mesma em todos os workers e restarts.
+        Inclui a versão da base (ver set_key_version).
+        """
+        return f"gameplay:{self._key_version('gameplay')}:{stable_hash(canonicalize_question(question))}"
 
 
 cache_service = CacheService()
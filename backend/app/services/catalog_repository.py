@@ -0,0 +1,144 @@
+from typing import Dict, List, Optional
+from app.services.postgres_service import postgres_service
+from app.services.supabase_service import supabase_service
+
+# SQL fixo por consulta (filtros opcionais via parâmetro NULL): cada um vira
+# um único prepared statement por conexão do pool
+CARD_COLUMNS = (
+    "id, player_id, name, version, card_type, position, overall_rating, image_url, created_at, updated_at"
+)
+BUILD_COLUMNS = (
+    "id, user_id::text AS user_id, card_id, title, shooting, passing, dribbling, dexterity, "
+    "lower_body_strength, aerial_strength, defending, gk_1, gk_2, gk_3, overall_rating, "
+    "is_official_meta, meta_content, created_at, updated_at"
+)
+
+SQL_GET_CARD = f"SELECT {CARD_COLUMNS} FROM cards WHERE id = $1"
+SQL_LIST_CARDS = f"""
+    SELECT {CARD_COLUMNS} FROM cards
+    WHERE ($1::int IS NULL OR player_id = $1)
+      AND ($2::text IS NULL OR position = $2)
+      AND ($3::text IS NULL OR card_type = $3)
+      AND ($4::text IS NULL OR name ILIKE '%' || $4 || '%')
+    ORDER BY overall_rating DESC
+    LIMIT $5 OFFSET $6
+"""
+SQL_GET_PLAYER = "SELECT id, name, nationality, created_at, updated_at FROM players WHERE id = $1"
+SQL_LIST_PLAYERS = """
+    SELECT id, name, nationality, created_at, updated_at FROM players
+    WHERE ($1::text IS NULL OR name ILIKE '%' || $1 || '%')
+      AND ($2::text IS NULL OR nationality = $2)
+    ORDER BY name
+    LIMIT $3 OFFSET $4
+"""
+SQL_GET_BUILD = f"SELECT {BUILD_COLUMNS} FROM builds WHERE id = $1"
+SQL_BUILDS_BY_CARD = f"""
+    SELECT {BUILD_COLUMNS} FROM builds
+    WHERE card_id = $1
+    ORDER BY is_official_meta DESC, created_at DESC
+"""
+SQL_BUILDS_BY_USER = f"""
+    SELECT {BUILD_COLUMNS} FROM builds
+    WHERE user_id = $1::uuid
+    ORDER BY created_at DESC
+"""
+
+
+class CatalogRepository:
+    """
+    Leituras de cartas, jogadores e builds (endpoints mais acessados)
+
+    Usa o pool Postgres (postgres_service) quando disponível; caso contrário,
+    faz a mesma consulta pelo Supabase REST. Escritas e autenticação
+    continuam no Supabase.
+    """
+
+    async def get_card(self, card_id: int) -> Optional[Dict]:
+        if postgres_service.enabled:
+            return await postgres_service.fetchrow(SQL_GET_CARD, card_id)
+        response = await supabase_service.table("cards").select("*").eq("id", card_id).execute()
+        return response.data[0] if response.data else None
+
+    async def list_cards(
+        self,
+        player_id: Optional[int] = None,
+        position: Optional[str] = None,
+        card_type: Optional[str] = None,
+        search: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[Dict]:
+        if postgres_service.enabled:
+            return await postgres_service.fetch(
+                SQL_LIST_CARDS, player_id, position, card_type, search, limit, offset
+            )
+
+        query = supabase_service.table("cards").select("*")
+        if player_id:
+            query = query.eq("player_id", player_id)
+        if position:
+            query = query.eq("position", position)
+        if card_type:
+            query = query.eq("card_type", card_type)
+        if search:
+            query = query.ilike("name", f"%{search}%")
+        response = await query.order("overall_rating", desc=True)\
+            .range(offset, offset + limit - 1)\
+            .execute()
+        return response.data
+
+    async def get_player(self, player_id: int) -> Optional[Dict]:
+        if postgres_service.enabled:
+            return await postgres_service.fetchrow(SQL_GET_PLAYER, player_id)
+        response = await supabase_service.table("players").select("*").eq("id", player_id).execute()
+        return response.data[0] if response.data else None
+
+    async def list_players(
+        self,
+        search: Optional[str] = None,
+        nationality: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> List[Dict]:
+        if postgres_service.enabled:
+            return await postgres_service.fetch(SQL_LIST_PLAYERS, search, nationality, limit, offset)
+
+        query = supabase_service.table("players").select("*")
+        if search:
+            query = query.ilike("name", f"%{search}%")
+        if nationality:
+            query = query.eq("nationality", nationality)
+        response = await query.order("name", desc=False)\
+            .range(offset, offset + limit - 1)\
+            .execute()
+        return response.data
+
+    async def get_build(self, build_id: int) -> Optional[Dict]:
+        if postgres_service.enabled:
+            return await postgres_service.fetchrow(SQL_GET_BUILD, build_id)
+        response = await supabase_service.table("builds").select("*").eq("id", build_id).execute()
+        return response.data[0] if response.data else None
+
+    async def get_builds_by_card(self, card_id: int) -> List[Dict]:
+        if postgres_service.enabled:
+            return await postgres_service.fetch(SQL_BUILDS_BY_CARD, card_id)
+        response = await supabase_service.table("builds")\
+            .select("*")\
+            .eq("card_id", card_id)\
+            .order("is_official_meta", desc=True)\
+            .order("created_at", desc=True)\
+            .execute()
+        return response.data
+
+    async def get_user_builds(self, user_id: str) -> List[Dict]:
+        if postgres_service.enabled:
+            return await postgres_service.fetch(SQL_BUILDS_BY_USER, user_id)
+        response = await supabase_service.table("builds")\
+            .select("*")\
+            .eq("user_id", user_id)\
+            .order("created_at", desc=True)\
+            .execute()
+        return response.data
+
+
+catalog_repository = CatalogRepository()
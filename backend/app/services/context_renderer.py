@@ -0,0 +1,161 @@
+"""
+Formatação dos contextos RAG (markdown enviado ao prompt da IA)
+
+Cada função renderiza uma entrada da base de conhecimento. São chamadas uma
+única vez por entrada quando a base é carregada (ver RAGService), nunca por
+requisição.
+"""
+
+from typing import Dict
+
+
+def render_carta_meta(carta: Dict, position: str) -> str:
+    """Contexto RICO de uma carta meta em uma posição"""
+    build = carta["build_especifica"][position]
+
+    context = f"### 🔥 CARTA META: {carta['jogador']} ({carta['versao']}) - {position}\n\n"
+    context += f"**Por que é Meta?** {carta['por_que_e_meta']}\n\n"
+    context += f"**Playstyle Recomendado**: {build['playstyle_recomendado']}\n\n"
+    context += "**Distribuição de Pontos**:\n"
+
+    for item in build["distribuicao"]:
+        context += f"- {item['atributo']}: {item['pontos']} pontos"
+        context += f" (💡 {item['justificativa']})\n"
+
+    context += f"\n**Dicas Táticas do Pro Player**:\n"
+    for dica in build.get("dicas_taticas", []):
+        context += f"• {dica}\n"
+
+    context += f"\n**Quando Usar**: {carta['quando_usar']}\n"
+    context += f"\n**Comentário do Pro**: \"{carta['comentario_pro']}\"\n"
+
+    return context
+
+
+def render_regra_posicao(regra: Dict) -> str:
+    """Build padrão de uma posição (primeiro estilo disponível)"""
+    # TODO: Detectar estilo baseado em atributos do jogador
+    estilos = regra["estilos"]
+    primeiro_estilo = list(estilos.keys())[0]
+    estilo_data = estilos[primeiro_estilo]
+
+    context = f"### Build Padrão para {regra['nome_posicao']} ({primeiro_estilo})\n\n"
+    context += f"**Descrição**: {estilo_data['descricao']}\n\n"
+    context += "**Prioridades de Build**:\n"
+
+    for i in range(1, 4):
+        prio_key = f"prioridade_{i}"
+        if prio_key in estilo_data:
+            prio = estilo_data[prio_key]
+            context += f"{i}. {prio['atributo']}: {prio['pontos_sugeridos']} pontos "
+            context += f"(mínimo {prio['minimo']})\n"
+
+    context += f"\n**Atributos a Ignorar**: {', '.join(estilo_data.get('ignorar', []))}\n"
+    context += f"\n**Dica Tática**: {estilo_data.get('dica_tatica', 'N/A')}\n"
+
+    return context
+
+
+def render_build_guia(player: Dict, position: str) -> str:
+    """Build do arquivo antigo (builds_guide.json)"""
+    build_data = player["positions"][position]
+
+    context = f"### Build Oficial do Pro Player para {player['name']} - {position}\n\n"
+    context += f"**Playstyle**: {build_data.get('playstyle', 'N/A')}\n\n"
+    context += "**Distribuição de Pontos Prioritários**:\n"
+
+    for skill in build_data.get("priority_points", []):
+        context += f"- {skill['skill']}: {skill['points']} pontos\n"
+
+    context += f"\n**Dicas Táticas**: {build_data.get('tips', 'N/A')}\n"
+
+    return context
+
+
+def render_problema(problema: Dict) -> str:
+    """Contexto DETALHADO de um problema de gameplay (sintoma → solução)"""
+    context = f"### 🎯 Problema Identificado: {problema['sintoma']}\n\n"
+    context += f"**Categoria**: {problema['categoria']}\n"
+    context += f"**Gravidade**: {problema['gravidade']}\n\n"
+    context += f"**Causa Raiz**: {problema['causa_raiz']}\n\n"
+
+    solucao = problema.get("solucao", {})
+    context += "**Solução Passo a Passo**:\n"
+    for passo in solucao.get("passos", []):
+        context += f"{passo}\n"
+
+    context += f"\n**Comandos Específicos**: {solucao.get('comandos_especificos', 'N/A')}\n"
+    context += f"\n**Erro Comum**: {solucao.get('erro_comum', 'N/A')}\n"
+    context += f"\n**Dica Extra**: {solucao.get('dica_extra', 'N/A')}\n"
+    context += f"\n**Efetividade**: {problema.get('efetividade', 'N/A')}\n"
+
+    return context
+
+
+def render_faq(faq: Dict) -> str:
+    """Dica do Pro Player (FAQs antigas)"""
+    context = f"### Dica do Pro Player\n\n"
+    context += f"**Categoria**: {faq.get('category', 'Geral')}\n\n"
+    context += f"**Resposta**: {faq['answer']}\n\n"
+
+    if faq.get("video_url"):
+        context += f"**Tutorial em Vídeo**: {faq['video_url']}\n"
+
+    return context
+
+
+def render_tip(tip: Dict) -> str:
+    """Dica cadastrada na tabela gameplay_tips"""
+    context = f"### 💡 Dica: {tip['title']}\n\n"
+    context += f"**Categoria**: {tip.get('category', 'Geral')}\n\n"
+
+    if tip.get("pain_description"):
+        context += f"**Problema**: {tip['pain_description']}\n\n"
+
+    context += f"**Solução**: {tip['solution']}\n"
+
+    return context
+
+
+# Pontos de progressão da tabela builds (coluna → nome exibido)
+BUILD_ATTRIBUTES = {
+    "shooting": "Shooting",
+    "passing": "Passing",
+    "dribbling": "Dribbling",
+    "dexterity": "Dexterity",
+    "lower_body_strength": "Lower Body Strength",
+    "aerial_strength": "Aerial Strength",
+    "defending": "Defending",
+    "gk_1": "GK 1",
+    "gk_2": "GK 2",
+    "gk_3": "GK 3",
+}
+
+
+def render_meta_build(build: Dict, player_name: str, position: str) -> str:
+    """Build meta oficial cadastrada na tabela builds (is_official_meta + meta_content)"""
+    meta = build.get("meta_content") or {}
+
+    context = f"### 🔥 BUILD META: {player_name} - {position} ({build['title']})\n\n"
+    if meta.get("playstyle"):
+        context += f"**Playstyle Recomendado**: {meta['playstyle']}\n\n"
+    context += "**Distribuição de Pontos**:\n"
+
+    for column, atributo in BUILD_ATTRIBUTES.items():
+        if build.get(column):
+            context += f"- {atributo}: {build[column]} pontos\n"
+    if build.get("overall_rating"):
+        context += f"\n**Overall Final**: {build['overall_rating']}\n"
+
+    for key, value in meta.items():
+        if key in ("playstyle", "posicao_ideal"):
+            continue
+        titulo = key.replace("_", " ").capitalize()
+        if isinstance(value, list):
+            context += f"\n**{titulo}**:\n"
+            for item in value:
+                context += f"• {item}\n"
+        else:
+            context += f"\n**{titulo}**: {value}\n"
+
+    return context
@@ -0,0 +1,189 @@
+import asyncio
+import copy
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.services.context_renderer import render_tip
+from app.services.embeddings import NUMPY_AVAILABLE, HashedNgramVectorizer
+from app.services.knowledge_base import KnowledgeBaseSnapshot, gameplay_documents
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+
+class _TipsIndex:
+    """
+    Embeddings das dicas (gameplay_tips), atualizados linha a linha
+
+    Cada dica ocupa um slot da matriz; uma dica removida zera o slot, que é
+    reaproveitado pela próxima inserção. A matriz dobra de tamanho quando enche.
+    """
+
+    def __init__(self, vectorizer: HashedNgramVectorizer, capacity: int = 64):
+        self.vectorizer = vectorizer
+        self.matrix = np.zeros((capacity, vectorizer.dim), dtype=np.float32)
+        self.keys: List[Optional[str]] = [None] * capacity
+        self.contexts: List[Optional[str]] = [None] * capacity
+        self.slots: Dict[int, int] = {}  # id da dica -> slot
+        self.free: List[int] = []
+        self.size = 0  # slots já usados (ocupados ou livres)
+
+    def _grow(self):
+        capacity = len(self.keys) * 2
+        matrix = np.zeros((capacity, self.vectorizer.dim), dtype=np.float32)
+        matrix[:self.size] = self.matrix[:self.size]
+        self.matrix = matrix
+        self.keys += [None] * (capacity - len(self.keys))
+        self.contexts += [None] * (capacity - len(self.contexts))
+
+    def upsert(self, tip: Dict):
+        slot = self.slots.get(tip["id"])
+        if slot is None:
+            if self.free:
+                slot = self.free.pop()
+            else:
+                if self.size == len(self.keys):
+                    self._grow()
+                slot = self.size
+                self.size += 1
+            self.slots[tip["id"]] = slot
+
+        text = f"{tip['title']} {tip.get('pain_description') or ''} {tip.get('category', '')}"
+        self.matrix[slot] = self.vectorizer.transform(text)
+        self.keys[slot] = f"tip:{tip['id']}"
+        self.contexts[slot] = sys.intern(render_tip(tip))
+
+    def remove(self, tip_id: int):
+        slot = self.slots.pop(tip_id, None)
+        if slot is not None:
+            self.matrix[slot] = 0
+            self.keys[slot] = self.contexts[slot] = None
+            self.free.append(slot)
+
+    def copy(self) -> "_TipsIndex":
+        clone = copy.copy(self)
+        clone.matrix = self.matrix.copy()
+        clone.keys = list(self.keys)
+        clone.contexts = list(self.contexts)
+        clone.slots = dict(self.slots)
+        clone.free = list(self.free)
+        return clone
+
+
+class _DenseIndex:
+    """
+    Embeddings de uma versão da base (problemas + FAQs) e das dicas
+
+    Nunca é alterado depois de publicado: mudanças geram uma cópia que
+    substitui a referência em DenseRetriever.index.
+    """
+
+    def __init__(self, kb: KnowledgeBaseSnapshot, dim: int, tips: Iterable[Dict] = ()):
+        self.kb = kb
+        self.keys, texts, self.contexts = gameplay_documents(kb)
+
+        artifact = kb.artifact
+        if (
+            artifact is not None
+            and artifact.has_array("dense_matrix")
+            and artifact.load_array("dense_idf").shape == (dim,)
+        ):
+            # Matriz do artefato: somente leitura, sem cópia (mmap)
+            self.vectorizer = HashedNgramVectorizer(dim, include_words=True, idf=artifact.load_array("dense_idf"))
+            self.matrix = artifact.load_array("dense_matrix")
+        else:
+            self.vectorizer = HashedNgramVectorizer(dim, include_words=True).fit(texts)
+            self.matrix = self.vectorizer.transform_many(texts)
+
+        # Vetorizador novo: IDF mudou, todas as dicas são reprocessadas
+        self.tips = _TipsIndex(self.vectorizer)
+        for tip in tips:
+            self.tips.upsert(tip)
+
+    def with_tips(self, upserted: List[Dict], removed: List[int]) -> "_DenseIndex":
+        """Cópia com as dicas alteradas (só as linhas recebidas são recalculadas)"""
+        tips = self.tips.copy()
+        for tip in upserted:
+            tips.upsert(tip)
+        for tip_id in removed:
+            tips.remove(tip_id)
+        index = copy.copy(self)
+        index.tips = tips
+        return index
+
+
+class DenseRetriever:
+    """
+    Busca vetorial local (CPU) sobre problemas, FAQs e a tabela gameplay_tips
+
+    Cada documento vira um vetor TF-IDF (n-gramas de caracteres + palavras)
+    em uma matriz NumPy; a busca é um produto matriz-vetor seguido de top-k.
+    Ao contrário do BM25, encontra entradas parecidas mesmo sem palavras
+    idênticas (plural, conjugação, erros de digitação).
+
+    O índice é montado fora do event loop (recarga da base ou sincronização
+    das dicas) e publicado com uma troca de referência; `search()` só lê.
+    """
+
+    def __init__(self):
+        self.enabled = NUMPY_AVAILABLE and settings.RAG_DENSE_ENABLED
+        self.dim = settings.RAG_DENSE_DIM
+        self.min_score = settings.RAG_DENSE_MIN_SCORE
+        self.index: Optional[_DenseIndex] = None
+        self._tips: Dict[int, Dict] = {}  # id -> linha de gameplay_tips
+        self._lock = asyncio.Lock()  # uma construção por vez (nenhuma alteração se perde)
+
+    def build_index(self, kb: KnowledgeBaseSnapshot, tips: Iterable[Dict] = ()) -> _DenseIndex:
+        """Monta o índice de uma versão da base (CPU; chamar fora do event loop)"""
+        return _DenseIndex(kb, self.dim, tips)
+
+    async def rebuild(self, kb: KnowledgeBaseSnapshot):
+        """Monta o índice da versão `kb` em uma thread e troca a referência"""
+        if not self.enabled:
+            return
+        async with self._lock:
+            self.index = await asyncio.to_thread(self.build_index, kb, list(self._tips.values()))
+
+    async def update_tips(self, upserted: List[Dict], removed: List[int]):
+        """Aplica dicas novas/alteradas e removidas em uma cópia do índice e troca a referência"""
+        for tip in upserted:
+            self._tips[tip["id"]] = tip
+        for tip_id in removed:
+            self._tips.pop(tip_id, None)
+        if not self.enabled or not (upserted or removed):
+            return
+        async with self._lock:
+            index = self.index
+            if index is not None:  # sem índice, a próxima construção já inclui as dicas
+                self.index = await asyncio.to_thread(index.with_tips, upserted, removed)
+
+    def search(self, question: str, k: int = 3) -> List[Tuple[float, str, str]]:
+        """Top-k (score, chave, contexto) com similaridade de cosseno >= RAG_DENSE_MIN_SCORE"""
+        index = self.index
+        if not self.enabled or index is None:
+            return []
+
+        query = index.vectorizer.transform(question)
+
+        scores = index.matrix @ query
+        keys, contexts = index.keys, index.contexts
+        size = index.tips.size
+        if size:
+            scores = np.concatenate([scores, index.tips.matrix[:size] @ query])
+            keys = keys + index.tips.keys[:size]
+            contexts = contexts + index.tips.contexts[:size]
+
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(scores[top])[::-1]]
+
+        return [
+            (float(scores[i]), keys[i], contexts[i])
+            for i in top
+            if scores[i] >= self.min_score and keys[i] is not None
+        ]
+
+
+dense_retriever = DenseRetriever()
@@ -0,0 +1,73 @@
+import math
+import zlib
+from typing import Dict, List, Optional
+from app.services.text_normalizer import normalize_tokens, tokenize
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Tamanhos dos n-gramas de caracteres usados no vetor
+NGRAM_SIZES = (3, 4)
+
+
+class HashedNgramVectorizer:
+    """
+    Vetorizador local (CPU) de texto: TF-IDF de n-gramas de caracteres
+    com hashing trick
+
+    O texto passa pela mesma normalização das chaves de cache (sem acento,
+    stopwords e com stemming), então "finalizações" e "finalizar" compartilham
+    quase todos os n-gramas. O hash é crc32, estável entre workers.
+
+    Com `include_words`, as palavras normalizadas também viram features (útil
+    para textos mais longos, como os da base de conhecimento).
+    """
+
+    def __init__(self, dim: int, include_words: bool = False, idf: Optional["np.ndarray"] = None):
+        self.dim = dim
+        self.include_words = include_words
+        self.idf = idf if idf is not None else np.ones(dim, dtype=np.float32)
+
+    def _buckets(self, text: str) -> Dict[int, int]:
+        tokens = normalize_tokens(text) or tokenize(text)
+        padded = f" {' '.join(tokens)} "
+        counts: Dict[int, int] = {}
+        for n in NGRAM_SIZES:
+            for i in range(len(padded) - n + 1):
+                bucket = zlib.crc32(padded[i:i + n].encode("utf-8")) % self.dim
+                counts[bucket] = counts.get(bucket, 0) + 1
+        if self.include_words:
+            for token in tokens:
+                bucket = zlib.crc32(f"w:{token}".encode("utf-8")) % self.dim
+                counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    def fit(self, documents: List[str]):
+        """Calcula o IDF de cada bucket a partir de um corpus de referência"""
+        df = np.zeros(self.dim, dtype=np.float32)
+        for doc in documents:
+            df[list(self._buckets(doc))] += 1
+        total = len(documents)
+        # Buckets que não aparecem no corpus recebem o IDF máximo
+        self.idf = (np.log((1 + total) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, text: str) -> "np.ndarray":
+        """Vetor L2-normalizado (cosseno = produto escalar)"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for bucket, count in self._buckets(text).items():
+            vector[bucket] = (1 + math.log(count)) * self.idf[bucket]
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def transform_many(self, texts: List[str]) -> "np.ndarray":
+        """Matriz (len(texts), dim), uma linha por texto"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            matrix[row] = self.transform(text)
+        return matrix
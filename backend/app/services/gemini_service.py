@@ -1,24 +1,70 @@
-from groq import Groq
+import asyncio
+import httpx
+from groq import AsyncGroq
 from app.core.config import settings
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
 
 class GeminiService:
     def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
-        self.model = "llama-3.3-70b-versatile"
-    
-    async def generate_build_response(
+        self.model = settings.GROQ_MODEL
+        self.timeout = settings.GROQ_TIMEOUT_SECONDS
+
+        # Cliente HTTP compartilhado (pool de conexões keep-alive) para todas as chamadas
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=5.0)
+        )
+        self.client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            timeout=self.timeout,
+            max_retries=settings.GROQ_MAX_RETRIES,
+            http_client=self.http_client
+        )
+
+        # Limita chamadas simultâneas ao Groq por worker (evita estourar rate limit)
+        self._semaphore = asyncio.Semaphore(settings.GROQ_MAX_CONCURRENCY)
+
+    async def _complete(self, messages: List[Dict[str, str]], temperature: float = 0.7) -> str:
+        """Executa uma chamada de chat completion sem bloquear o event loop"""
+        async with self._semaphore:
+            completion = await self.client.chat.completions.create(
+                messages=messages,
+                model=self.model,
+                temperature=temperature,
+                timeout=self.timeout,
+            )
+        return completion.choices[0].message.content
+
+    async def _stream(self, messages: List[Dict[str, str]], temperature: float = 0.7) -> AsyncIterator[str]:
+        """Executa uma chamada de chat completion em modo streaming, devolvendo os tokens"""
+        async with self._semaphore:
+            stream = await self.client.chat.completions.create(
+                messages=messages,
+                model=self.model,
+                temperature=temperature,
+                timeout=self.timeout,
+                stream=True,
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    yield token
+
+    def _build_messages(
         self,
         player_name: str,
         position: str,
         context: Optional[str] = None
-    ) -> str:
-        """
-        Gera resposta sobre build de carta usando Groq AI
-        """
+    ) -> List[Dict[str, str]]:
+        """Monta o prompt de build de carta"""
         system_prompt = "Você é um especialista em eFootball que ajuda jogadores a montar builds de cartas. Responda em português do Brasil, de forma clara e objetiva."
-        
+
         newline = "\n"
         context_text = f"Contexto adicional do Pro Player:{newline}{context}{newline}" if context else ""
         user_prompt = f"""
@@ -33,26 +79,19 @@ Forneça uma build detalhada com:
 3. Dicas táticas de como usar esse jogador
 """
 
-        completion = self.client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=self.model,
-            temperature=0.7,
-        )
-        return completion.choices[0].message.content
-    
-    async def generate_gameplay_response(
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _gameplay_messages(
         self,
         question: str,
         context: Optional[str] = None
-    ) -> str:
-        """
-        Gera resposta sobre gameplay usando Groq AI
-        """
+    ) -> List[Dict[str, str]]:
+        """Monta o prompt de dúvida de gameplay"""
         system_prompt = "Você é um coach profissional de eFootball que ajuda jogadores a melhorarem seu gameplay. Responda em português do Brasil."
-        
+
         context_text = f"Dicas do Pro Player:\n{context}\n" if context else ""
         user_prompt = f"""
 Pergunta do jogador: {question}
@@ -66,26 +105,62 @@ Forneça uma resposta:
 4. Dicas extras se aplicável
 """
 
-        completion = self.client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            model=self.model,
-            temperature=0.7,
-        )
-        return completion.choices[0].message.content
-    
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    async def generate_build_response(
+        self,
+        player_name: str,
+        position: str,
+        context: Optional[str] = None
+    ) -> str:
+        """
+        Gera resposta sobre build de carta usando Groq AI
+        """
+        return await self._complete(self._build_messages(player_name, position, context))
+
+    async def generate_gameplay_response(
+        self,
+        question: str,
+        context: Optional[str] = None
+    ) -> str:
+        """
+        Gera resposta sobre gameplay usando Groq AI
+        """
+        return await self._complete(self._gameplay_messages(question, context))
+
+    def stream_build_response(
+        self,
+        player_name: str,
+        position: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Gera resposta sobre build token a token (streaming)
+        """
+        return self._stream(self._build_messages(player_name, position, context))
+
+    def stream_gameplay_response(
+        self,
+        question: str,
+        context: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Gera resposta sobre gameplay token a token (streaming)
+        """
+        return self._stream(self._gameplay_messages(question, context))
+
     async def simple_query(self, prompt: str) -> str:
         """Query genérica ao Groq"""
-        completion = self.client.chat.completions.create(
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            model=self.model,
-            temperature=0.7,
-        )
-        return completion.choices[0].message.content
+        return await self._complete([
+            {"role": "user", "content": prompt}
+        ])
+
+    async def close(self):
+        """Fecha o pool HTTP compartilhado (chamado no shutdown da aplicação)"""
+        await self.http_client.aclose()
 
 
 # Mantendo o nome da instância para compatibilidade com o resto do código
@@ -0,0 +1,195 @@
+"""
+Artefato binário compilado da base de conhecimento
+
+Layout do arquivo:
+    MAGIC (8 bytes) | tamanho do cabeçalho (uint64 LE) | cabeçalho JSON | seções
+
+Cada seção começa alinhada em SECTION_ALIGNMENT bytes e é de um tipo:
+- "pickle": JSON de um arquivo da base + parte compilada (índices, contextos)
+- "ndarray": matriz NumPy crua (ex: embeddings), lida sem cópia via mmap
+
+O cabeçalho guarda o SHA-256 de cada JSON de origem; se algum mudou, o
+artefato é ignorado e a base é compilada a partir dos JSON.
+
+Só as seções "ndarray" são compartilhadas entre os workers: as "pickle"
+(índices BM25, contextos, índice de nomes) passam por pickle.loads no
+primeiro acesso e viram objetos Python na memória privada de cada worker.
+O artefato poupa o parsing e a compilação dos JSON, não essa memória; hoje
+essas seções somam dezenas de KB, contra centenas de KB da matriz densa.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+from app.services.embeddings import HashedNgramVectorizer
+from app.services.knowledge_base import (
+    KB_FILES, KNOWLEDGE_BASE_PATH, KnowledgeBaseSnapshot, LazyFiles, file_stamp, gameplay_documents
+)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+MAGIC = b"EFKBART1"
+FORMAT_VERSION = 2  # 2: formações ("4-2-3-1") viram um token só nos índices
+SECTION_ALIGNMENT = 64
+ARTIFACT_PATH = KNOWLEDGE_BASE_PATH / "compiled" / "knowledge_base.bin"
+DENSE_DIM = 4096  # mesmo padrão de settings.RAG_DENSE_DIM
+
+
+def source_hashes(base_path: Path = KNOWLEDGE_BASE_PATH) -> Dict[str, Optional[str]]:
+    """SHA-256 de cada arquivo JSON da base (None se não existir)"""
+    hashes = {}
+    for name, relative_path in KB_FILES.items():
+        path = base_path / relative_path
+        hashes[name] = hashlib.sha256(path.read_bytes()).hexdigest() if path.exists() else None
+    return hashes
+
+
+def build_dense_arrays(snapshot: KnowledgeBaseSnapshot, dim: int = DENSE_DIM) -> Dict[str, "np.ndarray"]:
+    """IDF e matriz de embeddings de problemas + FAQs (usados pelo DenseRetriever)"""
+    _, texts, _ = gameplay_documents(snapshot)
+    vectorizer = HashedNgramVectorizer(dim, include_words=True).fit(texts)
+    return {"dense_idf": vectorizer.idf, "dense_matrix": vectorizer.transform_many(texts)}
+
+
+def _align(offset: int) -> int:
+    return (offset + SECTION_ALIGNMENT - 1) // SECTION_ALIGNMENT * SECTION_ALIGNMENT
+
+
+def write_artifact(
+    snapshot: KnowledgeBaseSnapshot,
+    path: Path = ARTIFACT_PATH,
+    base_path: Path = KNOWLEDGE_BASE_PATH,
+    arrays: Optional[Dict[str, "np.ndarray"]] = None
+) -> Dict:
+    """
+    Grava o snapshot (e matrizes extras) em um único arquivo versionado
+
+    A escrita vai para um arquivo temporário e é trocada com os.replace, então
+    workers que já mapearam a versão anterior não são afetados.
+    """
+    blobs = []
+    for name in KB_FILES:
+        blob = pickle.dumps((snapshot.data[name], snapshot.parts[name]), protocol=pickle.HIGHEST_PROTOCOL)
+        blobs.append((f"file:{name}", {"kind": "pickle"}, blob))
+    for name, array in (arrays or {}).items():
+        array = np.ascontiguousarray(array)
+        meta = {"kind": "ndarray", "dtype": array.dtype.str, "shape": list(array.shape)}
+        blobs.append((f"array:{name}", meta, array.tobytes()))
+
+    # Offsets dependem do tamanho do cabeçalho: reserva espaço e ajusta
+    header = {
+        "format": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sources": source_hashes(base_path),
+        "sections": {},
+    }
+    header_bytes = b""
+    while True:
+        offset = _align(len(MAGIC) + 8 + len(header_bytes))
+        sections = {}
+        for section_name, meta, blob in blobs:
+            sections[section_name] = {**meta, "offset": offset, "length": len(blob)}
+            offset = _align(offset + len(blob))
+        header["sections"] = sections
+        encoded = json.dumps(header, sort_keys=True).encode("utf-8")
+        stable = len(encoded) == len(header_bytes)
+        header_bytes = encoded
+        if stable:
+            break
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for section_name, _, blob in blobs:
+            f.seek(header["sections"][section_name]["offset"])
+            f.write(blob)
+    os.replace(tmp_path, path)
+    return header
+
+
+class KnowledgeBaseArtifact:
+    """
+    Leitura do artefato via mmap
+
+    As páginas do arquivo são compartilhadas entre os workers, mas só
+    load_array devolve dados sem cópia; load_file desserializa para a
+    memória do próprio worker.
+    """
+
+    def __init__(self, path: Path = ARTIFACT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} não é um artefato da base de conhecimento")
+        (header_length,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[start:start + header_length])
+        if self.header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Formato de artefato não suportado: {self.header.get('format')}")
+
+    def is_current(self, base_path: Path = KNOWLEDGE_BASE_PATH) -> bool:
+        """O artefato foi compilado a partir dos JSON atuais?"""
+        return self.header["sources"] == source_hashes(base_path)
+
+    def _section(self, name: str) -> memoryview:
+        section = self.header["sections"][name]
+        return memoryview(self._mmap)[section["offset"]:section["offset"] + section["length"]]
+
+    def load_file(self, name: str):
+        """(JSON, parte compilada) de um arquivo da base (cópia privada do worker)"""
+        return pickle.loads(self._section(f"file:{name}"))
+
+    def has_array(self, name: str) -> bool:
+        return f"array:{name}" in self.header["sections"]
+
+    def load_array(self, name: str) -> "np.ndarray":
+        """Matriz somente leitura apontando direto para o mmap (sem cópia)"""
+        section = self.header["sections"][f"array:{name}"]
+        dtype = np.dtype(section["dtype"])
+        count = section["length"] // dtype.itemsize
+        array = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=section["offset"])
+        return array.reshape(section["shape"])
+
+    def snapshot(self, base_path: Path = KNOWLEDGE_BASE_PATH) -> KnowledgeBaseSnapshot:
+        """
+        Snapshot cujas seções só são desserializadas no primeiro acesso
+
+        Os stamps (mtime/tamanho) são os dos arquivos atuais, então o watcher
+        só recompila o que mudar depois da carga.
+        """
+        stamps = {name: file_stamp(base_path / relative_path) for name, relative_path in KB_FILES.items()}
+        entries = {name: (lambda name=name: self.load_file(name)) for name in KB_FILES}
+        return KnowledgeBaseSnapshot(1, stamps, LazyFiles(entries), artifact=self, digests=self.header["sources"])
+
+
+def load_artifact_snapshot(
+    path: Path = ARTIFACT_PATH,
+    base_path: Path = KNOWLEDGE_BASE_PATH
+) -> Optional[KnowledgeBaseSnapshot]:
+    """Snapshot a partir do artefato compilado, ou None se ausente/desatualizado"""
+    if not path.exists():
+        return None
+    try:
+        artifact = KnowledgeBaseArtifact(path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Artefato da base de conhecimento inválido, compilando JSON: {e}")
+        return None
+    if not artifact.is_current(base_path):
+        print("⚠️  Artefato da base de conhecimento desatualizado, compilando JSON")
+        return None
+    return artifact.snapshot(base_path)
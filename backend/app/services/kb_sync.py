@@ -0,0 +1,210 @@
+import asyncio
+import sys
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.context_renderer import render_meta_build
+from app.services.dense_retrieval import dense_retriever
+from app.services.name_resolver import PlayerNameIndex, name_slug, resolve_position
+from app.services.supabase_service import supabase_service
+from app.services.text_normalizer import stable_hash
+
+TIP_COLUMNS = "id, category, title, pain_description, solution, updated_at"
+BUILD_COLUMNS = (
+    "id, title, shooting, passing, dribbling, dexterity, lower_body_strength, aerial_strength, "
+    "defending, gk_1, gk_2, gk_3, overall_rating, is_official_meta, meta_content, updated_at, "
+    "cards(name, position)"
+)
+
+
+class DatabaseKnowledge:
+    """
+    Versão imutável das builds meta do banco, no formato usado pelo RAGService
+
+    Como o KnowledgeBaseSnapshot, nunca é alterada: a sincronização monta uma
+    nova e troca a referência.
+    """
+
+    def __init__(self, contextos: Dict[Tuple[str, str], str], player_names: PlayerNameIndex):
+        self.contextos = contextos  # (ID do jogador, posição) -> contexto
+        self.player_names = player_names
+
+
+class KnowledgeSync:
+    """
+    Sincronização incremental da base de conhecimento do banco
+
+    - gameplay_tips: dicas cadastradas pelos admins (busca vetorial)
+    - builds com is_official_meta: meta_content vira contexto de build
+
+    Cada rodada busca só as linhas com updated_at >= último visto (mantido
+    pelo trigger set_updated_at do banco) e reprocessa apenas as que mudaram. Como o schema não guarda exclusões,
+    a cada KB_DB_RECONCILE_EVERY rodadas os IDs existentes são comparados
+    com os indexados para remover as linhas apagadas.
+    """
+
+    def __init__(self):
+        self.snapshot = DatabaseKnowledge({}, PlayerNameIndex().build())
+        self._tips: Dict[int, str] = {}  # id -> updated_at
+        self._builds: Dict[int, Dict] = {}  # id -> linha
+        # id -> ((ID do jogador, posição), contexto, nome do jogador)
+        self._build_contexts: Dict[int, Tuple[Tuple[str, str], str, str]] = {}
+        self._cursors: Dict[str, Optional[str]] = {"gameplay_tips": None, "builds": None}
+        self._rounds = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _fetch(self, table: str, columns: str, since: Optional[str] = None, **filters) -> List[Dict]:
+        """Linhas da tabela (com updated_at >= since), paginadas por offset"""
+        page_size = settings.KB_DB_SYNC_PAGE_SIZE
+        rows: List[Dict] = []
+        while True:
+            query = supabase_service.table(table).select(columns)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            if since is not None:
+                query = query.gte("updated_at", since)
+            query = query.order("updated_at").order("id").range(len(rows), len(rows) + page_size - 1)
+            response = await query.execute()
+            rows.extend(response.data or [])
+            if len(response.data or []) < page_size:
+                return rows
+
+    def _advance(self, table: str, rows: List[Dict]):
+        if rows:
+            latest = max(row["updated_at"] for row in rows)
+            cursor = self._cursors[table]
+            self._cursors[table] = latest if cursor is None else max(cursor, latest)
+
+    async def _sync_tips(self, reconcile: bool) -> bool:
+        rows = await self._fetch("gameplay_tips", TIP_COLUMNS, self._cursors["gameplay_tips"])
+        self._advance("gameplay_tips", rows)
+
+        # O cursor é inclusivo (>=): linhas já vistas com o mesmo updated_at são ignoradas
+        changed = [row for row in rows if self._tips.get(row["id"]) != row["updated_at"]]
+        for row in changed:
+            self._tips[row["id"]] = row["updated_at"]
+
+        removed = []
+        if reconcile:
+            existing = {row["id"] for row in await self._fetch("gameplay_tips", "id, updated_at")}
+            removed = [tip_id for tip_id in self._tips if tip_id not in existing]
+            for tip_id in removed:
+                del self._tips[tip_id]
+
+        # Embeddings recalculados numa cópia do índice, fora do event loop
+        await dense_retriever.update_tips(changed, removed)
+        return bool(changed or removed)
+
+    def _tips_version(self) -> str:
+        """Versão das dicas sincronizadas (a mesma em todos os workers que viram as mesmas linhas)"""
+        return stable_hash("|".join(f"{tip_id}={self._tips[tip_id]}" for tip_id in sorted(self._tips)))[:12]
+
+    def _render_build(self, build: Dict) -> Optional[Tuple[Tuple[str, str], str, str]]:
+        card = build.get("cards") or {}
+        meta = build.get("meta_content") or {}
+        position = meta.get("posicao_ideal") or card.get("position")
+        if not card.get("name") or not position:
+            return None
+        position = resolve_position(position)
+        context = sys.intern(render_meta_build(build, card["name"], position))
+        return (name_slug(card["name"]), position), context, card["name"]
+
+    async def _sync_builds(self, reconcile: bool) -> List[Tuple[str, str]]:
+        """Retorna as chaves (jogador, posição) afetadas"""
+        # Sem filtro de is_official_meta: uma build que deixou de ser meta também chega aqui
+        rows = await self._fetch("builds", BUILD_COLUMNS, self._cursors["builds"])
+        self._advance("builds", rows)
+
+        affected = []
+        for row in rows:
+            previous = self._builds.get(row["id"])
+            if previous is not None and previous["updated_at"] == row["updated_at"]:
+                continue
+            if row["id"] in self._build_contexts:
+                affected.append(self._build_contexts.pop(row["id"])[0])
+            if row.get("is_official_meta"):
+                self._builds[row["id"]] = row
+                rendered = self._render_build(row)
+                if rendered is not None:
+                    self._build_contexts[row["id"]] = rendered
+                    affected.append(rendered[0])
+            else:
+                self._builds.pop(row["id"], None)
+
+        if reconcile:
+            existing = {row["id"] for row in await self._fetch("builds", "id, updated_at", is_official_meta=True)}
+            for build_id in [build_id for build_id in self._builds if build_id not in existing]:
+                del self._builds[build_id]
+                if build_id in self._build_contexts:
+                    affected.append(self._build_contexts.pop(build_id)[0])
+
+        if affected:
+            self._publish_builds()
+        return affected
+
+    def _publish_builds(self):
+        # Só remonta os dicionários: os contextos já foram renderizados por linha
+        contextos: Dict[Tuple[str, str], str] = {}
+        # Mais de uma build meta para o mesmo jogador/posição: vale a mais recente
+        for build_id in sorted(self._build_contexts, key=lambda i: self._builds[i]["updated_at"]):
+            key, context, _ = self._build_contexts[build_id]
+            contextos[key] = context
+
+        player_names = PlayerNameIndex()
+        for player_name in sorted({name for _, _, name in self._build_contexts.values()}):
+            player_names.add(player_name)
+        self.snapshot = DatabaseKnowledge(contextos, player_names.build())
+
+    async def sync(self) -> bool:
+        """Aplica as alterações do banco desde a última rodada; True se algo mudou"""
+        async with self._lock:
+            first = self._rounds == 0
+            reconcile = not first and self._rounds % settings.KB_DB_RECONCILE_EVERY == 0
+            self._rounds += 1
+
+            tips_changed = dense_retriever.enabled and await self._sync_tips(reconcile)
+            affected = await self._sync_builds(reconcile)
+            if tips_changed or (first and dense_retriever.enabled):
+                # As dicas entram no contexto de gameplay: a versão delas faz parte da chave
+                cache_service.set_key_version("gameplay", "tips", self._tips_version())
+
+        if first:
+            print(f"✅ Base do banco carregada ({len(self._tips)} dicas, {len(self._builds)} builds meta)")
+            return tips_changed or bool(affected)
+
+        # Respostas cacheadas foram geradas com o contexto antigo
+        for player_id, position in set(affected):
+            await cache_service.delete(cache_service.generate_build_key(player_id, position))
+        return tips_changed or bool(affected)
+
+    async def start(self):
+        """Carga inicial e sincronização periódica"""
+        if not settings.KB_DB_SYNC_ENABLED or self._task is not None:
+            return
+        try:
+            await self.sync()
+        except Exception as e:
+            print(f"⚠️  Erro ao carregar base do banco: {e}")
+        if settings.KB_DB_SYNC_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.KB_DB_SYNC_INTERVAL)
+            try:
+                await self.sync()
+            except Exception as e:
+                print(f"⚠️  Erro ao sincronizar base do banco: {e}")
+
+
+knowledge_sync = KnowledgeSync()
@@ -0,0 +1,310 @@
+import hashlib
+import json
+import sys
+from collections.abc import Mapping
+from functools import cached_property
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+from app.services.context_renderer import (
+    render_build_guia, render_carta_meta, render_faq, render_problema, render_regra_posicao
+)
+from app.services.name_resolver import PlayerNameIndex, name_slug, resolve_position
+from app.services.search_index import BM25Index
+from app.services.text_normalizer import fold_accents, normalize_tokens
+
+KNOWLEDGE_BASE_PATH = Path(__file__).parent.parent.parent / "knowledge_base"
+
+# Arquivos da base (nome lógico -> caminho relativo)
+KB_FILES = {
+    "regras_posicoes": "builds/regras_posicoes.json",
+    "cartas_meta": "builds/cartas_meta.json",
+    "builds_guide": "builds/builds_guide.json",
+    "problemas_gameplay": "gameplay/problemas_gameplay.json",
+    "tactics_faq": "gameplay/tactics_faq.json",
+}
+
+# Arquivos que alimentam cada tipo de resposta da IA (ver KnowledgeBaseSnapshot.content_version)
+BUILD_FILES = ("regras_posicoes", "cartas_meta", "builds_guide")
+GAMEPLAY_FILES = ("problemas_gameplay", "tactics_faq")
+
+# Palavras-chave (sem acento) que indicam a categoria da dúvida
+CATEGORIAS_KEYWORDS = {
+    "defesa": ["defender", "defesa", "tomo gol", "levar gol"],
+    "ataque": ["atacar", "ataque", "fazer gol", "finalizar"],
+    "passe": ["passe", "passar", "assistencia"],
+    "drible": ["drible", "driblar"]
+}
+
+
+def match_categories(text: str) -> FrozenSet[str]:
+    text = fold_accents(text.lower())
+    return frozenset(
+        categoria for categoria, keywords in CATEGORIAS_KEYWORDS.items()
+        if any(kw in text for kw in keywords)
+    )
+
+
+# Compilação por arquivo: cada função recebe o JSON e devolve as estruturas
+# derivadas dele (índices e contextos renderizados)
+
+def _compile_regras_posicoes(data: Dict) -> Dict:
+    # "LWF/RWF" vale para as duas posições
+    contextos: Dict[str, str] = {}
+    for regra in data.get("regras_por_posicao", []):
+        if not regra.get("estilos"):
+            continue
+        context = sys.intern(render_regra_posicao(regra))
+        for posicao in regra["posicao"].split("/"):
+            contextos.setdefault(resolve_position(posicao), context)
+    return {"contextos": contextos}
+
+
+def _compile_cartas_meta(data: Dict) -> Dict:
+    jogadores = []
+    contextos: Dict[Tuple[str, str], str] = {}
+    for carta in data.get("cartas_meta", []):
+        jogadores.append((carta["jogador"], carta.get("apelidos", [])))
+        player_id = name_slug(carta["jogador"])
+        for posicao in carta.get("build_especifica", {}):
+            # Mais de uma versão da carta: vale a primeira da base
+            contextos.setdefault(
+                (player_id, resolve_position(posicao)), sys.intern(render_carta_meta(carta, posicao))
+            )
+    return {"jogadores": jogadores, "contextos": contextos}
+
+
+def _compile_builds_guide(data: Dict) -> Dict:
+    jogadores = []
+    contextos: Dict[Tuple[str, str], str] = {}
+    for player in data.get("players", []):
+        jogadores.append((player["name"], player.get("aliases", [])))
+        player_id = name_slug(player["name"])
+        for posicao in player.get("positions", {}):
+            contextos.setdefault(
+                (player_id, resolve_position(posicao)), sys.intern(render_build_guia(player, posicao))
+            )
+    return {"jogadores": jogadores, "contextos": contextos}
+
+
+def _compile_problemas_gameplay(data: Dict) -> Dict:
+    problemas = data.get("problemas_gameplay", [])
+    categorias = [match_categories(p["sintoma"]) for p in problemas]
+
+    # Primeiro problema de cada categoria (usado quando só a categoria coincide)
+    primeiro_por_categoria: Dict[str, int] = {}
+    for doc_id, cats in enumerate(categorias):
+        for categoria in cats:
+            primeiro_por_categoria.setdefault(categoria, doc_id)
+
+    return {
+        "entradas": problemas,
+        "index": BM25Index.build(normalize_tokens(p["sintoma"]) for p in problemas),
+        "categorias": categorias,
+        "primeiro_por_categoria": primeiro_por_categoria,
+        # Contextos na mesma ordem (doc_id) do índice
+        "contextos": [sys.intern(render_problema(p)) for p in problemas],
+    }
+
+
+def _compile_tactics_faq(data: Dict) -> Dict:
+    faqs = data.get("faqs", [])
+    return {
+        "entradas": faqs,
+        "index": BM25Index.build(normalize_tokens(f["question"]) for f in faqs),
+        "contextos": [sys.intern(render_faq(f)) for f in faqs],
+    }
+
+
+COMPILERS: Dict[str, Callable[[Dict], Dict]] = {
+    "regras_posicoes": _compile_regras_posicoes,
+    "cartas_meta": _compile_cartas_meta,
+    "builds_guide": _compile_builds_guide,
+    "problemas_gameplay": _compile_problemas_gameplay,
+    "tactics_faq": _compile_tactics_faq,
+}
+
+
+FileEntry = Tuple[Dict, Dict]  # (JSON do arquivo, parte compilada)
+
+
+def file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class LazyFiles:
+    """
+    Dados e partes compiladas de cada arquivo: (json, parte) ou uma função que
+    os carrega na primeira leitura (ex: seção de um artefato compilado)
+    """
+
+    def __init__(self, entries: Dict[str, Union[FileEntry, Callable[[], FileEntry]]]):
+        self._entries = dict(entries)
+
+    def entry(self, name: str):
+        """Entrada crua, sem forçar o carregamento (para reaproveitar em outro snapshot)"""
+        return self._entries[name]
+
+    def get(self, name: str) -> FileEntry:
+        entry = self._entries[name]
+        if callable(entry):
+            entry = entry()
+            self._entries[name] = entry
+        return entry
+
+
+class _Projection(Mapping):
+    def __init__(self, files: LazyFiles, index: int):
+        self._files = files
+        self._index = index
+
+    def __getitem__(self, name: str):
+        return self._files.get(name)[self._index]
+
+    def __iter__(self):
+        return iter(KB_FILES)
+
+    def __len__(self) -> int:
+        return len(KB_FILES)
+
+
+class KnowledgeBaseSnapshot:
+    """
+    Versão imutável da base de conhecimento já compilada
+
+    Nunca é alterada depois de criada: uma recarga monta um snapshot novo e o
+    RAGService troca a referência de uma vez, então cada requisição enxerga
+    uma versão completa e consistente. Cada arquivo (e as estruturas derivadas
+    dele) só é carregado quando usado pela primeira vez.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        stamps: Dict[str, Optional[Tuple[int, int]]],
+        files: LazyFiles,
+        artifact=None,
+        digests: Optional[Dict[str, Optional[str]]] = None
+    ):
+        self.version = version
+        self.stamps = stamps
+        self.digests = digests or {}  # SHA-256 do conteúdo de cada arquivo (None se ausente)
+        self.files = files
+        self.artifact = artifact  # KnowledgeBaseArtifact de origem, se carregado de um
+        self.data = _Projection(files, 0)
+        self.parts = _Projection(files, 1)
+
+    def content_version(self, names: Tuple[str, ...]) -> str:
+        """
+        Versão do conteúdo dos arquivos `names` (igual em todos os workers)
+
+        Ao contrário de `version`, que é contada por processo, depende só do
+        conteúdo: tocar num arquivo sem alterá-lo não muda a versão.
+        """
+        combined = "|".join(f"{name}={self.digests.get(name)}" for name in names)
+        return hashlib.sha256(combined.encode("utf-8")).hexdigest()[:12]
+
+    @cached_property
+    def player_names(self) -> PlayerNameIndex:
+        # Combina cartas meta e builds_guide
+        player_names = PlayerNameIndex()
+        for display_name, aliases in self.parts["cartas_meta"]["jogadores"] + self.parts["builds_guide"]["jogadores"]:
+            player_names.add(display_name, aliases)
+        return player_names.build()
+
+    @cached_property
+    def contextos_cartas(self) -> Dict[Tuple[str, str], str]:
+        return self.parts["cartas_meta"]["contextos"]
+
+    @cached_property
+    def contextos_guia(self) -> Dict[Tuple[str, str], str]:
+        return self.parts["builds_guide"]["contextos"]
+
+    @cached_property
+    def contextos_regras(self) -> Dict[str, str]:
+        return self.parts["regras_posicoes"]["contextos"]
+
+    @cached_property
+    def problemas(self) -> Dict:
+        return self.parts["problemas_gameplay"]
+
+    @cached_property
+    def faqs(self) -> Dict:
+        return self.parts["tactics_faq"]
+
+
+def load_snapshot(
+    base_path: Path = KNOWLEDGE_BASE_PATH,
+    previous: Optional[KnowledgeBaseSnapshot] = None
+) -> KnowledgeBaseSnapshot:
+    """
+    Carrega a base e compila índices e contextos
+
+    Com `previous`, só os arquivos cujo mtime/tamanho mudou são relidos, e só
+    os de conteúdo diferente são recompilados; se nada mudou, retorna o
+    próprio `previous`.
+    """
+    stamps = {}
+    entries = {}
+    digests = {}
+    changed = []
+    for name, relative_path in KB_FILES.items():
+        path = base_path / relative_path
+        stamp = file_stamp(path)
+        if previous is not None and previous.stamps.get(name) == stamp:
+            stamps[name], entries[name] = stamp, previous.files.entry(name)
+            digests[name] = previous.digests.get(name)
+            continue
+
+        data, digest = {}, None
+        if stamp is not None:
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+                data = json.loads(raw)
+                digest = hashlib.sha256(raw).hexdigest()
+            except ValueError as e:
+                # Arquivo sendo salvo ou inválido: mantém a versão anterior
+                print(f"⚠️  Erro ao ler {relative_path}, mantendo versão anterior: {e}")
+                if previous is not None:
+                    stamps[name], entries[name] = previous.stamps[name], previous.files.entry(name)
+                    digests[name] = previous.digests.get(name)
+                    continue
+        if previous is not None and digest is not None and previous.digests.get(name) == digest:
+            # Só o mtime mudou (arquivo tocado ou salvo sem alterações)
+            stamps[name], entries[name], digests[name] = stamp, previous.files.entry(name), digest
+            continue
+        stamps[name], entries[name], digests[name] = stamp, (data, COMPILERS[name](data)), digest
+        changed.append(relative_path)
+
+    if previous is not None and not changed:
+        # Conteúdo igual: só atualiza os stamps (controle do watcher, não fazem parte dos dados)
+        previous.stamps.update(stamps)
+        return previous
+
+    version = previous.version + 1 if previous is not None else 1
+    if previous is not None:
+        print(f"✅ Base de conhecimento v{version} carregada ({', '.join(changed)})")
+    return KnowledgeBaseSnapshot(version, stamps, LazyFiles(entries), digests=digests)
+
+
+def gameplay_documents(kb: KnowledgeBaseSnapshot) -> Tuple[List[str], List[str], List[str]]:
+    """
+    (chaves, textos para embedding, contextos) de problemas e FAQs
+
+    As chaves seguem o doc_id dos índices BM25 ("problema:3", "faq:0"), para
+    que os resultados da busca vetorial e do BM25 possam ser deduplicados.
+    """
+    keys, texts, contexts = [], [], []
+    for doc_id, problema in enumerate(kb.problemas["entradas"]):
+        keys.append(f"problema:{doc_id}")
+        texts.append(f"{problema['sintoma']} {problema['categoria']} {problema.get('causa_raiz', '')}")
+        contexts.append(kb.problemas["contextos"][doc_id])
+    for doc_id, faq in enumerate(kb.faqs["entradas"]):
+        keys.append(f"faq:{doc_id}")
+        texts.append(f"{faq['question']} {faq.get('category', '')}")
+        contexts.append(kb.faqs["contextos"][doc_id])
+    return keys, texts, contexts
@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+
+def _estimate_size(value: Any) -> int:
+    """Tamanho aproximado do valor em bytes (serialização JSON)"""
+    try:
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+class LRUCache:
+    """
+    Cache em memória limitado, com expulsão LRU e expiração TTL preguiçosa
+
+    - get/set/delete em O(1) (OrderedDict)
+    - Limite por número de entradas e por bytes estimados
+    - Entradas expiradas são descartadas quando acessadas ou quando chegam
+      ao fim da fila LRU
+    - Seguro para uso entre threads (lock curto, sem I/O dentro dele)
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: Optional[int] = None,
+        size_of: Callable[[Any], int] = _estimate_size,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._size_of = size_of
+        self._clock = clock
+        self._data: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()  # (value, expire_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expire_at, size = entry
+            if self._clock() >= expire_at:
+                del self._data[key]
+                self._bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def ttl(self, key: str) -> Optional[float]:
+        """Segundos restantes até a expiração (None se ausente)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            remaining = entry[1] - self._clock()
+            return remaining if remaining > 0 else None
+
+    def set(self, key: str, value: Any, ttl: float) -> bool:
+        size = self._size_of(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            # Valor maior que o orçamento inteiro: não armazena
+            self.delete(key)
+            return False
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._data[key] = (value, self._clock() + ttl, size)
+            self._bytes += size
+            self._evict()
+        return True
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is None:
+                return False
+            self._bytes -= entry[2]
+            return True
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove todas as chaves com o prefixo (O(n), uso administrativo)"""
+        with self._lock:
+            keys = [k for k in self._data if k.startswith(prefix)]
+            for k in keys:
+                self._bytes -= self._data.pop(k)[2]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _evict(self):
+        # Chamado com o lock adquirido: remove do mais antigo (LRU) até caber no orçamento
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, (_, _, size) = self._data.popitem(last=False)
+            self._bytes -= size
@@ -0,0 +1,157 @@
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set
+from app.services.text_normalizer import tokenize
+
+# Apelidos de posição (português, inglês e variações) → posição oficial do eFootball
+POSITION_ALIASES = {
+    # Goleiro
+    "GK": "GK", "GOL": "GK", "GO": "GK", "GOLEIRO": "GK",
+    # Defesa
+    "CB": "CB", "ZAG": "CB", "ZG": "CB", "ZAGUEIRO": "CB",
+    "LB": "LB", "LE": "LB", "LATERALESQUERDO": "LB",
+    "RB": "RB", "LD": "RB", "LATERALDIREITO": "RB",
+    # Meio
+    "DMF": "DMF", "CDM": "DMF", "VOL": "DMF", "VOLANTE": "DMF",
+    "CMF": "CMF", "CM": "CMF", "MC": "CMF",
+    "LMF": "LMF", "LM": "LMF", "ME": "LMF",
+    "RMF": "RMF", "RM": "RMF", "MD": "RMF",
+    "AMF": "AMF", "CAM": "AMF", "MEI": "AMF", "MEIA": "AMF",
+    # Ataque
+    "LWF": "LWF", "LW": "LWF", "PE": "LWF", "PTE": "LWF", "PONTAESQUERDA": "LWF",
+    "RWF": "RWF", "RW": "RWF", "PD": "RWF", "PTD": "RWF", "PONTADIREITA": "RWF",
+    "SS": "SS", "SA": "SS", "SEGUNDOATACANTE": "SS",
+    "CF": "CF", "ST": "CF", "CA": "CF", "ATA": "CF", "CENTROAVANTE": "CF",
+}
+
+OFFICIAL_POSITIONS = tuple(sorted(set(POSITION_ALIASES.values())))
+
+# Sufixos que o usuário costuma omitir ("Neymar Jr" → "Neymar")
+NAME_SUFFIXES = frozenset({"jr", "junior", "filho", "neto", "sobrinho"})
+
+FUZZY_MIN_SIMILARITY = 0.55  # coeficiente de Dice mínimo entre trigramas
+FUZZY_MAX_LENGTH_DIFF = 2  # erro de digitação não muda muito o tamanho do nome
+
+
+def normalize_name(name: str) -> str:
+    """Nome sem acento, pontuação e espaços extras ("Neymar Jr." → "neymar jr")"""
+    return " ".join(tokenize(name))
+
+
+def name_slug(name: str) -> str:
+    """ID canônico derivado do nome ("Neymar Jr." → "neymar-jr")"""
+    return "-".join(tokenize(name))
+
+
+def resolve_position(position: str) -> str:
+    """Posição oficial para um apelido (ex: "PTE" → "LWF"); desconhecidas ficam em maiúsculas"""
+    compact = "".join(tokenize(position)).upper()
+    return POSITION_ALIASES.get(compact, position.strip().upper())
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerNameIndex:
+    """
+    Índice de nomes de jogadores → ID canônico
+
+    - Apelidos exatos (nome completo, sem sufixo, sobrenome...) em um dict: O(1)
+    - Erros de digitação: índice invertido de trigramas, percorrendo apenas os
+      apelidos que compartilham algum trigrama com a consulta
+    """
+
+    def __init__(self):
+        self._aliases: Dict[str, Set[str]] = {}  # apelido normalizado -> IDs
+        self._display_names: Dict[str, str] = {}  # ID -> nome de exibição
+        self._full_names: Set[str] = set()
+        self._trigram_postings: Dict[str, Set[str]] = {}
+        self._alias_trigrams: Dict[str, int] = {}
+
+    def __contains__(self, player_id: str) -> bool:
+        return player_id in self._display_names
+
+    def add(self, display_name: str, aliases: Iterable[str] = ()) -> str:
+        """Registra um jogador e seus apelidos; retorna o ID canônico"""
+        player_id = name_slug(display_name)
+        self._display_names.setdefault(player_id, display_name)
+
+        full = normalize_name(display_name)
+        self._full_names.add(full)
+        names = {full, *(normalize_name(a) for a in aliases)}
+
+        tokens = full.split()
+        without_suffix = [t for t in tokens if t not in NAME_SUFFIXES]
+        names.add(" ".join(without_suffix))
+        if len(without_suffix) > 1:
+            names.add(" ".join(without_suffix[-2:]))  # "van dijk"
+        # Só o sobrenome vira apelido de uma palavra ("messi", "ronaldo"); prenomes
+        # e partículas ("leo", "ronald", "van") colidem com outros jogadores
+        if without_suffix and len(without_suffix[-1]) >= 3:
+            names.add(without_suffix[-1])
+
+        for name in names:
+            if name:
+                self._aliases.setdefault(name, set()).add(player_id)
+        return player_id
+
+    def build(self):
+        """Remove apelidos ambíguos e monta o índice de trigramas (chamar após os add)"""
+        for alias, ids in list(self._aliases.items()):
+            if len(ids) > 1 and alias not in self._full_names:
+                del self._aliases[alias]
+
+        self._trigram_postings = {}
+        self._alias_trigrams = {}
+        for alias in self._aliases:
+            grams = _trigrams(alias)
+            self._alias_trigrams[alias] = len(grams)
+            for gram in grams:
+                self._trigram_postings.setdefault(gram, set()).add(alias)
+        return self
+
+    def display_name(self, player_id: str) -> Optional[str]:
+        return self._display_names.get(player_id)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """ID canônico do jogador, ou None se nenhum apelido for parecido o bastante"""
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+
+        candidates = [normalized, " ".join(t for t in normalized.split() if t not in NAME_SUFFIXES)]
+        for candidate in candidates:
+            ids = self._aliases.get(candidate)
+            if ids:
+                return min(ids)
+
+        # Busca aproximada (erros de digitação)
+        query = _trigrams(normalized)
+        shared = Counter()
+        for gram in query:
+            for alias in self._trigram_postings.get(gram, ()):
+                shared[alias] += 1
+
+        best_alias, best_score = None, 0.0
+        for alias, count in shared.items():
+            if not self._fuzzy_compatible(normalized, alias):
+                continue
+            score = 2 * count / (len(query) + self._alias_trigrams[alias])
+            if score > best_score:
+                best_alias, best_score = alias, score
+
+        if best_alias and best_score >= FUZZY_MIN_SIMILARITY:
+            return min(self._aliases[best_alias])
+        return None
+
+    @staticmethod
+    def _fuzzy_compatible(query: str, alias: str) -> bool:
+        """
+        Evita confundir outro jogador com erro de digitação: o tamanho precisa
+        ser parecido e a consulta não pode estender nem truncar o apelido
+        ("ronaldinho" não é "ronaldo", "messias" e "mess" não são "messi")
+        """
+        if abs(len(query) - len(alias)) > FUZZY_MAX_LENGTH_DIFF:
+            return False
+        return not (query.startswith(alias) or alias.startswith(query))
@@ -0,0 +1,228 @@
+import asyncio
+import math
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.activity_service import activity_service, ACTIVITY_BUILD_QUERY
+from app.services.cache_service import cache_service
+from app.services.name_resolver import name_slug
+
+# Com forward decay o incremento cresce com exp((agora - época) / tau); acima
+# deste expoente o conjunto é reescalado (evita overflow do double)
+RESCALE_AFTER = 20.0
+
+# KEYS: pares (sorted set, época) por janela
+# ARGV: agora, membro, quantidade, máximo de membros, tau de cada janela
+RECORD_SCRIPT = """
+local now = tonumber(ARGV[1])
+local amount = tonumber(ARGV[3])
+local max_members = tonumber(ARGV[4])
+for i = 1, #KEYS / 2 do
+    local zset, epoch_key = KEYS[2 * i - 1], KEYS[2 * i]
+    local tau = tonumber(ARGV[4 + i])
+    local epoch = tonumber(redis.call('GET', epoch_key))
+    if not epoch then
+        epoch = now
+        redis.call('SET', epoch_key, ARGV[1])
+    elseif (now - epoch) / tau > %(rescale)s then
+        redis.call('ZUNIONSTORE', zset, 1, zset, 'WEIGHTS', math.exp(-(now - epoch) / tau))
+        epoch = now
+        redis.call('SET', epoch_key, ARGV[1])
+    end
+    redis.call('ZINCRBY', zset, amount * math.exp((now - epoch) / tau), ARGV[2])
+    if redis.call('ZCARD', zset) > max_members then
+        redis.call('ZREMRANGEBYRANK', zset, 0, -max_members - 1)
+    end
+end
+return 1
+""" % {"rescale": RESCALE_AFTER}
+
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400}
+
+
+def parse_windows(spec: str) -> Dict[str, int]:
+    """"1h,24h,7d" → {"1h": 3600, "24h": 86400, "7d": 604800}"""
+    windows = {}
+    for name in (part.strip() for part in spec.split(",")):
+        if name:
+            windows[name] = int(name[:-1]) * WINDOW_UNITS[name[-1]]
+    return windows
+
+
+def _member(player_id: str, position: str) -> str:
+    return f"{player_id}|{position}"
+
+
+class _DecayedCounter:
+    """Mesma contagem com decaimento do RECORD_SCRIPT, em memória (sem Redis)"""
+
+    def __init__(self, tau: int, max_members: int):
+        self.tau = tau
+        self.max_members = max_members
+        self.epoch: Optional[float] = None
+        self.scores: Dict[str, float] = {}
+
+    def add(self, member: str, amount: int, now: float):
+        if self.epoch is None:
+            self.epoch = now
+        elif (now - self.epoch) / self.tau > RESCALE_AFTER:
+            weight = math.exp(-(now - self.epoch) / self.tau)
+            self.scores = {m: score * weight for m, score in self.scores.items()}
+            self.epoch = now
+        self.scores[member] = self.scores.get(member, 0.0) + amount * math.exp((now - self.epoch) / self.tau)
+        if len(self.scores) > 2 * self.max_members:
+            self.scores = dict(sorted(self.scores.items(), key=lambda item: -item[1])[:self.max_members])
+
+    def top(self, n: int, now: float) -> List[Tuple[str, float]]:
+        if self.epoch is None:
+            return []
+        weight = math.exp(-(now - self.epoch) / self.tau)
+        best = sorted(self.scores.items(), key=lambda item: -item[1])[:n]
+        return [(member, score * weight) for member, score in best]
+
+
+class PopularBuilds:
+    """
+    Builds mais consultadas (jogador canônico + posição) por janela de tempo
+
+    Cada janela é um sorted set com forward decay: uma consulta feita em `t`
+    soma exp((t - época) / tau) ao score, então a ordem do ZSET já é a da
+    contagem com decaimento exponencial (meia-vida proporcional à janela) e a
+    leitura é só um ZREVRANGE. Cada atualização é O(log n); o número de
+    combinações por janela é limitado a POPULAR_BUILDS_MAX_TRACKED.
+
+    Os membros usam o ID canônico do jogador (slug do nome para jogadores
+    fora da base), então "Neymar", "neymar jr." e "Neymar Jr" somam juntos; o
+    nome de exibição fica em `popular_builds:name:{id}`, com expiração.
+
+    As consultas chegam pelo activity_service e são gravadas em lote (um
+    script por combinação, num pipeline) a cada POPULAR_BUILDS_FLUSH_INTERVAL.
+    Sem Redis, a contagem é feita em memória por worker.
+    """
+
+    def __init__(self):
+        self.windows = parse_windows(settings.POPULAR_BUILDS_WINDOWS)
+        self.default_window = settings.POPULAR_BUILDS_DEFAULT_WINDOW
+        self.max_members = settings.POPULAR_BUILDS_MAX_TRACKED
+        self.flush_interval = settings.POPULAR_BUILDS_FLUSH_INTERVAL
+        # Após 4 "tau" da maior janela o peso de uma consulta é < 2%: o nome pode expirar
+        self.name_ttl = 4 * max(self.windows.values())
+        self._pending: Counter = Counter()
+        self._names: Dict[str, str] = {}  # ID do jogador -> nome de exibição (ainda não gravado)
+        self._local = {name: _DecayedCounter(tau, self.max_members) for name, tau in self.windows.items()}
+        self._local_names: Dict[str, str] = {}
+        self._script = None
+        self._script_client = None
+        self._task: Optional[asyncio.Task] = None
+
+    def observe(self, event: Dict):
+        """Conta uma consulta de build (listener do activity_service)"""
+        if event["activity_type"] != ACTIVITY_BUILD_QUERY:
+            return
+        data = event.get("activity_data") or {}
+        if not data.get("player_name") or not data.get("position"):
+            return
+        player_id = data.get("player_id") or name_slug(data["player_name"]) or data["player_name"]
+        self._pending[_member(player_id, data["position"])] += 1
+        self._names[player_id] = data["player_name"]
+
+    def _keys(self) -> List[str]:
+        keys = []
+        for name in self.windows:
+            keys += [f"popular_builds:{name}", f"popular_builds:{name}:epoch"]
+        return keys
+
+    def _record_script(self, client):
+        if self._script_client is not client:
+            self._script = client.register_script(RECORD_SCRIPT)
+            self._script_client = client
+        return self._script
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, Counter()
+        names, self._names = self._names, {}
+        now = time.time()
+
+        client = cache_service.redis_client
+        if client is None:
+            for member, amount in pending.items():
+                for counter in self._local.values():
+                    counter.add(member, amount, now)
+            self._local_names.update(names)
+            if len(self._local_names) > 4 * self.max_members:
+                tracked = {member.rpartition("|")[0] for counter in self._local.values() for member in counter.scores}
+                self._local_names = {k: v for k, v in self._local_names.items() if k in tracked}
+            return
+
+        script = self._record_script(client)
+        keys = self._keys()
+        taus = list(self.windows.values())
+        try:
+            pipe = client.pipeline(transaction=False)
+            for member, amount in pending.items():
+                await script(keys=keys, args=[now, member, amount, self.max_members, *taus], client=pipe)
+            for player_id, display_name in names.items():
+                pipe.set(f"popular_builds:name:{player_id}", display_name, ex=self.name_ttl)
+            await pipe.execute()
+        except Exception as e:
+            print(f"⚠️  Erro ao gravar builds populares: {e}")
+            self._pending.update(pending)
+            for player_id, display_name in names.items():
+                self._names.setdefault(player_id, display_name)
+
+    async def top(self, window: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Top `limit` combinações da janela, com a contagem já decaída até agora"""
+        window = window or self.default_window
+        tau = self.windows[window]
+        now = time.time()
+
+        client = cache_service.redis_client
+        if client is None:
+            ranked = self._local[window].top(limit, now)
+            names = [self._local_names.get(member.rpartition("|")[0]) for member, _ in ranked]
+        else:
+            pipe = client.pipeline(transaction=False)
+            pipe.get(f"popular_builds:{window}:epoch")
+            pipe.zrevrange(f"popular_builds:{window}", 0, limit - 1, withscores=True)
+            epoch, members = await pipe.execute()
+            if epoch is None or not members:
+                return []
+            weight = math.exp(-(now - float(epoch)) / tau)
+            ranked = [(member, score * weight) for member, score in members]
+            names = await client.mget([f"popular_builds:name:{member.rpartition('|')[0]}" for member, _ in ranked])
+
+        result = []
+        for (member, score), display_name in zip(ranked, names):
+            player_id, _, position = member.rpartition("|")
+            result.append({
+                "player": display_name or player_id,
+                "player_id": player_id,
+                "position": position,
+                "queries": round(score, 1)
+            })
+        return result
+
+    async def start(self):
+        activity_service.subscribe(self.observe)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+popular_builds = PopularBuilds()
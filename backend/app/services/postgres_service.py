@@ -0,0 +1,82 @@
+import json
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+try:
+    import asyncpg
+    ASYNCPG_AVAILABLE = True
+except ImportError:
+    ASYNCPG_AVAILABLE = False
+
+
+def asyncpg_dsn(url: str) -> str:
+    """URL no formato do SQLAlchemy ("postgresql+psycopg2://...") → DSN do asyncpg"""
+    scheme, sep, rest = url.partition("://")
+    return f"{scheme.split('+')[0]}{sep}{rest}"
+
+
+class PostgresService:
+    """
+    Conexão direta com o Postgres (asyncpg) para as leituras mais frequentes
+
+    Evita o salto HTTP + JSON do PostgREST em cada consulta. O pool mantém
+    conexões abertas e o asyncpg prepara cada SQL uma vez por conexão
+    (cache de prepared statements), então consultas repetidas só enviam os
+    parâmetros. Sem DATABASE_URL ou sem asyncpg instalado, `enabled` é False
+    e os repositórios usam o Supabase REST.
+
+    Com o pooler do Supabase em modo transação (porta 6543), prepared
+    statements não funcionam: use POSTGRES_STATEMENT_CACHE_SIZE=0 ou a
+    conexão direta (porta 5432).
+    """
+
+    def __init__(self):
+        self.pool: Optional["asyncpg.Pool"] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.pool is not None
+
+    async def connect(self):
+        if not settings.POSTGRES_ENABLED or not settings.DATABASE_URL:
+            return
+        if not ASYNCPG_AVAILABLE:
+            print("⚠️  asyncpg não instalado, leituras usarão o Supabase REST")
+            return
+        try:
+            self.pool = await asyncpg.create_pool(
+                asyncpg_dsn(settings.DATABASE_URL),
+                min_size=settings.POSTGRES_POOL_MIN_SIZE,
+                max_size=settings.POSTGRES_POOL_MAX_SIZE,
+                max_inactive_connection_lifetime=settings.POSTGRES_POOL_MAX_IDLE_SECONDS,
+                command_timeout=settings.POSTGRES_COMMAND_TIMEOUT,
+                statement_cache_size=settings.POSTGRES_STATEMENT_CACHE_SIZE,
+                init=self._init_connection,
+            )
+            print("✅ Pool Postgres conectado")
+        except Exception as e:
+            print(f"⚠️  Postgres indisponível, leituras usarão o Supabase REST: {e}")
+            self.pool = None
+
+    @staticmethod
+    async def _init_connection(connection):
+        # JSONB como dict (mesmo formato devolvido pelo PostgREST)
+        await connection.set_type_codec(
+            "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+        )
+
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    async def fetch(self, query: str, *args) -> List[Dict]:
+        rows = await self.pool.fetch(query, *args)
+        return [dict(row) for row in rows]
+
+    async def fetchrow(self, query: str, *args) -> Optional[Dict]:
+        row = await self.pool.fetchrow(query, *args)
+        return dict(row) if row is not None else None
+
+
+postgres_service = PostgresService()
@@ -0,0 +1,250 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.models import UserRole
+from app.services.cache_service import cache_service
+from app.services.supabase_service import supabase_service
+
+# Verifica e incrementa numa única ida ao Redis (atômico entre workers).
+# A chave inclui o dia (UTC) e expira à meia-noite: o reset diário é só a expiração.
+# Chave ausente com ARGV[3] = '0' devolve -1: quem chamou semeia o contador com
+# o uso gravado no banco (o Redis pode ter sido limpo ou reiniciado) e repete.
+QUOTA_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current and ARGV[3] == '0' then
+    return {-1, 0}
+end
+local used = tonumber(current or '0')
+if used >= tonumber(ARGV[1]) then
+    return {0, used}
+end
+used = redis.call('INCR', KEYS[1])
+if used == 1 then
+    redis.call('EXPIREAT', KEYS[1], ARGV[2])
+end
+return {1, used}
+"""
+
+# Devolve uma pergunta consumida (sem ficar abaixo de zero)
+REFUND_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used <= 0 then
+    return 0
+end
+return redis.call('DECR', KEYS[1])
+"""
+
+
+def _quota_day() -> Tuple[str, datetime, datetime]:
+    """(dia UTC, início do dia, próxima meia-noite)"""
+    now = datetime.now(timezone.utc)
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start.date().isoformat(), start, start + timedelta(days=1)
+
+
+class QuotaService:
+    """
+    Quota diária de perguntas à IA por usuário
+
+    - Redis: contador `quota:{dia}:{user_id}` verificado e incrementado por um
+      script Lua (uma ida ao Redis, sem corrida entre requisições simultâneas)
+    - Sem Redis: contador em memória por worker (limite aproximado)
+    - `users.daily_questions_used`/`last_reset`: atualizados em lote por uma
+      tarefa em background (write-behind); quando o contador do dia não existe
+      (Redis limpo/reiniciado, worker novo), ele é semeado com esse valor
+    """
+
+    def __init__(self):
+        self.flush_interval = settings.QUOTA_FLUSH_INTERVAL
+        self.batch_size = settings.QUOTA_BATCH_SIZE
+        self._script = None
+        self._refund_script = None
+        self._script_client = None
+        self._local: Dict[str, int] = {}  # fallback sem Redis (apenas o dia atual)
+        self._local_day: Optional[str] = None
+        self._pending: Dict[str, Tuple[int, str]] = {}  # user_id -> (usadas, início do dia)
+        self._task: Optional[asyncio.Task] = None
+
+    def daily_limit(self, role: Optional[str]) -> int:
+        if role in (UserRole.premium.value, UserRole.admin.value):
+            return settings.PREMIUM_TIER_DAILY_LIMIT
+        return settings.FREE_TIER_DAILY_LIMIT
+
+    def _key(self, day: str, user_id: str) -> str:
+        return f"quota:{day}:{user_id}"
+
+    def _quota_script(self):
+        client = cache_service.redis_client
+        if client is None:
+            return None
+        if self._script_client is not client:
+            self._script = client.register_script(QUOTA_SCRIPT)
+            self._refund_script = client.register_script(REFUND_SCRIPT)
+            self._script_client = client
+        return self._script
+
+    def _local_counter(self, day: str) -> Dict[str, int]:
+        if self._local_day != day:
+            self._local = {}
+            self._local_day = day
+        return self._local
+
+    async def _stored_usage(self, user_id: str, day: str) -> int:
+        """Perguntas do dia já gravadas em `users` (inclui o que ainda está pendente neste worker)"""
+        used = 0
+        try:
+            response = await (
+                supabase_service.table("users")
+                .select("daily_questions_used, last_reset")
+                .eq("id", user_id)
+                .execute()
+            )
+            if response.data:
+                row = response.data[0]
+                last_reset = datetime.fromisoformat(str(row.get("last_reset")))
+                if last_reset.astimezone(timezone.utc).date().isoformat() == day:
+                    used = int(row.get("daily_questions_used") or 0)
+        except Exception as e:
+            print(f"⚠️  Erro ao ler quota gravada do usuário {user_id}: {e}")
+
+        pending = self._pending.get(user_id)
+        if pending is not None and pending[1][:10] == day:
+            used = max(used, pending[0])
+        return used
+
+    async def _redis_check_and_increment(self, script, user_id: str, limit: int, day: str, reset: datetime):
+        key = self._key(day, user_id)
+        expire_at = int(reset.timestamp())
+        allowed, used = await script(keys=[key], args=[limit, expire_at, 0])
+        if allowed == -1:
+            # Contador ausente: semeia com o uso gravado (NX: outro worker pode ter semeado antes)
+            seed = await self._stored_usage(user_id, day)
+            await cache_service.redis_client.set(key, seed, nx=True, exat=expire_at)
+            allowed, used = await script(keys=[key], args=[limit, expire_at, 1])
+        return allowed, used
+
+    async def check_and_increment(self, user_id: str, role: Optional[str] = None) -> bool:
+        """Consome uma pergunta da quota do dia; False se o limite já foi atingido"""
+        limit = self.daily_limit(role)
+        day, start, reset = _quota_day()
+
+        used = None
+        script = self._quota_script()
+        if script is not None:
+            try:
+                allowed, used = await self._redis_check_and_increment(script, user_id, limit, day, reset)
+            except Exception as e:
+                print(f"⚠️  Erro ao verificar quota no Redis: {e}")
+
+        if used is None:
+            counter = self._local_counter(day)
+            if user_id not in counter:
+                seed = await self._stored_usage(user_id, day)
+                # Outra requisição pode ter semeado durante a consulta
+                counter.setdefault(user_id, seed)
+            used = counter[user_id]
+            allowed = used < limit
+            if allowed:
+                used += 1
+                counter[user_id] = used
+
+        if allowed:
+            # Respostas do Redis podem chegar fora de ordem: mantém o maior valor do dia
+            usage = (int(used), start.isoformat())
+            previous = self._pending.get(user_id)
+            if previous is None or previous[1] != usage[1] or previous[0] < usage[0]:
+                self._pending[user_id] = usage
+        return bool(allowed)
+
+    async def refund(self, user_id: str):
+        """Devolve a pergunta consumida por check_and_increment (ex: a geração falhou)"""
+        day, start, _ = _quota_day()
+
+        used = None
+        if self._quota_script() is not None:
+            try:
+                used = await self._refund_script(keys=[self._key(day, user_id)])
+            except Exception as e:
+                print(f"⚠️  Erro ao devolver quota no Redis: {e}")
+
+        if used is None:
+            counter = self._local_counter(day)
+            used = max(counter.get(user_id, 0) - 1, 0)
+            counter[user_id] = used
+
+        self._pending[user_id] = (int(used), start.isoformat())
+
+    async def get_used(self, user_id: str) -> int:
+        day, _, _ = _quota_day()
+        if cache_service.redis_client:
+            try:
+                return int(await cache_service.redis_client.get(self._key(day, user_id)) or 0)
+            except Exception:
+                pass
+        return self._local_counter(day).get(user_id, 0)
+
+    async def get_quota_info(self, user_id: str, role: Optional[str] = None) -> Dict:
+        limit = self.daily_limit(role)
+        used = min(await self.get_used(user_id), limit)
+        _, _, reset = _quota_day()
+        return {
+            "daily_limit": limit,
+            "questions_used": used,
+            "questions_remaining": limit - used,
+            "role": role or UserRole.free.value,
+            "reset_time": reset.isoformat()
+        }
+
+    async def flush(self):
+        """
+        Grava o uso pendente em `users`
+
+        Usuários com o mesmo valor são atualizados juntos (um UPDATE ... IN por
+        grupo), então o número de requisições é limitado pelo limite diário.
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        groups: Dict[Tuple[int, str], list] = {}
+        for user_id, usage in pending.items():
+            groups.setdefault(usage, []).append(user_id)
+
+        for (used, last_reset), user_ids in groups.items():
+            for i in range(0, len(user_ids), self.batch_size):
+                batch = user_ids[i:i + self.batch_size]
+                try:
+                    await (
+                        supabase_service.table("users")
+                        .update({"daily_questions_used": used, "last_reset": last_reset})
+                        .in_("id", batch)
+                        .execute()
+                    )
+                except Exception as e:
+                    print(f"⚠️  Erro ao gravar quota ({len(batch)} usuários): {e}")
+                    # Devolve para a fila (valores mais novos têm prioridade)
+                    for user_id in batch:
+                        self._pending.setdefault(user_id, (used, last_reset))
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Para a tarefa de escrita e grava o que ainda está pendente"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+quota_service = QuotaService()
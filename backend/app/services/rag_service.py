@@ -1,7 +1,25 @@
-import json
-import os
-from typing import Optional, Dict, List
-from pathlib import Path
+import asyncio
+import heapq
+from typing import Optional, Dict, List, Tuple
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.dense_retrieval import dense_retriever
+from app.services.kb_artifact import load_artifact_snapshot
+from app.services.kb_sync import knowledge_sync
+from app.services.knowledge_base import (
+    BUILD_FILES, GAMEPLAY_FILES, KNOWLEDGE_BASE_PATH, KnowledgeBaseSnapshot, load_snapshot,
+    match_categories
+)
+from app.services.name_resolver import name_slug, resolve_position
+from app.services.text_normalizer import normalize_tokens
+
+CATEGORY_BOOST = 2  # Boost por contexto semântico (categoria em comum)
+MIN_GAMEPLAY_RELEVANCE = 2  # termos em comum + boosts mínimos para aceitar um problema
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# Resposta direta (sem IA) para usuários não logados: só correspondência léxica forte
+FAQ_ANSWER_MIN_MATCHED = 2  # termos da pergunta presentes no sintoma/pergunta da FAQ
+FAQ_ANSWER_MIN_SCORE = 3.0  # score BM25 mínimo, sem boost por categoria
 
 
 class RAGService:
@@ -13,200 +31,203 @@ class RAGService:
     1. Cartas Meta (exceções - jogadores específicos)
     2. Regras por Posição (padrões gerais)
     3. Problemas de Gameplay (sintoma → solução)
+    
+    A base fica em um KnowledgeBaseSnapshot imutável: cada consulta lê a
+    referência uma única vez, e a recarga troca o snapshot inteiro de uma vez.
     """
     
     def __init__(self):
-        self.knowledge_base_path = Path(__file__).parent.parent.parent / "knowledge_base"
-        
-        # Carrega arquivos da nova estrutura
-        self.regras_posicoes = self._load_json("builds/regras_posicoes.json")
-        self.cartas_meta = self._load_json("builds/cartas_meta.json")
-        self.problemas_gameplay = self._load_json("gameplay/problemas_gameplay.json")
+        self.knowledge_base_path = KNOWLEDGE_BASE_PATH
+        # Artefato compilado (se atualizado) evita reprocessar os JSON em cada worker
+        snapshot = None
+        if settings.KNOWLEDGE_BASE_USE_ARTIFACT:
+            snapshot = load_artifact_snapshot(base_path=self.knowledge_base_path)
+        self.snapshot: KnowledgeBaseSnapshot = snapshot or load_snapshot(self.knowledge_base_path)
+        self._publish_key_versions(self.snapshot)
+        self._watch_task: Optional[asyncio.Task] = None
+    
+    # Arquivos JSON da versão atual (compatibilidade com quem lê os dados brutos)
+    @property
+    def regras_posicoes(self) -> Dict:
+        return self.snapshot.data["regras_posicoes"]
+    
+    @property
+    def cartas_meta(self) -> Dict:
+        return self.snapshot.data["cartas_meta"]
+    
+    @property
+    def problemas_gameplay(self) -> Dict:
+        return self.snapshot.data["problemas_gameplay"]
+    
+    @property
+    def builds_data(self) -> Dict:
+        return self.snapshot.data["builds_guide"]
+    
+    @property
+    def gameplay_data(self) -> Dict:
+        return self.snapshot.data["tactics_faq"]
+    
+    def resolve_build_query(self, player_name: str, position: str) -> Tuple[str, str, str]:
+        """
+        Resolve nome e posição digitados para a forma canônica
         
-        # Mantém compatibilidade com arquivos antigos
-        self.builds_data = self._load_json("builds/builds_guide.json")
-        self.gameplay_data = self._load_json("gameplay/tactics_faq.json")
-    
-    def _load_json(self, relative_path: str) -> Dict:
-        """Carrega arquivo JSON genérico"""
-        file_path = self.knowledge_base_path / relative_path
-        if file_path.exists():
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return {}
+        Retorna (ID do jogador, nome de exibição, posição oficial). Ex:
+        ("neymar jr.", "PTE") → ("neymar-jr", "Neymar Jr", "LWF"). Jogadores fora
+        da base usam o nome normalizado como ID.
+        """
+        return self._resolve_build_query(self.snapshot, player_name, position)
+    
+    def _resolve_build_query(
+        self,
+        kb: KnowledgeBaseSnapshot,
+        player_name: str,
+        position: str
+    ) -> Tuple[str, str, str]:
+        position = resolve_position(position)
+        # Jogadores da base de arquivos primeiro, depois os das builds meta do banco
+        for player_names in (kb.player_names, knowledge_sync.snapshot.player_names):
+            player_id = player_names.resolve(player_name)
+            if player_id:
+                return player_id, player_names.display_name(player_id), position
+        return name_slug(player_name) or player_name.strip().lower(), player_name.strip(), position
     
     def find_build_context(self, player_name: str, position: str) -> Optional[str]:
         """
         Busca contexto de build na base de conhecimento
         
         Sistema de 3 camadas (ordem de prioridade):
-        1. Carta Meta específica (ex: Neymar Big Time 2015)
+        1. Carta Meta específica (ex: Neymar Big Time 2015) ou build meta
+           oficial cadastrada no banco (tabela builds)
         2. Regra geral da posição (ex: LWF Prolific Winger)
         3. Fallback para arquivo antigo (compatibilidade)
         """
-        player_name_lower = player_name.lower().strip()
-        position_upper = position.upper()
+        kb = self.snapshot
+        player_id, _, position_upper = self._resolve_build_query(kb, player_name, position)
         
-        # CAMADA 1: Buscar em Cartas Meta (exceções)
-        for carta in self.cartas_meta.get("cartas_meta", []):
-            if player_name_lower in carta["jogador"].lower():
-                # Encontrou o jogador! Verificar se tem build para essa posição
-                build_especifica = carta.get("build_especifica", {})
-                
-                if position_upper in build_especifica:
-                    build = build_especifica[position_upper]
-                    
-                    # Formatar contexto RICO
-                    context = f"### 🔥 CARTA META: {carta['jogador']} ({carta['versao']}) - {position_upper}\n\n"
-                    context += f"**Por que é Meta?** {carta['por_que_e_meta']}\n\n"
-                    context += f"**Playstyle Recomendado**: {build['playstyle_recomendado']}\n\n"
-                    context += "**Distribuição de Pontos**:\n"
-                    
-                    for item in build["distribuicao"]:
-                        context += f"- {item['atributo']}: {item['pontos']} pontos"
-                        context += f" (💡 {item['justificativa']})\n"
-                    
-                    context += f"\n**Dicas Táticas do Pro Player**:\n"
-                    for dica in build.get("dicas_taticas", []):
-                        context += f"• {dica}\n"
-                    
-                    context += f"\n**Quando Usar**: {carta['quando_usar']}\n"
-                    context += f"\n**Comentário do Pro**: \"{carta['comentario_pro']}\"\n"
-                    
-                    return context
+        return (
+            # CAMADA 1: Cartas Meta (exceções)
+            kb.contextos_cartas.get((player_id, position_upper))
+            or knowledge_sync.snapshot.contextos.get((player_id, position_upper))
+            # CAMADA 2: Regras por Posição (padrão geral)
+            or kb.contextos_regras.get(position_upper)
+            # CAMADA 3: Fallback para arquivo antigo (compatibilidade)
+            or kb.contextos_guia.get((player_id, position_upper))
+        )
+    
+    def _rank_problemas(self, kb: KnowledgeBaseSnapshot, question: str, k: int) -> List[Tuple[float, int]]:
+        """Top-k (score, doc_id) de problemas: BM25 do sintoma + boost por categoria"""
+        problemas = kb.problemas
+        query_tokens = normalize_tokens(question)
+        query_categorias = match_categories(question)
         
-        # CAMADA 2: Buscar em Regras por Posição (padrão geral)
-        for regra in self.regras_posicoes.get("regras_por_posicao", []):
-            if position_upper in regra["posicao"]:
-                # Encontrou regra para essa posição
-                # Por enquanto, usa o primeiro estilo disponível
-                # TODO: Detectar estilo baseado em atributos do jogador
-                
-                estilos = regra.get("estilos", {})
-                if estilos:
-                    # Pega primeiro estilo (ou você pode implementar lógica para escolher)
-                    primeiro_estilo = list(estilos.keys())[0]
-                    estilo_data = estilos[primeiro_estilo]
-                    
-                    context = f"### Build Padrão para {regra['nome_posicao']} ({primeiro_estilo})\n\n"
-                    context += f"**Descrição**: {estilo_data['descricao']}\n\n"
-                    context += "**Prioridades de Build**:\n"
-                    
-                    for i in range(1, 4):
-                        prio_key = f"prioridade_{i}"
-                        if prio_key in estilo_data:
-                            prio = estilo_data[prio_key]
-                            context += f"{i}. {prio['atributo']}: {prio['pontos_sugeridos']} pontos "
-                            context += f"(mínimo {prio['minimo']})\n"
-                    
-                    context += f"\n**Atributos a Ignorar**: {', '.join(estilo_data.get('ignorar', []))}\n"
-                    context += f"\n**Dica Tática**: {estilo_data.get('dica_tatica', 'N/A')}\n"
-                    
-                    return context
+        candidates = problemas["index"].score(query_tokens)
+        for categoria in query_categorias:
+            doc_id = problemas["primeiro_por_categoria"].get(categoria)
+            if doc_id is not None:
+                candidates.setdefault(doc_id, (0.0, 0))
         
-        # CAMADA 3: Fallback para arquivo antigo (compatibilidade)
-        for player in self.builds_data.get("players", []):
-            if player_name_lower in player["name"].lower():
-                positions = player.get("positions", {})
-                
-                if position_upper in positions:
-                    build_data = positions[position_upper]
-                    
-                    context = f"### Build Oficial do Pro Player para {player['name']} - {position_upper}\n\n"
-                    context += f"**Playstyle**: {build_data.get('playstyle', 'N/A')}\n\n"
-                    context += "**Distribuição de Pontos Prioritários**:\n"
-                    
-                    for skill in build_data.get("priority_points", []):
-                        context += f"- {skill['skill']}: {skill['points']} pontos\n"
-                    
-                    context += f"\n**Dicas Táticas**: {build_data.get('tips', 'N/A')}\n"
-                    
-                    return context
+        ranked = []
+        for doc_id, (score, matched) in candidates.items():
+            boost = CATEGORY_BOOST * len(query_categorias & problemas["categorias"][doc_id])
+            if matched + boost >= MIN_GAMEPLAY_RELEVANCE:
+                ranked.append((score + boost, doc_id))
         
-        return None
+        # Empate: vale a ordem da base de conhecimento
+        return heapq.nlargest(k, ranked, key=lambda item: (item[0], -item[1]))
+    
+    def _rank_faqs(self, kb: KnowledgeBaseSnapshot, question: str, k: int) -> List[Tuple[float, int]]:
+        candidates = kb.faqs["index"].score(normalize_tokens(question))
+        ranked = [(score, doc_id) for doc_id, (score, matched) in candidates.items() if matched >= 2]
+        return heapq.nlargest(k, ranked, key=lambda item: (item[0], -item[1]))
+    
+    def search_gameplay_problems(self, question: str, k: int = 3) -> List[Tuple[Dict, float]]:
+        """
+        Top-k problemas de gameplay para a pergunta, do mais relevante ao menos
+        
+        Score = BM25 do sintoma + boost por categoria em comum. Só entram
+        problemas com relevância mínima (termos em comum + boosts >= 2).
+        """
+        kb = self.snapshot
+        return [(kb.problemas["entradas"][doc_id], score) for score, doc_id in self._rank_problemas(kb, question, k)]
+    
+    def search_gameplay_faqs(self, question: str, k: int = 3) -> List[Tuple[Dict, float]]:
+        """Top-k FAQs antigas com pelo menos 2 termos em comum com a pergunta"""
+        kb = self.snapshot
+        return [(kb.faqs["entradas"][doc_id], score) for score, doc_id in self._rank_faqs(kb, question, k)]
     
     def find_gameplay_context(self, question: str) -> Optional[str]:
         """
         Busca contexto de gameplay na base de conhecimento
         
-        Sistema de 2 camadas:
-        1. Problemas de Gameplay (novo - sintoma → solução)
-        2. FAQs antigas (compatibilidade)
+        Combina até RAG_CONTEXT_TOP_K trechos, dentro de RAG_CONTEXT_MAX_CHARS:
+        1. Melhor resultado do BM25 (problema de gameplay ou, sem ele, FAQ antiga)
+        2. Top-k da busca vetorial (problemas, FAQs e gameplay_tips), que
+           encontra perguntas com outras palavras para o mesmo problema
         """
-        question_lower = question.lower()
-        
-        # CAMADA 1: Buscar em Problemas de Gameplay (mais detalhado)
-        best_match = None
-        best_score = 0
-        
-        for problema in self.problemas_gameplay.get("problemas_gameplay", []):
-            sintoma_lower = problema["sintoma"].lower()
-            
-            # Score de similaridade com sintoma
-            common_words = set(question_lower.split()) & set(sintoma_lower.split())
-            score = len(common_words)
-            
-            # Boost se categorias comuns aparecem
-            categorias_keywords = {
-                "defesa": ["defender", "defesa", "tomo gol", "levar gol"],
-                "ataque": ["atacar", "ataque", "fazer gol", "finalizar"],
-                "passe": ["passe", "passar", "assistencia"],
-                "drible": ["drible", "driblar"]
-            }
-            
-            for keywords in categorias_keywords.values():
-                if any(kw in question_lower for kw in keywords):
-                    if any(kw in sintoma_lower for kw in keywords):
-                        score += 2  # Boost por contexto semântico
-            
-            if score > best_score:
-                best_score = score
-                best_match = problema
-        
-        if best_match and best_score >= 2:
-            # Formatar contexto DETALHADO
-            context = f"### 🎯 Problema Identificado: {best_match['sintoma']}\n\n"
-            context += f"**Categoria**: {best_match['categoria']}\n"
-            context += f"**Gravidade**: {best_match['gravidade']}\n\n"
-            context += f"**Causa Raiz**: {best_match['causa_raiz']}\n\n"
-            
-            solucao = best_match.get("solucao", {})
-            context += "**Solução Passo a Passo**:\n"
-            for passo in solucao.get("passos", []):
-                context += f"{passo}\n"
-            
-            context += f"\n**Comandos Específicos**: {solucao.get('comandos_especificos', 'N/A')}\n"
-            context += f"\n**Erro Comum**: {solucao.get('erro_comum', 'N/A')}\n"
-            context += f"\n**Dica Extra**: {solucao.get('dica_extra', 'N/A')}\n"
-            context += f"\n**Efetividade**: {best_match.get('efetividade', 'N/A')}\n"
-            
-            return context
+        return self._merge_contexts([context for _, context in self._gameplay_snippets(self.snapshot, question)])
+    
+    def find_faq_answer(self, question: str) -> Optional[str]:
+        """
+        Resposta pronta da base local para quem não está logado
         
-        # CAMADA 2: Fallback para FAQs antigas
-        best_match_old = None
-        best_score_old = 0
+        Ao contrário de find_gameplay_context (contexto para a IA, que pode ser
+        aproximado), aqui o trecho É a resposta: só vale um único problema ou,
+        sem ele, uma FAQ com pelo menos FAQ_ANSWER_MIN_MATCHED termos em comum
+        e score BM25 >= FAQ_ANSWER_MIN_SCORE. Sem busca vetorial nem boost por
+        categoria, que trazem trechos vizinhos para perguntas fora do tema.
+        """
+        kb = self.snapshot
+        query_tokens = normalize_tokens(question)
+        for section in (kb.problemas, kb.faqs):
+            ranked = [
+                (score, doc_id)
+                for doc_id, (score, matched) in section["index"].score(query_tokens).items()
+                if matched >= FAQ_ANSWER_MIN_MATCHED and score >= FAQ_ANSWER_MIN_SCORE
+            ]
+            if ranked:
+                # Empate: vale a ordem da base de conhecimento
+                _, doc_id = max(ranked, key=lambda item: (item[0], -item[1]))
+                return section["contextos"][doc_id]
+        return None
+    
+    def _gameplay_snippets(self, kb: KnowledgeBaseSnapshot, question: str) -> List[Tuple[str, str]]:
+        """(chave, contexto) dos trechos selecionados, do mais relevante ao menos"""
+        snippets: List[Tuple[str, str]] = []
         
-        for faq in self.gameplay_data.get("faqs", []):
-            faq_question = faq["question"].lower()
-            
-            common_words = set(question_lower.split()) & set(faq_question.split())
-            score = len(common_words)
-            
-            if score > best_score_old:
-                best_score_old = score
-                best_match_old = faq
+        # CAMADA 1: Buscar em Problemas de Gameplay (mais detalhado)
+        problemas = self._rank_problemas(kb, question, k=1)
+        if problemas:
+            doc_id = problemas[0][1]
+            snippets.append((f"problema:{doc_id}", kb.problemas["contextos"][doc_id]))
+        else:
+            # CAMADA 2: Fallback para FAQs antigas
+            faqs = self._rank_faqs(kb, question, k=1)
+            if faqs:
+                doc_id = faqs[0][1]
+                snippets.append((f"faq:{doc_id}", kb.faqs["contextos"][doc_id]))
         
-        if best_match_old and best_score_old >= 2:
-            context = f"### Dica do Pro Player\n\n"
-            context += f"**Categoria**: {best_match_old.get('category', 'Geral')}\n\n"
-            context += f"**Resposta**: {best_match_old['answer']}\n\n"
-            
-            if best_match_old.get("video_url"):
-                context += f"**Tutorial em Vídeo**: {best_match_old['video_url']}\n"
-            
-            return context
+        # CAMADA 3: Busca vetorial (vazia sem NumPy ou com RAG_DENSE_ENABLED=false)
+        top_k = settings.RAG_CONTEXT_TOP_K
+        for _, key, context in dense_retriever.search(question, k=top_k):
+            if len(snippets) >= top_k:
+                break
+            if all(key != seen for seen, _ in snippets):
+                snippets.append((key, context))
+        return snippets
+    
+    def _merge_contexts(self, contexts: List[str]) -> Optional[str]:
+        """Junta os trechos em ordem de relevância até RAG_CONTEXT_MAX_CHARS"""
+        if not contexts:
+            return None
+        max_chars = settings.RAG_CONTEXT_MAX_CHARS
         
-        return None
+        # O primeiro trecho sempre entra (cortado se precisar)
+        merged = contexts[0][:max_chars]
+        for context in contexts[1:]:
+            if len(merged) + len(CONTEXT_SEPARATOR) + len(context) > max_chars:
+                break
+            merged += CONTEXT_SEPARATOR + context
+        return merged
     
     def get_all_meta_cards(self) -> List[Dict]:
         """Retorna lista de todas as cartas meta"""
@@ -214,20 +235,64 @@ class RAGService:
     
     def get_categories_stats(self) -> Dict:
         """Retorna estatísticas das categorias de gameplay"""
+        problemas_gameplay = self.problemas_gameplay
         return {
-            "total_problemas": len(self.problemas_gameplay.get("problemas_gameplay", [])),
-            "categorias": self.problemas_gameplay.get("categorias", [])
+            "total_problemas": len(problemas_gameplay.get("problemas_gameplay", [])),
+            "categorias": problemas_gameplay.get("categorias", [])
         }
     
-    def reload_knowledge_base(self):
-        """Recarrega a base de conhecimento (útil após scraping ou atualização)"""
-        self.regras_posicoes = self._load_json("builds/regras_posicoes.json")
-        self.cartas_meta = self._load_json("builds/cartas_meta.json")
-        self.problemas_gameplay = self._load_json("gameplay/problemas_gameplay.json")
+    async def reload_knowledge_base(self) -> bool:
+        """
+        Recarrega a base de conhecimento (útil após scraping ou atualização)
+        
+        Só os arquivos alterados são recompilados, fora do event loop, e o
+        snapshot novo entra com uma única troca de referência. Retorna True
+        se algo mudou.
+        """
+        current = self.snapshot
+        snapshot = await asyncio.to_thread(load_snapshot, self.knowledge_base_path, current)
+        if snapshot is current:
+            return False
+        
+        # Índice vetorial da versão nova fica pronto antes da troca (a busca nunca o monta)
+        await dense_retriever.rebuild(snapshot)
+        self.snapshot = snapshot
         
-        # Mantém compatibilidade
-        self.builds_data = self._load_json("builds/builds_guide.json")
-        self.gameplay_data = self._load_json("gameplay/tactics_faq.json")
+        # Respostas cacheadas foram geradas com o contexto antigo: a versão do
+        # conteúdo muda as chaves (só dos tipos cujos arquivos mudaram) e as
+        # entradas antigas expiram sozinhas, sem apagar nada no Redis/ai_cache
+        self._publish_key_versions(snapshot)
+        return True
+    
+    def _publish_key_versions(self, snapshot: KnowledgeBaseSnapshot):
+        cache_service.set_key_version("build", "kb", snapshot.content_version(BUILD_FILES))
+        cache_service.set_key_version("gameplay", "kb", snapshot.content_version(GAMEPLAY_FILES))
+    
+    async def build_indexes(self):
+        """Monta o índice vetorial do snapshot atual fora do event loop (startup)"""
+        await dense_retriever.rebuild(self.snapshot)
+    
+    async def start_watching(self):
+        """Inicia a verificação periódica (mtime) dos arquivos da base"""
+        if self._watch_task is None and settings.KNOWLEDGE_BASE_WATCH_INTERVAL > 0:
+            self._watch_task = asyncio.create_task(self._watch())
+    
+    async def stop_watching(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+    
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(settings.KNOWLEDGE_BASE_WATCH_INTERVAL)
+            try:
+                await self.reload_knowledge_base()
+            except Exception as e:
+                print(f"⚠️  Erro ao recarregar base de conhecimento: {e}")
 
 
 rag_service = RAGService()
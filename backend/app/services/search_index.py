@@ -0,0 +1,76 @@
+import heapq
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+
+class BM25Index:
+    """
+    Índice invertido com ranking BM25
+
+    Os documentos são indexados uma vez (no carregamento da base); a busca só
+    percorre as listas de postings dos termos da consulta, então o custo não
+    depende do tamanho total do corpus.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # termo -> [(doc_id, peso BM25)]; o peso é pré-calculado no build
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.doc_lengths: List[int] = []
+        self.avg_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, documents: Iterable[List[str]], **params) -> "BM25Index":
+        """Cria o índice a partir dos tokens (já normalizados) de cada documento"""
+        index = cls(**params)
+        term_freqs = []
+        for tokens in documents:
+            index.doc_lengths.append(len(tokens))
+            term_freqs.append(Counter(tokens))
+
+        total = len(index.doc_lengths)
+        index.avg_length = (sum(index.doc_lengths) / total) if total else 0.0
+        avg_length = index.avg_length or 1.0
+
+        raw_postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, tfs in enumerate(term_freqs):
+            for term, tf in tfs.items():
+                raw_postings.setdefault(term, []).append((doc_id, tf))
+
+        for term, docs in raw_postings.items():
+            df = len(docs)
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            index.idf[term] = idf
+            index.postings[term] = [
+                (doc_id, idf * tf * (index.k1 + 1) / (tf + index._norm(doc_id, avg_length)))
+                for doc_id, tf in docs
+            ]
+        return index
+
+    def _norm(self, doc_id: int, avg_length: float) -> float:
+        return self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+
+    def score(self, query_tokens: Iterable[str]) -> Dict[int, Tuple[float, int]]:
+        """
+        Pontua os documentos que contêm algum termo da consulta
+
+        Retorna {doc_id: (score BM25, nº de termos distintos da consulta encontrados)}
+        """
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+        for term in set(query_tokens):
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+                matched[doc_id] = matched.get(doc_id, 0) + 1
+        return {doc_id: (score, matched[doc_id]) for doc_id, score in scores.items()}
+
+    def search(self, query_tokens: Iterable[str], k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k documentos por score BM25"""
+        scores = self.score(query_tokens)
+        return heapq.nlargest(k, ((doc_id, s) for doc_id, (s, _) in scores.items()), key=lambda item: item[1])
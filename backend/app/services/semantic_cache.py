@@ -0,0 +1,213 @@
+import asyncio
+import json
+import time
+from typing import List, Optional, Set, Tuple
+from app.core.config import settings
+from app.services.cache_service import cache_service
+from app.services.embeddings import NUMPY_AVAILABLE, HashedNgramVectorizer
+from app.services.name_resolver import POSITION_ALIASES
+from app.services.rag_service import rag_service
+from app.services.text_normalizer import POLARITY_WORDS, canonicalize_question, stem, tokenize
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+# Apelidos de posição que também são palavras comuns ("gol", "pé")
+_AMBIGUOUS_POSITIONS = frozenset({"GOL", "GO", "PE", "ME", "CA", "SA"})
+
+# Verbos que negam a ação ("evitar gol de cabeça" = "não tomar gol de cabeça")
+_NEGATION_STEMS = frozenset({"evit", "imped"})
+
+# Verbos que trocam o lado da jogada ("fazer passe em profundidade" x "defender passe em profundidade")
+_DEFENSE_STEMS = frozenset({"defend"})
+
+
+def meaning_signature(question: str) -> Tuple[str, ...]:
+    """
+    Palavras que mudam o sentido da pergunta sem mudar muito o texto
+
+    Polaridade ("com"/"sem", "não", "evitar", "defender"), posições ("CF", "zagueiro" → "CB")
+    e números/formações ("4-2-3-1"), na ordem em que aparecem. Perguntas
+    parecidas só dividem resposta no cache semântico se a assinatura for igual.
+    """
+    signature = []
+    for token in tokenize(question):
+        if token in POLARITY_WORDS:
+            signature.append(token)
+        elif stem(token) in _NEGATION_STEMS:
+            signature.append("nao")
+        elif stem(token) in _DEFENSE_STEMS:
+            signature.append("defender")
+        elif any(c.isdigit() for c in token):
+            signature.append(token)
+        else:
+            alias = token.upper()
+            if alias not in POSITION_ALIASES and alias.endswith("S"):
+                alias = alias[:-1]  # plural ("zagueiros", "volantes")
+            if alias in POSITION_ALIASES and alias not in _AMBIGUOUS_POSITIONS:
+                signature.append(POSITION_ALIASES[alias])
+    return tuple(signature)
+
+
+class SemanticCache:
+    """
+    Cache semântico para `/gameplay/ask`
+
+    Mantém um índice (matriz NumPy) das perguntas já respondidas e, quando uma
+    pergunta nova é parecida o bastante (similaridade de cosseno acima de
+    SEMANTIC_CACHE_THRESHOLD) com uma delas, reaproveita a resposta salva na
+    chave de cache exata daquela pergunta. Além da similaridade, as duas
+    perguntas precisam ter a mesma `meaning_signature`: "driblar" x "não
+    driblar" ou "build para CF" x "build para CB" têm cosseno alto, mas não
+    são a mesma pergunta.
+
+    O índice é compartilhado entre workers por um sorted set no Redis
+    (score = timestamp), sincronizado de forma incremental em background.
+    """
+
+    def __init__(self):
+        self.enabled = NUMPY_AVAILABLE and settings.SEMANTIC_CACHE_ENABLED
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.max_entries = settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.index_key = settings.SEMANTIC_CACHE_INDEX_KEY
+        self.sync_interval = settings.SEMANTIC_CACHE_SYNC_INTERVAL
+        self.vectorizer: Optional[HashedNgramVectorizer] = None
+        self._matrix = None
+        self._keys: List[Optional[str]] = []
+        self._canonical: List[Optional[str]] = []
+        self._signatures: List[Optional[Tuple[str, ...]]] = []
+        self._seen: Set[str] = set()  # "<chave>|<pergunta canônica>" já indexadas
+        self._size = 0
+        self._next_row = 0  # buffer circular: sobrescreve a entrada mais antiga
+        self._last_sync = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_index(self):
+        if self.vectorizer is not None:
+            return
+        self.vectorizer = HashedNgramVectorizer(settings.SEMANTIC_CACHE_DIM)
+        self.vectorizer.fit(self._knowledge_base_documents())
+        self._matrix = np.zeros((self.max_entries, self.vectorizer.dim), dtype=np.float32)
+        self._keys = [None] * self.max_entries
+        self._canonical = [None] * self.max_entries
+        self._signatures = [None] * self.max_entries
+
+    def _knowledge_base_documents(self) -> List[str]:
+        documents = []
+        for problema in rag_service.problemas_gameplay.get("problemas_gameplay", []):
+            documents.append(f"{problema['sintoma']} {problema.get('causa_raiz', '')}")
+        for faq in rag_service.gameplay_data.get("faqs", []):
+            documents.append(f"{faq['question']} {faq.get('answer', '')}")
+        return documents
+
+    def _add_local(self, question: str, cache_key: str):
+        canonical = canonicalize_question(question)
+        entry_id = f"{cache_key}|{canonical}"
+        if entry_id in self._seen:
+            return
+
+        row = self._next_row
+        if self._keys[row] is not None:
+            self._seen.discard(f"{self._keys[row]}|{self._canonical[row]}")
+        self._matrix[row] = self.vectorizer.transform(question)
+        self._keys[row] = cache_key
+        self._canonical[row] = canonical
+        self._signatures[row] = meaning_signature(question)
+        self._seen.add(entry_id)
+        self._next_row = (row + 1) % self.max_entries
+        self._size = min(self._size + 1, self.max_entries)
+
+    def _drop_row(self, row: int):
+        self._seen.discard(f"{self._keys[row]}|{self._canonical[row]}")
+        self._matrix[row] = 0
+        self._keys[row] = None
+        self._canonical[row] = None
+        self._signatures[row] = None
+
+    async def lookup(self, question: str) -> Optional[dict]:
+        """Retorna a resposta em cache da pergunta mais parecida, se passar do limiar"""
+        if not self.enabled:
+            return None
+        self._ensure_index()
+        if self._size == 0:
+            return None
+
+        query = self.vectorizer.transform(question)
+        signature = meaning_signature(question)
+        scores = self._matrix[:self._size] @ query
+        # Testa os melhores candidatos: a resposta de algum pode ter expirado
+        for row in np.argsort(scores)[::-1][:3]:
+            row = int(row)
+            if scores[row] < self.threshold:
+                break
+            if self._signatures[row] != signature:
+                continue
+            cache_key = self._keys[row]
+            cached = await cache_service.get(cache_key)
+            if cached is not None:
+                cached["question"] = question
+                return cached
+            self._drop_row(row)
+        return None
+
+    async def add(self, question: str, cache_key: str):
+        """Indexa uma pergunta respondida (a resposta fica na chave exata)"""
+        if not self.enabled:
+            return
+        self._ensure_index()
+        self._add_local(question, cache_key)
+
+        if cache_service.redis_client:
+            try:
+                async with cache_service.redis_client.pipeline(transaction=False) as pipe:
+                    pipe.zadd(self.index_key, {json.dumps([cache_key, question], ensure_ascii=False): time.time()})
+                    pipe.zremrangebyrank(self.index_key, 0, -self.max_entries - 1)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"⚠️  Erro ao publicar no índice semântico: {e}")
+
+    async def sync(self):
+        """Carrega do Redis as perguntas indexadas por outros workers desde a última sincronização"""
+        if not self.enabled or not cache_service.redis_client:
+            return
+        self._ensure_index()
+        try:
+            now = time.time()
+            members = await cache_service.redis_client.zrangebyscore(
+                self.index_key, self._last_sync, "+inf", start=0, num=self.max_entries
+            )
+            # Margem para diferenças de relógio entre workers (duplicatas são ignoradas)
+            self._last_sync = now - 5
+        except Exception as e:
+            print(f"⚠️  Erro ao sincronizar índice semântico: {e}")
+            return
+
+        for member in members:
+            try:
+                cache_key, question = json.loads(member)
+            except (TypeError, ValueError):
+                continue
+            self._add_local(question, cache_key)
+
+    async def start(self):
+        if not self.enabled:
+            return
+        await self.sync()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await self.sync()
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,242 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+from app.core.config import settings
+from app.services.cache_service import cache_service
+
+
+class Flight:
+    """Geração em andamento registrada por `SingleFlight.lead`"""
+
+    def __init__(self):
+        self.value: Optional[Dict] = None
+
+
+def _consume_exception(future: asyncio.Future):
+    # Evita o aviso "exception was never retrieved" quando ninguém aguardava a geração
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """
+    Coalescência de requisições idênticas (single-flight)
+
+    A primeira requisição que não encontra a chave no cache gera o valor;
+    as duplicatas concorrentes aguardam esse mesmo resultado em vez de
+    chamar a IA de novo.
+
+    - No mesmo worker: um Future por chave em andamento
+    - Entre workers: lease no Redis (`lease:<chave>`); quem não obteve o lease
+      aguarda o valor aparecer no cache
+    """
+
+    def __init__(self):
+        self.lease_ttl = settings.SINGLE_FLIGHT_LEASE_TTL
+        self.wait_timeout = settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+        self.poll_interval = settings.SINGLE_FLIGHT_POLL_INTERVAL
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()  # mantém referência das tarefas em background
+
+    def _register(self, key: str) -> Optional[asyncio.Future]:
+        if key in self._inflight:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_exception)
+        self._inflight[key] = future
+        return future
+
+    def _resolve(
+        self,
+        key: str,
+        future: asyncio.Future,
+        value: Optional[Dict] = None,
+        error: Optional[BaseException] = None
+    ):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if future.done():
+            return
+        if error is not None:
+            # Cancelamento do líder não deve cancelar quem está aguardando
+            if not isinstance(error, Exception):
+                error = RuntimeError("Geração cancelada")
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    async def _wait_remote(self, key: str) -> Optional[Dict]:
+        """
+        Aguarda outro worker preencher o cache (retorna None em timeout ou falha do líder)
+
+        O polling lê só L1/Redis: o líder grava no Redis, então consultar o
+        ai_cache a cada volta seria uma query ao banco por intervalo.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            cached = await cache_service.get(key, read_through=False)
+            if cached is not None:
+                return cached
+            if not await cache_service.has_lease(key):
+                # Líder terminou entre as verificações ou falhou
+                return await cache_service.get(key, read_through=False)
+        return None
+
+    async def _generate(
+        self,
+        key: str,
+        producer: Callable[[], Awaitable[Dict]],
+        expire: int,
+        soft_ttl: Optional[int]
+    ) -> Tuple[Dict, bool]:
+        token = uuid.uuid4().hex
+        while True:
+            if await cache_service.acquire_lease(key, token, self.lease_ttl):
+                try:
+                    # Outro worker pode ter preenchido o cache logo antes do lease
+                    cached = await cache_service.get(key)
+                    if cached is not None:
+                        return cached, False
+                    value = await producer()
+                    await cache_service.set(key, value, expire=expire, soft_ttl=soft_ttl)
+                    return value, True
+                finally:
+                    await cache_service.release_lease(key, token)
+
+            # Outro worker está gerando: aguarda o resultado dele
+            value = await self._wait_remote(key)
+            if value is not None:
+                return value, False
+
+            if await cache_service.has_lease(key):
+                # Líder ainda ativo, mas lento demais: gera sem coordenação
+                value = await producer()
+                await cache_service.set(key, value, expire=expire, soft_ttl=soft_ttl)
+                return value, True
+            # Líder falhou: disputa o lease novamente
+
+    async def do(
+        self,
+        key: str,
+        producer: Callable[[], Awaitable[Dict]],
+        expire: int,
+        soft_ttl: Optional[int] = None
+    ) -> Tuple[Dict, bool]:
+        """
+        Retorna o valor da chave, gerando-o no máximo uma vez entre requisições concorrentes
+
+        O valor gerado é salvo no cache com `expire` (e `soft_ttl`, se informado).
+        Retorna (valor, gerado), onde `gerado` é False quando o resultado veio
+        de outra requisição.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            value = await asyncio.shield(future)
+            return dict(value), False
+
+        future = self._register(key)
+        try:
+            value, generated = await self._generate(key, producer, expire, soft_ttl)
+        except BaseException as e:
+            self._resolve(key, future, error=e)
+            raise
+
+        self._resolve(key, future, value=value)
+        return dict(value), generated
+
+    def refresh(
+        self,
+        key: str,
+        producer: Callable[[], Awaitable[Dict]],
+        expire: int,
+        soft_ttl: int
+    ):
+        """
+        Agenda a regeneração em background de um valor stale (stale-while-revalidate)
+
+        No máximo uma regeneração por chave: uma por worker (conjunto local) e
+        uma entre workers (lease no Redis).
+        """
+        if key in self._refreshing or key in self._inflight:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(key, producer, expire, soft_ttl))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(
+        self,
+        key: str,
+        producer: Callable[[], Awaitable[Dict]],
+        expire: int,
+        soft_ttl: int
+    ):
+        token = uuid.uuid4().hex
+        try:
+            if not await cache_service.acquire_lease(key, token, self.lease_ttl):
+                return  # outro worker já está regenerando
+            try:
+                # Outro worker pode ter acabado de regenerar
+                if await cache_service.is_fresh(key):
+                    return
+                value = await producer()
+                await cache_service.set(key, value, expire=expire, soft_ttl=soft_ttl)
+            finally:
+                await cache_service.release_lease(key, token)
+        except Exception as e:
+            print(f"⚠️  Falha ao revalidar cache de {key}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def join(self, key: str) -> Optional[Dict]:
+        """
+        Aguarda uma geração já em andamento para a chave (neste ou em outro worker)
+
+        Retorna None se não houver geração em andamento ou se ela falhar.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                return dict(await asyncio.shield(future))
+            except Exception:
+                return None
+
+        if await cache_service.has_lease(key):
+            return await self._wait_remote(key)
+        return None
+
+    @asynccontextmanager
+    async def lead(self, key: str) -> AsyncIterator[Flight]:
+        """
+        Registra uma geração em streaming como a geração em andamento da chave
+
+        Quem chamar `join` durante o stream recebe `flight.value` ao final.
+        O cache deve ser preenchido por quem gera (ex: no fim do stream).
+        """
+        flight = Flight()
+        future = self._register(key)
+        token = uuid.uuid4().hex
+        acquired = False
+        try:
+            acquired = await cache_service.acquire_lease(key, token, self.lease_ttl)
+            yield flight
+        except BaseException as e:
+            if future is not None:
+                self._resolve(key, future, error=e)
+            raise
+        else:
+            if future is not None:
+                if flight.value is None:
+                    self._resolve(key, future, error=RuntimeError("Geração não concluída"))
+                else:
+                    self._resolve(key, future, value=flight.value)
+        finally:
+            if acquired:
+                await cache_service.release_lease(key, token)
+
+
+single_flight = SingleFlight()
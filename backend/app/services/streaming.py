@@ -0,0 +1,58 @@
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+# Cabeçalhos para Server-Sent Events (evita buffering em proxies como nginx)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Formata um evento SSE com payload JSON"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def replay_response(
+    response_data: Dict,
+    text_field: str,
+    chunk_size: int = 64
+) -> AsyncIterator[str]:
+    """
+    Reenvia uma resposta pronta (cache/FAQ) pela mesma interface de streaming
+
+    Eventos: vários `token` com pedaços do texto e um `done` com a resposta completa
+    """
+    text = response_data.get(text_field) or ""
+    for i in range(0, len(text), chunk_size):
+        yield sse_event("token", {"content": text[i:i + chunk_size]})
+    yield sse_event("done", response_data)
+
+
+async def stream_response(
+    tokens: AsyncIterator[str],
+    on_complete: Callable[[str], Awaitable[Dict]],
+    on_error: Optional[Callable[[], Awaitable[None]]] = None
+) -> AsyncIterator[str]:
+    """
+    Repassa os tokens gerados pela IA como eventos SSE
+
+    Ao final do stream, `on_complete` recebe o texto montado (para salvar no cache)
+    e retorna a resposta completa, enviada no evento `done`. Se a geração
+    falhar, `on_error` é chamado (ex: devolver a quota) antes do evento `error`.
+    """
+    parts = []
+    try:
+        async for token in tokens:
+            parts.append(token)
+            yield sse_event("token", {"content": token})
+    except Exception as e:
+        if on_error is not None:
+            await on_error()
+        yield sse_event("error", {"detail": f"Erro ao gerar resposta: {str(e)}"})
+        return
+
+    response_data = await on_complete("".join(parts))
+    yield sse_event("done", response_data)
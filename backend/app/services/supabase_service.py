@@ -1,13 +1,50 @@
-from supabase import create_client, Client
-from datetime import datetime, timezone, timedelta
+from supabase import AsyncClient, AsyncClientOptions, Client, acreate_client, create_client
+from datetime import datetime, timezone
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from typing import Optional, Dict
 
 
 class SupabaseService:
+    """
+    Acesso ao Supabase
+    
+    - `table()` / `db`: cliente assíncrono de dados. Um único cliente por
+      worker, com a sessão HTTP (pool de conexões) compartilhada entre as
+      requisições; as chamadas são aguardadas sem bloquear o event loop.
+    - `auth_client`: cliente assíncrono separado para sign_up/sign_in, para
+      que o login de um usuário não troque o token usado nas consultas.
+    - `client`: cliente síncrono, mantido para os scripts (create_admin.py etc).
+    """
+    
     def __init__(self):
         self.client: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        self.db: Optional[AsyncClient] = None
+        self.auth_client: Optional[AsyncClient] = None
+    
+    async def connect(self):
+        """Cria os clientes assíncronos (chamar no startup da aplicação)"""
+        if self.db is not None:
+            return
+        options = AsyncClientOptions(postgrest_client_timeout=settings.SUPABASE_TIMEOUT_SECONDS)
+        self.db = await acreate_client(settings.SUPABASE_URL, settings.SUPABASE_KEY, options=options)
+        self.auth_client = await acreate_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_KEY,
+            options=AsyncClientOptions(auto_refresh_token=False, persist_session=False)
+        )
+    
+    async def close(self):
+        if self.db is not None:
+            try:
+                await self.db.postgrest.aclose()
+            except Exception as e:
+                print(f"⚠️  Erro ao fechar cliente Supabase: {e}")
+        self.db = self.auth_client = None
+    
+    def table(self, name: str):
+        """Query builder assíncrono: `await supabase_service.table("x").select("*").execute()`"""
+        return self.db.table(name)
     
     async def create_user(
         self, 
@@ -19,7 +56,7 @@ class SupabaseService:
         """Cria um novo usuário"""
         try:
             # Criar no Supabase Auth com metadata
-            auth_response = self.client.auth.sign_up({
+            auth_response = await self.auth_client.auth.sign_up({
                 "email": email,
                 "password": password,
                 "options": {
@@ -44,13 +81,13 @@ class SupabaseService:
                 }
                 
                 try:
-                    self.client.table("users").insert(user_data).execute()
+                    await self.table("users").insert(user_data).execute()
                 except Exception as e:
                     error_msg = str(e).lower()
                     if "could not find the 'platform' column" in error_msg:
                         print("⚠️  Coluna 'platform' não encontrada. Tentando inserir sem ela...")
                         user_data.pop("platform", None)
-                        self.client.table("users").insert(user_data).execute()
+                        await self.table("users").insert(user_data).execute()
                     else:
                         raise e
                 
@@ -72,7 +109,7 @@ class SupabaseService:
     async def authenticate_user(self, email: str, password: str) -> Optional[Dict]:
         """Autentica usuário"""
         try:
-            auth_response = self.client.auth.sign_in_with_password({
+            auth_response = await self.auth_client.auth.sign_in_with_password({
                 "email": email,
                 "password": password
             })
@@ -82,7 +119,7 @@ class SupabaseService:
                 
                 # Tentar buscar role da tabela users
                 try:
-                    user_data = self.client.table("users").select("role, platform, name").eq("id", user_id).execute()
+                    user_data = await self.table("users").select("role, platform, name").eq("id", user_id).execute()
                     if user_data.data and len(user_data.data) > 0:
                         user_record = user_data.data[0]
                         return {
@@ -116,31 +153,8 @@ class SupabaseService:
     
     async def get_user(self, user_id: str) -> Optional[Dict]:
         """Busca usuário por ID"""
-        response = self.client.table("users").select("*").eq("id", user_id).execute()
+        response = await self.table("users").select("*").eq("id", user_id).execute()
         return response.data[0] if response.data else None
-    
-    async def check_and_increment_quota(self, user_id: str) -> bool:
-        """
-        Verifica e incrementa quota de perguntas
-        Como a tabela users pode não existir, sempre retorna True (sem limite)
-        TODO: Implementar sistema de quota com Redis ou outra tabela
-        """
-        # Temporariamente sem limite até configurar tabela users corretamente
-        return True
-    
-    async def get_quota_info(self, user_id: str) -> Dict:
-        """
-        Retorna informações de quota
-        Como a tabela users pode não existir, retorna quota ilimitada
-        """
-        # Retornar dados padrão sem depender da tabela users
-        return {
-            "daily_limit": settings.FREE_TIER_DAILY_LIMIT,
-            "questions_used": 0,
-            "questions_remaining": settings.FREE_TIER_DAILY_LIMIT,
-            "role": "free",
-            "reset_time": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
-        }
 
 
 supabase_service = SupabaseService()
@@ -0,0 +1,113 @@
+import hashlib
+import re
+import unicodedata
+from typing import List
+
+# Palavras sem valor de busca em perguntas de jogadores (já sem acento)
+PT_STOPWORDS = frozenset({
+    "a", "o", "as", "os", "um", "uma", "uns", "umas",
+    "de", "da", "do", "das", "dos", "d", "em", "no", "na", "nos", "nas", "num", "numa",
+    "ao", "aos", "para", "pra", "pro", "pras", "pros", "por", "pelo", "pela", "pelos", "pelas",
+    "e", "ou", "mas", "que", "se", "ja", "so", "tambem", "ate",
+    "eu", "me", "mim", "meu", "minha", "meus", "minhas", "voce", "vc", "voces", "ele", "ela",
+    "seu", "sua", "seus", "suas", "isso", "isto", "esse", "essa", "este", "esta", "aquele", "aquela",
+    "como", "qual", "quais", "quando", "onde", "porque", "pq", "oque",
+    "eh", "ser", "sou", "estou", "ter", "tem", "tenho",
+    "faco", "faz", "fazer", "dar", "dou", "consigo", "conseguir", "posso", "poder", "devo", "dever",
+    "muito", "muita", "muitos", "muitas", "bem", "ainda",
+    "demais", "alguma", "algum", "dica", "dicas", "ajuda", "ajudem", "alguem", "favor", "ai", "la",
+    "efootball", "pes",
+})
+
+# Palavras de negação/polaridade: mudam o sentido da pergunta ("com bola" x
+# "sem bola", "mais" x "menos") e por isso nunca são stopwords
+POLARITY_WORDS = frozenset({"com", "sem", "mais", "menos", "sempre", "nunca", "nao", "nem"})
+
+# Plurais irregulares (plural → singular)
+_PLURALS = (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ns", "m"))
+
+# Sufixos removidos pelo stemmer leve (ordem: mais longo primeiro)
+_SUFFIXES = (
+    "amente", "mente",
+    "acao", "icao",
+    "ando", "endo", "indo",
+    "aram", "eram", "iram", "avam", "am",
+    "ar", "er", "ir",
+)
+
+# Números ligados por hífen (formações como "4-2-3-1") formam um token só
+_TOKEN_RE = re.compile(r"[0-9]+(?:-[0-9]+)+|[a-z0-9]+")
+
+
+def fold_accents(text: str) -> str:
+    """Remove acentos e cedilha (ex: "finalização" → "finalizacao")"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sem acento e sem pontuação (exceto o hífen das formações)"""
+    return _TOKEN_RE.findall(fold_accents(text.lower()))
+
+
+def stem(token: str) -> str:
+    """
+    Stemmer leve para português: remove plural, flexões verbais comuns e vogal final
+    Ex: "chutar", "chute", "chutes" → "chut"
+    """
+    if len(token) <= 3 or not token.isalpha():
+        return token
+
+    # 1. Plural
+    for plural, singular in _PLURALS:
+        if token.endswith(plural):
+            token = token[:-len(plural)] + singular
+            break
+    else:
+        if token.endswith("s"):
+            token = token[:-1]
+
+    # 2. Flexões verbais e sufixos derivacionais
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+
+    # 3. Vogal temática / gênero
+    if len(token) > 3 and token[-1] in "aeo":
+        token = token[:-1]
+    return token
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Tokens normalizados: sem acento, sem pontuação, sem stopwords e com stemming (exceto polaridade)"""
+    return [t if t in POLARITY_WORDS else stem(t) for t in tokenize(text) if t not in PT_STOPWORDS]
+
+
+def canonicalize_question(question: str) -> str:
+    """
+    Forma canônica de uma pergunta, usada como base da chave de cache
+
+    Perguntas com as mesmas palavras de conteúdo na mesma ordem (independente
+    de acento, pontuação, caixa, espaços, stopwords ou repetições) têm a mesma
+    forma canônica. A ordem nunca é descartada: "tocar do lateral para o
+    ponta" x "do ponta para o lateral", "4-4-2" x "4-2-4" e "defender mais e
+    atacar menos" x "defender menos e atacar mais" são perguntas diferentes.
+    Palavras de polaridade (POLARITY_WORDS) repetidas são mantidas.
+    """
+    tokens = normalize_tokens(question)
+    if not tokens:
+        # Pergunta só com stopwords: usa o texto limpo inteiro
+        return " ".join(tokenize(question))
+    seen = set()
+    canonical = []
+    for token in tokens:
+        if token in POLARITY_WORDS or token not in seen:
+            canonical.append(token)
+            seen.add(token)
+    return " ".join(canonical)
+
+
+def stable_hash(text: str) -> str:
+    """SHA-256 hexadecimal (estável entre processos, ao contrário de hash())"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
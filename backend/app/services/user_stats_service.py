@@ -0,0 +1,313 @@
+import asyncio
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.services.activity_service import (
+    activity_service, ACTIVITY_BUILD_QUERY, ACTIVITY_GAMEPLAY_QUESTION
+)
+from app.services.cache_service import cache_service
+from app.services.supabase_service import supabase_service
+
+COUNTER_FIELDS = ("total_questions", "builds_consulted", "gameplay_questions")
+
+# Soma os valores já gravados em user_stats uma única vez por usuário
+# (HSETNX decide qual worker faz a carga inicial)
+SEED_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], 'seeded', 1) == 0 then
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], 'total_questions', ARGV[1])
+redis.call('HINCRBY', KEYS[1], 'builds_consulted', ARGV[2])
+redis.call('HINCRBY', KEYS[1], 'gameplay_questions', ARGV[3])
+if ARGV[4] ~= '' then
+    redis.call('HSETNX', KEYS[1], 'last_active', ARGV[4])
+end
+if ARGV[5] ~= '' then
+    redis.call('ZADD', KEYS[2], 'NX', 0, ARGV[5])
+end
+if ARGV[6] ~= '' then
+    redis.call('ZADD', KEYS[3], 'NX', 0, ARGV[6])
+end
+return 1
+"""
+
+
+def stats_cache_key(user_id: str) -> str:
+    """Chave do cache de `GET /users/stats`"""
+    return f"user_stats:{user_id}"
+
+
+class _UserDelta:
+    """Atividade de um usuário ainda não aplicada aos totais"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.positions = Counter()
+        self.players = Counter()
+        self.last_active: Optional[str] = None
+
+
+class UserStatsService:
+    """
+    Agregação incremental de `user_stats` a partir das atividades
+
+    Cada evento do activity_service é somado a um delta em memória (sem I/O).
+    Periodicamente, os deltas são aplicados aos totais e `user_stats` é
+    atualizado em lote (upsert por user_id):
+
+    - Com Redis: contadores em um hash e posições/jogadores em sorted sets por
+      usuário (`stats:{id}`), compartilhados entre workers. Na primeira vez,
+      os valores já gravados no banco são somados (SEED_SCRIPT).
+    - Sem Redis: totais em memória por worker.
+
+    Os totais gravados também vão para o cache de `GET /users/stats`.
+    """
+
+    def __init__(self):
+        self.flush_interval = settings.USER_STATS_FLUSH_INTERVAL
+        self.batch_size = settings.USER_STATS_BATCH_SIZE
+        self.cache_ttl = settings.USER_STATS_CACHE_TTL
+        self.redis_ttl = settings.USER_STATS_REDIS_TTL
+        self._deltas: Dict[str, _UserDelta] = {}
+        self._totals: Dict[str, Dict] = {}  # fallback sem Redis
+        self._seed = None
+        self._seed_client = None
+        self._task: Optional[asyncio.Task] = None
+
+    def observe(self, event: Dict):
+        """Soma um evento de atividade ao delta do usuário"""
+        delta = self._deltas.get(event["user_id"])
+        if delta is None:
+            delta = self._deltas[event["user_id"]] = _UserDelta()
+
+        data = event.get("activity_data") or {}
+        if event["activity_type"] == ACTIVITY_BUILD_QUERY:
+            delta.counts["total_questions"] += 1
+            delta.counts["builds_consulted"] += 1
+            if data.get("position"):
+                delta.positions[data["position"]] += 1
+            if data.get("player_name"):
+                delta.players[data["player_name"]] += 1
+        elif event["activity_type"] == ACTIVITY_GAMEPLAY_QUESTION:
+            delta.counts["total_questions"] += 1
+            delta.counts["gameplay_questions"] += 1
+        delta.last_active = event["created_at"]
+
+    async def _load_rows(self, user_ids: List[str]) -> Dict[str, Dict]:
+        """Linhas atuais de user_stats (carga inicial dos totais)"""
+        rows = {}
+        for i in range(0, len(user_ids), self.batch_size):
+            response = await (
+                supabase_service.table("user_stats")
+                .select("user_id, " + ", ".join(COUNTER_FIELDS) + ", favorite_position, most_searched_player, last_active")
+                .in_("user_id", user_ids[i:i + self.batch_size])
+                .execute()
+            )
+            for row in response.data or []:
+                rows[str(row["user_id"])] = row
+        return rows
+
+    def _keys(self, user_id: str) -> List[str]:
+        return [f"stats:{user_id}", f"stats:{user_id}:positions", f"stats:{user_id}:players"]
+
+    def _seed_script(self, client):
+        if self._seed_client is not client:
+            self._seed = client.register_script(SEED_SCRIPT)
+            self._seed_client = client
+        return self._seed
+
+    async def _apply_redis(self, client, deltas: Dict[str, _UserDelta]) -> List[Dict]:
+        user_ids = list(deltas)
+
+        pipe = client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hexists(self._keys(user_id)[0], "seeded")
+        seeded = await pipe.execute()
+        unseeded = [user_id for user_id, done in zip(user_ids, seeded) if not done]
+        base_rows = await self._load_rows(unseeded) if unseeded else {}
+
+        seed = self._seed_script(client)
+        pipe = client.pipeline(transaction=False)
+        for user_id in unseeded:
+            row = base_rows.get(user_id, {})
+            await seed(
+                keys=self._keys(user_id),
+                args=[
+                    *(row.get(field) or 0 for field in COUNTER_FIELDS),
+                    row.get("last_active") or "",
+                    row.get("favorite_position") or "",
+                    row.get("most_searched_player") or "",
+                ],
+                client=pipe
+            )
+        for user_id, delta in deltas.items():
+            stats_key, positions_key, players_key = self._keys(user_id)
+            for field, amount in delta.counts.items():
+                pipe.hincrby(stats_key, field, amount)
+            for position, amount in delta.positions.items():
+                pipe.zincrby(positions_key, amount, position)
+            for player, amount in delta.players.items():
+                pipe.zincrby(players_key, amount, player)
+            if delta.last_active:
+                pipe.hset(stats_key, "last_active", delta.last_active)
+            for key in (stats_key, positions_key, players_key):
+                pipe.expire(key, self.redis_ttl)
+        for user_id in user_ids:
+            stats_key, positions_key, players_key = self._keys(user_id)
+            pipe.hgetall(stats_key)
+            pipe.zrevrange(positions_key, 0, 0)
+            pipe.zrevrange(players_key, 0, 0)
+        results = await pipe.execute()
+
+        reads = results[len(results) - 3 * len(user_ids):]
+        rows = []
+        for i, user_id in enumerate(user_ids):
+            stats, top_position, top_player = reads[3 * i:3 * i + 3]
+            rows.append(self._row(
+                user_id,
+                {field: int(stats.get(field) or 0) for field in COUNTER_FIELDS},
+                top_position[0] if top_position else None,
+                top_player[0] if top_player else None,
+                stats.get("last_active")
+            ))
+        return rows
+
+    async def _apply_memory(self, deltas: Dict[str, _UserDelta]) -> List[Dict]:
+        unseeded = [user_id for user_id in deltas if user_id not in self._totals]
+        base_rows = await self._load_rows(unseeded) if unseeded else {}
+        for user_id in unseeded:
+            row = base_rows.get(user_id, {})
+            self._totals[user_id] = {
+                "counts": Counter({field: row.get(field) or 0 for field in COUNTER_FIELDS}),
+                # Favoritos já gravados entram com peso 0 (qualquer consulta nova vence)
+                "positions": Counter({row["favorite_position"]: 0} if row.get("favorite_position") else {}),
+                "players": Counter({row["most_searched_player"]: 0} if row.get("most_searched_player") else {}),
+                "last_active": row.get("last_active"),
+            }
+
+        rows = []
+        for user_id, delta in deltas.items():
+            totals = self._totals[user_id]
+            totals["counts"].update(delta.counts)
+            totals["positions"].update(delta.positions)
+            totals["players"].update(delta.players)
+            totals["last_active"] = delta.last_active or totals["last_active"]
+            top_position = totals["positions"].most_common(1)
+            top_player = totals["players"].most_common(1)
+            rows.append(self._row(
+                user_id,
+                {field: totals["counts"][field] for field in COUNTER_FIELDS},
+                top_position[0][0] if top_position else None,
+                top_player[0][0] if top_player else None,
+                totals["last_active"]
+            ))
+        return rows
+
+    def _row(
+        self,
+        user_id: str,
+        counts: Dict[str, int],
+        favorite_position: Optional[str],
+        most_searched_player: Optional[str],
+        last_active: Optional[str]
+    ) -> Dict:
+        now = datetime.now(timezone.utc).isoformat()
+        return {
+            "user_id": user_id,
+            **counts,
+            "favorite_position": favorite_position,
+            "most_searched_player": most_searched_player,
+            "last_active": last_active or now,
+            "updated_at": now,
+        }
+
+    def _requeue(self, deltas: Dict[str, _UserDelta]):
+        """Devolve deltas não aplicados (somando aos que chegaram nesse meio tempo)"""
+        for user_id, delta in deltas.items():
+            current = self._deltas.setdefault(user_id, _UserDelta())
+            current.counts.update(delta.counts)
+            current.positions.update(delta.positions)
+            current.players.update(delta.players)
+            current.last_active = current.last_active or delta.last_active
+
+    async def flush(self):
+        """Aplica os deltas pendentes e grava user_stats em lote"""
+        if not self._deltas:
+            return
+        deltas, self._deltas = self._deltas, {}
+
+        try:
+            if cache_service.redis_client:
+                rows = await self._apply_redis(cache_service.redis_client, deltas)
+            else:
+                rows = await self._apply_memory(deltas)
+        except Exception as e:
+            print(f"⚠️  Erro ao agregar user_stats: {e}")
+            self._requeue(deltas)
+            return
+
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            try:
+                await (
+                    supabase_service.table("user_stats")
+                    .upsert(batch, on_conflict="user_id")
+                    .execute()
+                )
+            except Exception as e:
+                print(f"⚠️  Erro ao gravar user_stats ({len(batch)} usuários): {e}")
+                # Os totais já foram aplicados: a próxima gravação só precisa relê-los
+                for row in batch:
+                    self._deltas.setdefault(row["user_id"], _UserDelta())
+
+        await cache_service.set_many(
+            {stats_cache_key(row["user_id"]): self.response_data(row) for row in rows},
+            expire=self.cache_ttl
+        )
+
+    def response_data(self, row: Dict) -> Dict:
+        """Formato de `GET /users/stats` a partir de uma linha de user_stats"""
+        return {
+            **{field: row.get(field) or 0 for field in COUNTER_FIELDS},
+            "favorite_position": row.get("favorite_position"),
+            "most_searched_player": row.get("most_searched_player"),
+            "last_active": row.get("last_active") or row.get("created_at"),
+        }
+
+    async def get_stats(self, user_id: str) -> Optional[Dict]:
+        """Estatísticas do usuário (cache curto na frente de user_stats)"""
+        cache_key = stats_cache_key(user_id)
+        cached = await cache_service.get(cache_key)
+        if cached:
+            return cached
+
+        response = await supabase_service.table("user_stats").select("*").eq("user_id", user_id).execute()
+        if not response.data:
+            return None
+        stats = self.response_data(response.data[0])
+        await cache_service.set(cache_key, stats, expire=self.cache_ttl)
+        return stats
+
+    async def start(self):
+        activity_service.subscribe(self.observe)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Para a agregação periódica e grava os deltas restantes"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+user_stats_service = UserStatsService()
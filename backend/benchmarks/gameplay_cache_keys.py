@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark de hit rate das chaves de cache de gameplay
+
+Compara a chave antiga (hash() dos primeiros 100 caracteres) com a chave
+canônica (normalização + SHA-256) em um corpus de perguntas parafraseadas, e
+confere que perguntas de sentido oposto ("com bola" x "sem bola", "4-4-2" x
+"4-2-4", "do lateral para o ponta" x "do ponta para o lateral") não dividem a
+mesma chave.
+
+Uso (a partir de backend/):
+    python -m benchmarks.gameplay_cache_keys [--workers 4] [--rounds 3]
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Callable, List
+
+from app.services.text_normalizer import canonicalize_question, stable_hash
+
+DATA_FILE = Path(__file__).parent / "data" / "paraphrased_questions.json"
+
+
+def legacy_key(question: str, worker: int) -> str:
+    # hash() é randomizado por processo (PYTHONHASHSEED): cada worker tem seu próprio espaço de chaves
+    clean_question = question.lower().strip()[:100]
+    return f"gameplay:{hash((worker, clean_question))}"
+
+
+def canonical_key(question: str, worker: int) -> str:
+    return f"gameplay:{stable_hash(canonicalize_question(question))}"
+
+
+def hit_rate(requests: List[str], key_fn: Callable[[str, int], str], workers: int) -> float:
+    """Simula um cache compartilhado (Redis) com requisições distribuídas em round-robin"""
+    seen = set()
+    hits = 0
+    for i, question in enumerate(requests):
+        key = key_fn(question, i % workers)
+        if key in seen:
+            hits += 1
+        else:
+            seen.add(key)
+    return hits / len(requests) if requests else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="workers uvicorn simulados")
+    parser.add_argument("--rounds", type=int, default=3, help="vezes que cada pergunta é feita")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data = json.loads(DATA_FILE.read_text(encoding="utf-8"))
+    groups = data["grupos"]
+    questions = [q for group in groups for q in group]
+
+    requests = questions * args.rounds
+    random.Random(args.seed).shuffle(requests)
+
+    # Melhor caso possível: uma geração por intenção
+    ideal = 1 - len(groups) / len(requests)
+
+    print("=" * 70)
+    print("📊 HIT RATE DAS CHAVES DE CACHE DE GAMEPLAY")
+    print("=" * 70)
+    print(f"Grupos (intenções): {len(groups)}")
+    print(f"Perguntas distintas: {len(questions)}")
+    print(f"Requisições simuladas: {len(requests)} ({args.workers} workers)")
+    print()
+    print(f"{'Esquema':<40}{'Hit rate':>10}")
+    print("-" * 50)
+    print(f"{'Antigo, 1 worker':<40}{hit_rate(requests, legacy_key, 1):>10.1%}")
+    print(f"{f'Antigo, {args.workers} workers':<40}{hit_rate(requests, legacy_key, args.workers):>10.1%}")
+    print(f"{f'Canônico, {args.workers} workers':<40}{hit_rate(requests, canonical_key, args.workers):>10.1%}")
+    print(f"{'Ideal (1 miss por intenção)':<40}{ideal:>10.1%}")
+    print()
+
+    # Colisões: perguntas longas diferentes com o mesmo prefixo de 100 caracteres
+    long_questions = data["prefixo_longo"]
+    legacy_keys = {legacy_key(q, 0) for q in long_questions}
+    new_keys = {canonical_key(q, 0) for q in long_questions}
+    print(f"Perguntas longas com prefixo comum: {len(long_questions)}")
+    print(f"  Chaves distintas (antigo):   {len(legacy_keys)}")
+    print(f"  Chaves distintas (canônico): {len(new_keys)}")
+
+    # Perguntas de sentido oposto nunca podem dividir a mesma chave
+    merged = [pair for pair in data["opostos"] if canonical_key(pair[0], 0) == canonical_key(pair[1], 0)]
+    print(f"Pares de sentido oposto: {len(data['opostos'])}")
+    print(f"  Com a mesma chave (canônico): {len(merged)}")
+    for first, second in merged:
+        print(f"   ❌ {first!r} = {second!r}")
+
+    # Grupos que não colapsaram em uma única chave canônica
+    split_groups = [g for g in groups if len({canonical_key(q, 0) for q in g}) > 1]
+    if split_groups:
+        print()
+        print(f"⚠️  {len(split_groups)} grupo(s) com mais de uma chave canônica:")
+        for group in split_groups:
+            for q in group:
+                print(f"   {canonicalize_question(q)!r:<45} ← {q}")
+
+
+if __name__ == "__main__":
+    main()
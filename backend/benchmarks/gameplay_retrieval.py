@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark de recall e latência da busca de contexto de gameplay
+
+Compara, em perguntas rotuladas (benchmarks/data/gameplay_queries.json):
+- bm25:    scorer atual (BM25 do sintoma + boost por categoria, depois FAQs)
+- dense:   busca vetorial local (DenseRetriever, NumPy)
+- híbrido: trechos que find_gameplay_context coloca no prompt
+
+Uso (a partir de backend/):
+    python -m benchmarks.gameplay_retrieval [--k 3] [--min-score 0.15] [--repeat 200]
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from app.services.dense_retrieval import dense_retriever
+from app.services.rag_service import rag_service
+
+DATA_FILE = Path(__file__).parent / "data" / "gameplay_queries.json"
+
+
+def bm25_keys(kb, question: str, k: int) -> List[str]:
+    # Problemas primeiro, FAQs depois (mesma prioridade de find_gameplay_context)
+    keys = [f"problema:{doc_id}" for _, doc_id in rag_service._rank_problemas(kb, question, k)]
+    keys += [f"faq:{doc_id}" for _, doc_id in rag_service._rank_faqs(kb, question, k)]
+    return keys[:k]
+
+
+def dense_keys(kb, question: str, k: int) -> List[str]:
+    return [key for _, key, _ in dense_retriever.search(question, k)]
+
+
+def hybrid_keys(kb, question: str, k: int) -> List[str]:
+    return [key for key, _ in rag_service._gameplay_snippets(kb, question)][:k]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def evaluate(
+    name: str,
+    search: Callable,
+    kb,
+    queries: List[Dict],
+    k: int,
+    repeat: int
+) -> Dict:
+    hits_at_1 = hits_at_k = answered = 0
+    for query in queries:
+        keys = search(kb, query["pergunta"], k)
+        relevant = set(query["relevantes"])
+        answered += bool(keys)
+        hits_at_1 += bool(keys) and keys[0] in relevant
+        hits_at_k += any(key in relevant for key in keys)
+
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            search(kb, query["pergunta"], k)
+            latencies.append((time.perf_counter() - start) * 1e6)
+
+    total = len(queries)
+    return {
+        "nome": name,
+        "com_contexto": answered / total,
+        "recall@1": hits_at_1 / total,
+        f"recall@{k}": hits_at_k / total,
+        "p50_us": percentile(latencies, 50),
+        "p99_us": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=3, help="trechos por pergunta")
+    parser.add_argument("--min-score", type=float, default=None, help="sobrescreve RAG_DENSE_MIN_SCORE")
+    parser.add_argument("--repeat", type=int, default=200, help="repetições para medir latência")
+    args = parser.parse_args()
+
+    if not dense_retriever.enabled:
+        print("❌ Busca vetorial desativada (NumPy ausente ou RAG_DENSE_ENABLED=false)")
+        return
+    if args.min_score is not None:
+        dense_retriever.min_score = args.min_score
+
+    queries = json.loads(DATA_FILE.read_text(encoding="utf-8"))["consultas"]
+    kb = rag_service.snapshot
+    # Constrói o índice vetorial fora da medição
+    dense_retriever.index = dense_retriever.build_index(kb)
+
+    results = [
+        evaluate("bm25", bm25_keys, kb, queries, args.k, args.repeat),
+        evaluate("dense", dense_keys, kb, queries, args.k, args.repeat),
+        evaluate("híbrido", hybrid_keys, kb, queries, args.k, args.repeat),
+    ]
+
+    print("=" * 72)
+    print(f"🔎 BUSCA DE CONTEXTO DE GAMEPLAY ({len(queries)} perguntas, k={args.k}, "
+          f"min_score={dense_retriever.min_score})")
+    print("=" * 72)
+    print(f"{'scorer':<10}{'c/ contexto':>13}{'recall@1':>10}{f'recall@{args.k}':>10}{'p50 (µs)':>12}{'p99 (µs)':>12}")
+    for r in results:
+        print(
+            f"{r['nome']:<10}{r['com_contexto']:>13.1%}{r['recall@1']:>10.1%}"
+            f"{r[f'recall@{args.k}']:>10.1%}{r['p50_us']:>12.1f}{r['p99_us']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Benchmark de qualidade e latência do RAG (find_build_context e find_gameplay_context)
+
+Para cada escala (1× = base atual; 10×, 100×, 1000× = corpus sintético com a
+base original + entradas geradas), mede:
+- latência p50/p99 das consultas rotuladas
+- memória da base compilada (tracemalloc: retida e pico durante a carga)
+- acerto das builds (jogador/posição canônicos e camada de contexto certa)
+- recall@1 e recall@k do contexto de gameplay
+
+Perguntas rotuladas: benchmarks/data/build_queries.json e
+benchmarks/data/gameplay_queries.json (paráfrases, erros de digitação,
+variações de acento e apelidos).
+
+Uso (a partir de backend/):
+    python -m benchmarks.rag_retrieval [--scales 1,10,100,1000] [--output atual.json]
+    python -m benchmarks.rag_retrieval --compare anterior.json  # mostra a diferença
+"""
+
+import argparse
+import gc
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.services.dense_retrieval import dense_retriever
+from app.services.knowledge_base import KB_FILES, KNOWLEDGE_BASE_PATH, load_snapshot
+from app.services.rag_service import rag_service
+
+DATA_DIR = Path(__file__).parent / "data"
+SYLLABLES = ["ka", "lo", "ri", "ben", "tu", "mar", "vi", "son", "des", "ga", "nel", "ro", "zi", "fa", "quin", "ho"]
+POSICOES = ["CF", "LWF", "RWF", "AMF", "CMF", "DMF", "CB", "LB", "RB"]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+# Corpus sintético
+
+def _fake_name(rng: random.Random) -> str:
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    return f"{word()} {word()}"
+
+
+def _fake_text(rng: random.Random, vocabulary: List[str], length: int) -> str:
+    # Mistura vocabulário real (colisões realistas no índice) e palavras novas
+    words = [
+        rng.choice(vocabulary) if rng.random() < 0.7 else "".join(rng.choice(SYLLABLES) for _ in range(3))
+        for _ in range(length)
+    ]
+    return " ".join(words)
+
+
+def build_scaled_corpus(scale: int, target: Path, seed: int = 42):
+    """
+    Grava em `target` uma cópia da base com `scale`× entradas
+
+    As entradas originais ficam no início de cada lista (os rótulos
+    "problema:N"/"faq:N" continuam válidos); as demais são sintéticas.
+    """
+    rng = random.Random(seed)
+    data = {}
+    for name, relative_path in KB_FILES.items():
+        data[name] = json.loads((KNOWLEDGE_BASE_PATH / relative_path).read_text(encoding="utf-8"))
+
+    problemas = data["problemas_gameplay"]["problemas_gameplay"]
+    faqs = data["tactics_faq"]["faqs"]
+    vocabulary = " ".join(
+        [p["sintoma"] + " " + p.get("causa_raiz", "") for p in problemas] + [f["question"] for f in faqs]
+    ).split()
+
+    def grow(items: List[Dict], make: Callable[[Dict], Dict]) -> List[Dict]:
+        return items + [make(rng.choice(items)) for _ in range(len(items) * (scale - 1))]
+
+    data["cartas_meta"]["cartas_meta"] = grow(
+        data["cartas_meta"]["cartas_meta"],
+        lambda carta: {
+            **carta,
+            "jogador": _fake_name(rng),
+            "apelidos": [],
+            "build_especifica": {rng.choice(POSICOES): build for build in carta["build_especifica"].values()},
+        },
+    )
+    data["builds_guide"]["players"] = grow(
+        data["builds_guide"]["players"],
+        lambda player: {**player, "name": _fake_name(rng)},
+    )
+    data["problemas_gameplay"]["problemas_gameplay"] = grow(
+        problemas,
+        lambda problema: {
+            **problema,
+            "sintoma": _fake_text(rng, vocabulary, rng.randint(5, 10)),
+            "causa_raiz": _fake_text(rng, vocabulary, rng.randint(6, 12)),
+        },
+    )
+    data["tactics_faq"]["faqs"] = grow(
+        faqs,
+        lambda faq: {**faq, "question": _fake_text(rng, vocabulary, rng.randint(4, 8))},
+    )
+
+    for name, relative_path in KB_FILES.items():
+        path = target / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data[name], ensure_ascii=False), encoding="utf-8")
+
+
+# Medições
+
+def load_measured(base_path: Path) -> Dict:
+    """Carrega e compila a base (incluindo o índice vetorial) medindo tempo e memória"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    snapshot = load_snapshot(base_path)
+    snapshot.player_names  # índice de nomes é montado no primeiro uso
+    if dense_retriever.enabled:
+        # Índice vetorial montado antes da troca, como em reload_knowledge_base
+        dense_retriever.index = dense_retriever.build_index(snapshot)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "snapshot": snapshot,
+        "carga_s": elapsed,
+        "memoria_mb": current / 1024 / 1024,
+        "pico_mb": peak / 1024 / 1024,
+        "problemas": len(snapshot.problemas["entradas"]),
+    }
+
+
+def measure_latency(fn: Callable[[Dict], object], queries: List[Dict], repeat: int) -> Dict:
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            fn(query)
+            latencies.append((time.perf_counter() - start) * 1e6)
+    return {"p50_us": percentile(latencies, 50), "p99_us": percentile(latencies, 99)}
+
+
+def build_accuracy(kb, queries: List[Dict]) -> float:
+    hits = 0
+    for query in queries:
+        player_id, _, position = rag_service.resolve_build_query(query["jogador"], query["posicao"])
+        if query["camada"] == "carta":
+            expected = kb.contextos_cartas.get((query["jogador_id"], query["posicao_id"]))
+        else:
+            expected = kb.contextos_regras.get(query["posicao_id"])
+        context = rag_service.find_build_context(query["jogador"], query["posicao"])
+        if query["jogador_id"] is None:
+            # Caso negativo: resolver para qualquer jogador da base é um falso positivo
+            resolved = player_id if player_id in kb.player_names else None
+        else:
+            resolved = player_id
+        hits += (resolved, position) == (query["jogador_id"], query["posicao_id"]) and context == expected
+    return hits / len(queries)
+
+
+def gameplay_recall(kb, queries: List[Dict], k: int) -> Dict:
+    hits_at_1 = hits_at_k = 0
+    for query in queries:
+        keys = [key for key, _ in rag_service._gameplay_snippets(kb, query["pergunta"])][:k]
+        relevant = set(query["relevantes"])
+        hits_at_1 += bool(keys) and keys[0] in relevant
+        hits_at_k += any(key in relevant for key in keys)
+    return {"recall@1": hits_at_1 / len(queries), f"recall@{k}": hits_at_k / len(queries)}
+
+
+def run_scale(scale: int, build_queries: List[Dict], gameplay_queries: List[Dict], k: int, repeat: int) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = KNOWLEDGE_BASE_PATH
+        if scale > 1:
+            base_path = Path(tmp)
+            build_scaled_corpus(scale, base_path)
+        loaded = load_measured(base_path)
+
+    kb = loaded.pop("snapshot")
+    # Mesma troca de referência feita por reload_knowledge_base
+    rag_service.snapshot = kb
+
+    build = measure_latency(
+        lambda q: rag_service.find_build_context(q["jogador"], q["posicao"]), build_queries, repeat
+    )
+    gameplay = measure_latency(
+        lambda q: rag_service.find_gameplay_context(q["pergunta"]), gameplay_queries, repeat
+    )
+    return {
+        "escala": scale,
+        **loaded,
+        "build_p50_us": build["p50_us"],
+        "build_p99_us": build["p99_us"],
+        "build_acerto": build_accuracy(kb, build_queries),
+        "gameplay_p50_us": gameplay["p50_us"],
+        "gameplay_p99_us": gameplay["p99_us"],
+        **{f"gameplay_{name}": value for name, value in gameplay_recall(kb, gameplay_queries, k).items()},
+    }
+
+
+# Relatório
+
+# (campo, título, formato); a largura da coluna vem do formato
+COLUMNS = [
+    ("escala", "escala", "{:>8}"),
+    ("problemas", "problemas", "{:>10}"),
+    ("carga_s", "carga s", "{:>9.2f}"),
+    ("memoria_mb", "mem MB", "{:>9.1f}"),
+    ("pico_mb", "pico MB", "{:>9.1f}"),
+    ("build_p50_us", "build p50", "{:>11.1f}"),
+    ("build_p99_us", "build p99", "{:>11.1f}"),
+    ("build_acerto", "acerto", "{:>9.1%}"),
+    ("gameplay_p50_us", "gp p50", "{:>10.1f}"),
+    ("gameplay_p99_us", "gp p99", "{:>10.1f}"),
+    ("gameplay_recall@1", "gp r@1", "{:>9.1%}"),
+]
+
+
+def print_report(results: List[Dict], k: int, previous: Optional[Dict[int, Dict]] = None):
+    columns = COLUMNS + [(f"gameplay_recall@{k}", f"gp r@{k}", "{:>9.1%}")]
+    widths = [len(fmt.format(0)) for _, _, fmt in columns]
+
+    print("=" * sum(widths))
+    print("📊 RAG: LATÊNCIA (µs), MEMÓRIA E QUALIDADE POR ESCALA")
+    print("=" * sum(widths))
+    print("".join(f"{title:>{width}}" for (_, title, _), width in zip(columns, widths)))
+    for result in results:
+        print("".join(fmt.format(result[key]) for key, _, fmt in columns))
+        before = (previous or {}).get(result["escala"])
+        if before:
+            # Diferença em relação à execução anterior (--compare)
+            deltas = []
+            for (key, _, fmt), width in zip(columns, widths):
+                if key in ("escala", "problemas") or key not in before:
+                    deltas.append(" " * width)
+                    continue
+                delta = result[key] - before[key]
+                text = f"{delta:+.1%}" if "%" in fmt else f"{delta:+.1f}"
+                deltas.append(f"{text:>{width}}")
+            print("".join(deltas) + "  (Δ)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1,10,100,1000", help="escalas do corpus, separadas por vírgula")
+    parser.add_argument("--k", type=int, default=3, help="recall@k do contexto de gameplay")
+    parser.add_argument("--repeat", type=int, default=20, help="repetições para medir latência")
+    parser.add_argument("--output", type=Path, help="grava os resultados em JSON")
+    parser.add_argument("--compare", type=Path, help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    build_queries = json.loads((DATA_DIR / "build_queries.json").read_text(encoding="utf-8"))["consultas"]
+    gameplay_queries = json.loads((DATA_DIR / "gameplay_queries.json").read_text(encoding="utf-8"))["consultas"]
+    if not dense_retriever.enabled:
+        print("⚠️  Busca vetorial desativada: medindo só o BM25")
+
+    results = []
+    for scale in (int(s) for s in args.scales.split(",")):
+        print(f"⏳ Escala {scale}×...")
+        results.append(run_scale(scale, build_queries, gameplay_queries, args.k, args.repeat))
+
+    previous = None
+    if args.compare:
+        previous = {r["escala"]: r for r in json.loads(args.compare.read_text(encoding="utf-8"))["resultados"]}
+    print_report(results, args.k, previous)
+
+    if args.output:
+        args.output.write_text(
+            json.dumps({"k": args.k, "resultados": results}, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+        print(f"\n💾 Resultados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
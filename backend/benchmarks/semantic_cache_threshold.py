@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Calibração do limiar do cache semântico de gameplay
+
+Usa pares rotulados (benchmarks/data/semantic_pairs.json): "equivalentes"
+podem dividir a resposta, "distintas" nunca. Para cada limiar mostra quantos
+equivalentes viram hit (recall) e quantos distintos viram hit errado, com e
+sem a checagem de `meaning_signature` que o SemanticCache faz antes de
+devolver uma resposta.
+
+O limiar recomendado é o menor sem nenhum hit errado (com a checagem).
+
+Uso (a partir de backend/):
+    python -m benchmarks.semantic_cache_threshold [--show-scores]
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import List, Tuple
+
+from app.core.config import settings
+from app.services.semantic_cache import meaning_signature, semantic_cache
+
+DATA_FILE = Path(__file__).parent / "data" / "semantic_pairs.json"
+
+THRESHOLDS = [round(0.5 + 0.05 * i, 2) for i in range(10)]
+
+
+def score_pairs(pairs: List[List[str]]) -> List[Tuple[float, bool, str, str]]:
+    """(cosseno, assinaturas iguais, pergunta 1, pergunta 2) de cada par"""
+    vectorizer = semantic_cache.vectorizer
+    results = []
+    for first, second in pairs:
+        score = float(vectorizer.transform(first) @ vectorizer.transform(second))
+        results.append((score, meaning_signature(first) == meaning_signature(second), first, second))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--show-scores", action="store_true", help="lista o cosseno de cada par")
+    args = parser.parse_args()
+
+    if not semantic_cache.enabled:
+        print("❌ Cache semântico desativado (NumPy ausente ou SEMANTIC_CACHE_ENABLED=false)")
+        return
+
+    data = json.loads(DATA_FILE.read_text(encoding="utf-8"))
+    # Mesmo vetorizador (e IDF da base de conhecimento) usado em produção
+    semantic_cache._ensure_index()
+    positives = score_pairs(data["equivalentes"])
+    negatives = score_pairs(data["distintas"])
+
+    print("=" * 72)
+    print(f"🎯 LIMIAR DO CACHE SEMÂNTICO ({len(positives)} equivalentes, {len(negatives)} distintas)")
+    print("=" * 72)
+    print(f"{'limiar':<8}{'recall':>10}{'hits errados':>14}{'recall c/ ass.':>17}{'errados c/ ass.':>17}")
+
+    recommended = None
+    for threshold in THRESHOLDS:
+        recall = sum(score >= threshold for score, _, _, _ in positives) / len(positives)
+        wrong = sum(score >= threshold for score, _, _, _ in negatives)
+        guarded_recall = sum(score >= threshold and same for score, same, _, _ in positives) / len(positives)
+        guarded_wrong = sum(score >= threshold and same for score, same, _, _ in negatives)
+        if recommended is None and guarded_wrong == 0:
+            recommended = threshold
+        marker = " ←" if threshold == settings.SEMANTIC_CACHE_THRESHOLD else ""
+        print(f"{threshold:<8}{recall:>10.1%}{wrong:>14}{guarded_recall:>17.1%}{guarded_wrong:>17}{marker}")
+
+    print()
+    print(f"Limiar atual (SEMANTIC_CACHE_THRESHOLD): {settings.SEMANTIC_CACHE_THRESHOLD}")
+    print(f"Menor limiar sem hit errado (com assinatura): {recommended}")
+
+    if args.show_scores:
+        for title, results in (("Equivalentes", positives), ("Distintas", negatives)):
+            print()
+            print(title)
+            for score, same, first, second in sorted(results, reverse=True):
+                print(f"  {score:.3f} {'=' if same else '≠'} {first!r} / {second!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compila a base de conhecimento (knowledge_base/*.json) em um artefato binário
+
+O artefato contém os JSON já processados, os índices de busca, os contextos
+renderizados e a matriz de embeddings da busca vetorial (se o NumPy estiver
+instalado). Os workers o carregam via mmap no startup em vez de reprocessar
+os JSON; se algum JSON mudar depois da compilação, o artefato é ignorado.
+
+Uso:
+    python compile_knowledge_base.py             # compila
+    python compile_knowledge_base.py --check     # só verifica se está atualizado
+    python compile_knowledge_base.py -o caminho  # grava em outro arquivo
+    python compile_knowledge_base.py --dense-dim 4096  # igual a RAG_DENSE_DIM
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Adicionar o diretório do backend ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.embeddings import NUMPY_AVAILABLE
+from app.services.kb_artifact import (
+    ARTIFACT_PATH, DENSE_DIM, KnowledgeBaseArtifact, build_dense_arrays, write_artifact
+)
+from app.services.knowledge_base import KB_FILES, load_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", type=Path, default=ARTIFACT_PATH, help="arquivo de saída")
+    parser.add_argument("--dense-dim", type=int, default=DENSE_DIM, help="dimensão dos embeddings (RAG_DENSE_DIM)")
+    parser.add_argument("--check", action="store_true", help="só verifica se o artefato está atualizado")
+    args = parser.parse_args()
+
+    if args.check:
+        if not args.output.exists():
+            print(f"❌ Artefato não encontrado: {args.output}")
+            sys.exit(1)
+        artifact = KnowledgeBaseArtifact(args.output)
+        if not artifact.is_current():
+            print(f"❌ Artefato desatualizado (compilado em {artifact.header['created_at']})")
+            sys.exit(1)
+        print(f"✅ Artefato atualizado (compilado em {artifact.header['created_at']})")
+        return
+
+    start = time.perf_counter()
+    snapshot = load_snapshot()
+    arrays = build_dense_arrays(snapshot, args.dense_dim) if NUMPY_AVAILABLE else None
+    if arrays is None:
+        print("⚠️  NumPy não instalado: artefato sem embeddings da busca vetorial")
+    header = write_artifact(snapshot, args.output, arrays=arrays)
+    elapsed = time.perf_counter() - start
+
+    print("=" * 60)
+    print("📦 BASE DE CONHECIMENTO COMPILADA")
+    print("=" * 60)
+    for name, section in header["sections"].items():
+        print(f"  {name:<30}{section['length'] / 1024:>10.1f} KB")
+    print(f"\nArquivos de origem: {len(KB_FILES)}")
+    print(f"Saída: {args.output} ({args.output.stat().st_size / 1024:.1f} KB)")
+    print(f"✅ Concluído em {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,19 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api import auth, builds, gameplay, users, cards, players, admin
+from app.services.activity_service import activity_service
+from app.services.admin_stats import admin_stats
+from app.services.ai_cache_store import ai_cache_store
+from app.services.cache_service import cache_service
+from app.services.gemini_service import gemini_service
+from app.services.kb_sync import knowledge_sync
+from app.services.popular_builds import popular_builds
+from app.services.postgres_service import postgres_service
+from app.services.quota_service import quota_service
+from app.services.rag_service import rag_service
+from app.services.semantic_cache import semantic_cache
+from app.services.supabase_service import supabase_service
+from app.services.user_stats_service import user_stats_service
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -31,6 +44,43 @@ app.include_router(users.router, prefix=settings.API_PREFIX)
 app.include_router(admin.router, prefix=settings.API_PREFIX)
 
 
+@app.on_event("startup")
+async def startup():
+    await supabase_service.connect()
+    await postgres_service.connect()
+    await cache_service.connect()
+    if settings.AI_CACHE_ENABLED:
+        cache_service.attach_persistent_store(ai_cache_store)
+        await ai_cache_store.start()
+    await quota_service.start()
+    await activity_service.start()
+    await user_stats_service.start()
+    await popular_builds.start()
+    await admin_stats.start()
+    await semantic_cache.start()
+    await knowledge_sync.start()
+    await rag_service.build_indexes()
+    await rag_service.start_watching()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await rag_service.stop_watching()
+    await knowledge_sync.stop()
+    await semantic_cache.stop()
+    await quota_service.stop()
+    await admin_stats.stop()
+    await popular_builds.stop()
+    await user_stats_service.stop()
+    await activity_service.stop()
+    await gemini_service.close()
+    if settings.AI_CACHE_ENABLED:
+        await ai_cache_store.stop()
+    await cache_service.close()
+    await postgres_service.close()
+    await supabase_service.close()
+
+
 @app.get("/")
 async def root():
     return {